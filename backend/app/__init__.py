@@ -1,5 +1,6 @@
 # backend/app/__init__.py
 
+import os
 from flask import Flask, send_from_directory, jsonify, request
 from flask_cors import CORS
 from .models.database import db
@@ -39,15 +40,49 @@ def create_app(include_admin: bool = False):
     # -----------------------------------
     # Serve Uploaded files
     # -----------------------------------
+    # ?size=thumb|small|medium (&format=webp|jpeg) serves a cached derivative
     @app.route("/uploads/<path:filename>")
     def uploaded_files(filename):
-        return send_from_directory(Config.UPLOAD_FOLDER, filename)
+        from werkzeug.security import safe_join
+        from app.utils import blob_store, image_derivatives
+
+        # Config.UPLOAD_FOLDER first, then backend/uploads where work order images live
+        directory = Config.UPLOAD_FOLDER
+        source = safe_join(os.path.join(app.root_path, directory), filename)
+        if not source or not os.path.isfile(source):
+            directory = blob_store.UPLOAD_ROOT
+            source = safe_join(directory, filename)
+
+        def original():
+            return send_from_directory(directory, filename)
+
+        size = request.args.get("size")
+        if not size or not source or not os.path.isfile(source):
+            return original()
+
+        return image_derivatives.send_derivative(
+            source, size, request.args.get("format"), request.headers.get("Accept"), original
+        )
 
     # -----------------------------------
     # Initialize DB
     # -----------------------------------
     db.init_app(app)
 
+    # -----------------------------------
+    # Prometheus metrics
+    # -----------------------------------
+    from app.utils import metrics
+    from app.models.workorder_automation_model import count_active_assignment_jobs
+    from app.models.email_outbox_model import count_outbox_backlog
+
+    metrics.ASSIGNMENTS_IN_FLIGHT.set_function(count_active_assignment_jobs)
+    metrics.EMAIL_OUTBOX_BACKLOG.set_function(count_outbox_backlog)
+
+    @app.route("/metrics")
+    def prometheus_metrics():
+        return metrics.render(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
     # -----------------------------------
     # Blueprints Registration
     # -----------------------------------
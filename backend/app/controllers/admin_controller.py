@@ -3,8 +3,10 @@ import os, bcrypt, random, string
 import tempfile
 from flask import current_app
 from app.models.admin_model import AdminModel
-from app.utils.email_utils import send_email, send_admin_otp_email
-from app.utils.pdf_utils import generate_certificate_pdf
+from app.utils.email_utils import queue_email, send_admin_otp_email
+from app.utils import pdf_utils
+from app.utils import blob_store
+from app.models.email_outbox_model import requeue_dead
 
 class AdminController:
 
@@ -19,8 +21,8 @@ class AdminController:
             return {"error": "Invalid credentials"}, 401
 
         otp = ''.join(random.choices(string.digits, k=6))
-        AdminModel.save_otp(email, otp)
         send_admin_otp_email(email, otp)
+        AdminModel.save_otp(email, otp)
         return {"message": "OTP sent to email"}, 200
 
     @staticmethod
@@ -63,9 +65,19 @@ class AdminController:
 
     @staticmethod
     def approve_provider(email):
+        details = AdminController._approve_provider(email)
+        if details is None:
+            return {"error": "Provider not found or not pending"}, 404
+        # Rendered in the background; the mail worker attaches it when ready
+        pdf_utils.submit_certificate(details)
+        return {"message": "Provider approved"}, 200
+
+    @staticmethod
+    def _approve_provider(email):
+        """Approve, queue the approval mail; returns the certificate details (None if not pending)."""
         core = AdminModel.approve_provider(email)
         if not core:
-            return {"error": "Provider not found or not pending"}, 404
+            return None
 
         # FIX: use user_uid instead of provider_id
         user_uid = core["user_uid"]
@@ -88,22 +100,18 @@ class AdminController:
                 for s in services
             ]
         }
-
-        pdf_path = generate_certificate_pdf(details, email)
+        details = pdf_utils.stamp_issue(details)
 
         msg = (
             "Your provider profile has been approved. "
             "You can now submit your bank details."
         )
 
+        # Queued with the admin message; the outbox row carries the certificate details
+        queue_email(email, "Profile Approved", msg, certificate=details,
+                    attachment_name=pdf_utils.certificate_filename(email))
         AdminModel.insert_admin_message(email, msg, "approval")
-
-        try:
-            send_email(email, "Profile Approved", msg, pdf_path)
-            return {"message": "Provider approved"}, 200
-        finally:
-            if os.path.exists(pdf_path):
-                os.remove(pdf_path)
+        return details
 
 
     @staticmethod
@@ -111,16 +119,16 @@ class AdminController:
         if not AdminModel.reject_provider(email):
             return {"error": "Provider not found or not pending"}, 404
         msg = "Your provider profile has been rejected. Please contact admin for more details."
+        queue_email(email, "Profile Rejected", msg)
         AdminModel.insert_admin_message(email, msg, "rejection")
-        send_email(email, "Profile Rejected", msg)
         return {"message": "Provider rejected"}, 200
 
     @staticmethod
     def send_message_provider(email, message):
         if not email or not message:
             return {"error": "Email and message required"}, 400
+        queue_email(email, "Message from Ontract Admin", message)
         AdminModel.insert_admin_message(email, message, "message")
-        send_email(email, "Message from Ontract Admin", message)
         return {"message": "Message sent and saved"}, 200
 
     # ===== Contractors =====
@@ -145,8 +153,16 @@ class AdminController:
 
     @staticmethod
     def approve_contractor(email):
-        if not AdminModel.approve_contractor(email):
+        details = AdminController._approve_contractor(email)
+        if details is None:
             return {"error": "Company not found or not pending"}, 404
+        pdf_utils.submit_certificate(details)
+        return {"message": "Contractor approved"}, 200
+
+    @staticmethod
+    def _approve_contractor(email):
+        if not AdminModel.approve_contractor(email):
+            return None
 
         company = AdminModel.get_contractor_by_email(email)
         print("company",company)
@@ -164,33 +180,58 @@ class AdminController:
                 "Service Location":  ", ".join(filter(None, [s.get("city"), s.get("state"), s.get("region")]))
             } for s in services]
         }
+        details = pdf_utils.stamp_issue(details)
 
-        pdf_path = generate_certificate_pdf(details, email)
         msg = "Your company has been approved. You can now proceed to submit bank details."
+        queue_email(email, "Company Approved", msg, certificate=details,
+                    attachment_name=pdf_utils.certificate_filename(email))
         AdminModel.insert_admin_message(email, msg, "approval")
+        return details
 
-        try:
-            send_email(email, "Company Approved", msg, pdf_path)
-            return {"message": "Contractor approved"}, 200
-        finally:
-            if os.path.exists(pdf_path):
-                os.remove(pdf_path)
+    # ===== Batch approval =====
+    @staticmethod
+    def approve_batch(providers, contractors):
+        """
+        Approve many providers / contractors, then render all their
+        certificates in parallel in the pool (waiting up to
+        CERTIFICATE_WAIT_SECONDS). Mails go out through the outbox as usual.
+        """
+        if not providers and not contractors:
+            return {"error": "providers or contractors required"}, 400
+
+        approved, not_found, details_list = [], [], []
+        for kind, emails, approve in (
+            ("provider", providers or [], AdminController._approve_provider),
+            ("contractor", contractors or [], AdminController._approve_contractor),
+        ):
+            for email in emails:
+                details = approve(email)
+                if details is None:
+                    not_found.append({"email": email, "type": kind})
+                    continue
+                approved.append({"email": email, "type": kind})
+                details_list.append(details)
+
+        statuses = pdf_utils.render_batch(details_list)
+        for item, status in zip(approved, statuses):
+            item["certificate"] = status
+        return {"approved": approved, "not_found": not_found}, 200
 
     @staticmethod
     def reject_contractor(email):
         if not AdminModel.reject_contractor(email):
             return {"error": "Not found or already processed"}, 404
         msg = "Your company registration has been rejected. Contact admin for details."
+        queue_email(email, "Company Rejected", msg)
         AdminModel.insert_admin_message(email, msg, "rejection")
-        send_email(email, "Company Rejected", msg)
         return {"message": "Contractor rejected"}, 200
 
     @staticmethod
     def send_message_contractor(email, message):
         if not email or not message:
             return {"error": "Email and message required"}, 400
+        queue_email(email, "Message from Admin", message)
         AdminModel.insert_admin_message(email, message, "message")
-        send_email(email, "Message from Admin", message)
         return {"message": "Message sent"}, 200
 
     # ===== Standard Rates =====
@@ -304,4 +345,29 @@ class AdminController:
             return {"message": "Rate deleted"}, 200
         except Exception as e:
             current_app.logger.exception("Delete rate failed")
-            return {"error": str(e)}, 500
\ No newline at end of file
+            return {"error": str(e)}, 500
+    @staticmethod
+    def collect_upload_garbage(grace_seconds=None):
+        try:
+            if grace_seconds is None:
+                grace_seconds = blob_store.GC_GRACE_SECONDS
+            grace_seconds = int(grace_seconds)
+            if grace_seconds < 0:
+                return {"error": "grace_seconds must be >= 0"}, 400
+            res = blob_store.collect_garbage(grace_seconds)
+            return res, 200
+        except (TypeError, ValueError):
+            return {"error": "grace_seconds must be an integer"}, 400
+        except Exception as e:
+            current_app.logger.exception("Upload GC failed")
+            return {"error": str(e)}, 500
+
+    @staticmethod
+    def requeue_dead_emails(ids=None):
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                return {"error": "ids must be a list of integers"}, 400
+        count, error = requeue_dead(ids)
+        if error:
+            return {"error": error}, 500
+        return {"requeued": count}, 200
@@ -5,12 +5,12 @@ import re
 import json
 import random
 import string
-import base64
-from app.utils.file_utils import save_uploaded_file
+from app.controllers.file_controller import FILE_MODES, FileController
+from app.utils import blob_store
 from app.models.contractor_model import ContractorModel
 from app.utils.encrypt_utils import cipher
 from app.utils.email_utils import (
-    send_email,
+    queue_email,
     send_contractor_activation_email,
     send_contractor_otp_email,
     send_contractor_profile_submitted_email,
@@ -66,8 +66,9 @@ class ContractorController:
         hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
         token = str(uuid.uuid4())
 
-        ContractorModel.create_company(company_name, brn, hashed, phone, email, token)
+        # Queued first so create_company's commit covers the mail too
         send_contractor_activation_email(email, token)
+        ContractorModel.create_company(company_name, brn, hashed, phone, email, token)
 
         return {
             "message": "Signup successful. Activation link sent to your email."
@@ -108,8 +109,8 @@ class ContractorController:
 
         # generate OTP and save
         otp = ''.join(random.choices(string.digits, k=6))
-        ContractorModel.save_otp(email, otp)
         send_contractor_otp_email(email, otp)
+        ContractorModel.save_otp(email, otp)
 
         # IMPORTANT: return minimal contractor object so frontend can store email immediately
         # without waiting for OTP verification endpoint. This keeps flows consistent.
@@ -147,8 +148,8 @@ class ContractorController:
 
         ContractorModel.delete_otp(email)
         otp = ''.join(random.choices(string.digits, k=6))
-        ContractorModel.save_otp(email, otp)
         send_contractor_otp_email(email, otp)
+        ContractorModel.save_otp(email, otp)
         return {"message": "OTP resent successfully"}, 200
 
     # ---------------- Profile ----------------
@@ -158,15 +159,27 @@ class ContractorController:
         if not email:
             return {"error": "Email required"}, 400
 
+        # "files": "descriptors" returns {"url", "size", "sha256", "mime"} per document instead of base64
+        file_mode = data.get('files') or "inline"
+        if file_mode not in FILE_MODES:
+            return {"error": f"files must be one of: {', '.join(FILE_MODES)}"}, 400
+
         profile = ContractorModel.get_company_profile(email)
         if not profile:
             return {"error": "Company not found"}, 404
 
-        if profile.get("logo_path"):
-            profile["logo_path"] = base64.b64encode(profile["logo_path"]).decode()
-
-        if profile.get("certificate_path"):
-            profile["certificate_path"] = base64.b64encode(profile["certificate_path"]).decode()
+        # Documents live in the blob store; the row only has their descriptors
+        profile["logo_path"] = FileController.document_field(
+            email, "contractor_logo", profile.pop("logo_blob"), profile["logo_path"], file_mode
+        )
+        profile["certificate_path"] = FileController.document_field(
+            email, "contractor_certificate", profile.pop("certificate_blob"), profile["certificate_path"], file_mode
+        )
+        bank = profile.get("bank_details")
+        if bank:
+            bank["bank_statement"] = FileController.document_field(
+                email, "contractor_bank_statement", bank.pop("bank_statement_blob"), bank["bank_statement"], file_mode
+            )
 
         return profile, 200
 
@@ -199,26 +212,21 @@ class ContractorController:
         logo_file = files.get('company_logo')
         cert_file = files.get('certificate')
 
-        if logo_file:
-            save_uploaded_file(logo_file, "company_logos")
-        if cert_file:
-            save_uploaded_file(cert_file, "company_certificates")
-
-        if logo_file:
-            logo_file.seek(0)
-        if cert_file:
-            cert_file.seek(0)
+        # Stored in the blob store; None keeps the current file
+        try:
+            logo = blob_store.store_document(logo_file) if logo_file else None
+            cert = blob_store.store_document(cert_file) if cert_file else None
+        except ValueError as e:
+            return {"error": str(e)}, 400
 
-        logo_bytes = logo_file.read() if logo_file else None
-        cert_bytes = cert_file.read() if cert_file else None
+        # Committed together with the profile update
+        send_contractor_profile_submitted_email(email, company_data['company_name'])
+        send_admin_new_contractor_notification(ADMIN_EMAIL, company_data['company_name'], email)
 
-        success = ContractorModel.update_company_profile(email, company_data, services, logo_bytes, cert_bytes)
+        success = ContractorModel.update_company_profile(email, company_data, services, logo, cert)
         if not success:
             return {"error": "Failed to update company profile"}, 500
 
-        send_contractor_profile_submitted_email(email, company_data['company_name'])
-        send_admin_new_contractor_notification(ADMIN_EMAIL, company_data['company_name'], email)
-
         return {
             "message": "Company profile updated and submitted for approval",
             "status": "pending"
@@ -249,19 +257,20 @@ class ContractorController:
             "bank_name": bank_name
         }
 
-        save_uploaded_file(statement, "company_bank_statements")
-
-        statement_bytes = statement.read()
-
-        success = ContractorModel.update_company_bank(email, bank_details, statement_bytes)
-        if not success:
-            return {"error": "Failed to update bank details"}, 500
+        try:
+            statement_doc = blob_store.store_document(statement)
+        except ValueError as e:
+            return {"error": str(e)}, 400
 
-        send_email(
+        queue_email(
             email,
             "Bank Details Submitted",
             "Your bank details have been successfully submitted and are stored securely."
         )
+        success = ContractorModel.update_company_bank(email, bank_details, statement_doc)
+        if not success:
+            return {"error": "Failed to update bank details"}, 500
+
         return {"message": "Bank details updated successfully"}, 200
 
     # ---------------- Notifications ----------------
@@ -1,12 +1,46 @@
+import base64
+import hashlib
 from io import BytesIO
-from PIL import Image
-import magic
-from flask import send_file, jsonify
+from flask import send_file, jsonify, request, url_for
 from sqlalchemy.sql import text
 from app.models.database import db
+from app.utils import blob_store
+
+# Profile responses: documents inline as base64 (default) or as descriptors
+FILE_MODES = ("inline", "descriptors")
+
 
 class FileController:
 
+    @staticmethod
+    def document_field(email, file_type, descriptor, legacy, mode="inline"):
+        """
+        Profile response value for one document column: base64 content
+        ("inline"), or {"url", "size", "sha256", "mime"} ("descriptors")
+        with the file itself fetched from get_image.
+        """
+        if mode != "descriptors":
+            data = blob_store.document_bytes(descriptor, legacy)
+            return base64.b64encode(data).decode() if data else None
+
+        if descriptor:
+            # ?v= changes with the content, so the URL can be cached for good
+            return {
+                "url": url_for("file_bp.get_image", email=email, file_type=file_type, v=descriptor["sha256"][:16]),
+                "size": descriptor["size"],
+                "sha256": descriptor["sha256"],
+                "mime": descriptor["mime"],
+            }
+        if legacy:
+            # Not moved by migrate_blobs.py yet: no stored hash / type
+            return {
+                "url": url_for("file_bp.get_image", email=email, file_type=file_type),
+                "size": len(legacy),
+                "sha256": None,
+                "mime": None,
+            }
+        return None
+
     @staticmethod
     def get_image(email, file_type):
         try:
@@ -14,7 +48,8 @@ class FileController:
 
             if file_type == "profile":
                 sql = text("""
-                    SELECT p.profile_pic AS file
+                    SELECT p.profile_pic_blob AS blob,
+                           CASE WHEN p.profile_pic_blob IS NULL THEN p.profile_pic END AS file
                     FROM providers_t p
                     JOIN users_t u ON u.user_uid = p.user_uid
                     WHERE u.email_id = :email
@@ -22,7 +57,8 @@ class FileController:
 
             elif file_type == "certificate":
                 sql = text("""
-                    SELECT p.authorized_certificate AS file
+                    SELECT p.authorized_certificate_blob AS blob,
+                           CASE WHEN p.authorized_certificate_blob IS NULL THEN p.authorized_certificate END AS file
                     FROM providers_t p
                     JOIN users_t u ON u.user_uid = p.user_uid
                     WHERE u.email_id = :email
@@ -30,7 +66,8 @@ class FileController:
 
             elif file_type == "bank_statement":
                 sql = text("""
-                    SELECT b.bank_statement AS file
+                    SELECT b.bank_statement_blob AS blob,
+                           CASE WHEN b.bank_statement_blob IS NULL THEN b.bank_statement END AS file
                     FROM providers_bank_details_t b
                     JOIN providers_t p ON b.provider_id = p.provider_id
                     JOIN users_t u ON u.user_uid = p.user_uid
@@ -39,7 +76,8 @@ class FileController:
 
             elif file_type == "contractor_certificate":
                 sql = text("""
-                    SELECT c.certificate_path AS file
+                    SELECT c.certificate_blob AS blob,
+                           CASE WHEN c.certificate_blob IS NULL THEN c.certificate_path END AS file
                     FROM company_details_t c
                     JOIN users_t u ON u.user_uid = c.user_uid
                     WHERE u.email_id = :email
@@ -47,45 +85,75 @@ class FileController:
 
             elif file_type == "contractor_logo":
                 sql = text("""
-                    SELECT c.logo_path AS file
+                    SELECT c.logo_blob AS blob,
+                           CASE WHEN c.logo_blob IS NULL THEN c.logo_path END AS file
                     FROM company_details_t c
                     JOIN users_t u ON u.user_uid = c.user_uid
                     WHERE u.email_id = :email
                 """)
 
+            elif file_type == "contractor_bank_statement":
+                sql = text("""
+                    SELECT b.bank_statement_blob AS blob,
+                           CASE WHEN b.bank_statement_blob IS NULL THEN b.bank_statement END AS file
+                    FROM company_bank_details_t b
+                    JOIN company_details_t c ON c.company_id = b.company_id
+                    JOIN users_t u ON u.user_uid = c.user_uid
+                    WHERE u.email_id = :email
+                """)
+
 
             else:
                 return jsonify({"error": "Invalid file type"}), 400
 
             # ---------- Execute SQL ----------
             row = db.session.execute(sql, {"email": email}).fetchone()
-
-            if not row or not row._mapping["file"]:
+            if not row or not (row.blob or row.file):
                 return jsonify({"error": "File not found"}), 404
 
-            file_data = row._mapping["file"]
-
-            # Convert memoryview → bytes
-            if isinstance(file_data, memoryview):
-                file_data = file_data.tobytes()
-
-            # ---------- Detect MIME type ----------
-            mime = magic.Magic(mime=True)
-            mimetype = mime.from_buffer(file_data[:2048])
-
-            # PDF handling
-            if mimetype == "application/pdf":
-                return send_file(BytesIO(file_data), mimetype="application/pdf", as_attachment=False)
-
-            # Image detection using Pillow
-            try:
-                img = Image.open(BytesIO(file_data))
-                mimetype = f"image/{img.format.lower()}"
-            except Exception:
+            if row.blob:
+                # Type, size and hash were recorded at upload: stream the stored
+                # file (Range / If-None-Match handled by send_file)
+                mimetype = row.blob["mime"]
+                if not blob_store.is_document_mime(mimetype):
+                    return jsonify({"error": "Invalid or corrupted file format"}), 400
+                response = send_file(
+                    blob_store.document_path(row.blob),
+                    mimetype=mimetype,
+                    as_attachment=False,
+                    conditional=True,
+                    etag=row.blob["sha256"],
+                )
+                response.headers["Accept-Ranges"] = "bytes"
+                return FileController._cache_versioned(response, row.blob)
+
+            # Legacy BYTEA row (not moved by migrate_blobs.py yet)
+            file_data = row.file.tobytes() if isinstance(row.file, memoryview) else row.file
+            mimetype = blob_store.sniff_mime(file_data[:blob_store.MIME_SNIFF_BYTES])
+            if not blob_store.is_document_mime(mimetype):
                 return jsonify({"error": "Invalid or corrupted file format"}), 400
-
-            return send_file(BytesIO(file_data), mimetype=mimetype, as_attachment=False)
+            response = send_file(
+                BytesIO(file_data),
+                mimetype=mimetype,
+                as_attachment=False,
+                conditional=True,
+                etag=hashlib.sha256(file_data).hexdigest(),
+            )
+            return FileController._cache_versioned(response, None)
 
         except Exception as err:
             print("File fetch error:", err)
             return jsonify({"error": str(err)}), 500
+
+    @staticmethod
+    def _cache_versioned(response, descriptor):
+        """
+        A ?v= URL from document_field names one version of the file: cache it
+        for good. Anything else is revalidated (ETag -> 304) on every view.
+        """
+        version = request.args.get("v")
+        if version and descriptor and descriptor["sha256"][:16] == version:
+            response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "private, no-cache"
+        return response
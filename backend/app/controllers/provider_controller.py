@@ -1,4 +1,4 @@
-import os, uuid, bcrypt, random, string, json, base64
+import os, uuid, bcrypt, random, string, json
 from datetime import datetime
 from werkzeug.utils import secure_filename
 
@@ -7,10 +7,11 @@ from app.utils.email_utils import (
     send_activation_email,
     send_otp_email,
     send_reset_otp_email,
-    send_email
+    queue_email
 )
 from app.utils.encrypt_utils import encrypt_value, decrypt_value
-from app.utils.file_utils import save_uploaded_file
+from app.controllers.file_controller import FILE_MODES, FileController
+from app.utils import blob_store
 from app.config import Config
 
 
@@ -31,9 +32,10 @@ class ProviderController:
         hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
         token = str(uuid.uuid4())
 
+        # Mails are queued first so the commit below covers them too
+        send_activation_email(email, token)
         # NEW: insert into users_t + providers_t
         ProviderModel.insert_provider(email, hashed, phone, token)
-        send_activation_email(email, token)
 
         return {"message": "Signup successful, check your email."}, 200
 
@@ -64,8 +66,8 @@ class ProviderController:
 
         # OTP flow remains the same
         otp = ''.join(random.choices(string.digits, k=6))
-        ProviderModel.insert_otp(email, otp)
         send_otp_email(email, otp)
+        ProviderModel.insert_otp(email, otp)
 
         return {"message": "OTP sent to email"}, 200
 
@@ -84,9 +86,8 @@ class ProviderController:
         ProviderModel.delete_otp(email)
 
         otp = ''.join(random.choices(string.digits, k=6))
-        ProviderModel.insert_otp(email, otp)
-
         send_otp_email(email, otp)
+        ProviderModel.insert_otp(email, otp)
 
         return {"message": "OTP resent successfully"}, 200
 
@@ -98,8 +99,8 @@ class ProviderController:
             return {"error": "Account not found or not activated"}, 404
 
         otp = ''.join(random.choices(string.digits, k=6))
-        ProviderModel.insert_otp(email, otp)
         send_reset_otp_email(email, otp)
+        ProviderModel.insert_otp(email, otp)
 
         return {"message": "Reset OTP sent to email"}, 200
 
@@ -137,6 +138,7 @@ class ProviderController:
 
     @staticmethod
     def update_bank(email, bank_name, holder_name, account_number, swift, bank_statement):
+        """``bank_statement`` is the blob_store descriptor of the uploaded statement."""
         provider_details = ProviderModel.get_provider(email)
 
         if not provider_details:
@@ -149,12 +151,12 @@ class ProviderController:
 
         existing = ProviderModel.get_bank(provider_id)
 
+        queue_email(email, "Bank Details Updated", "Your bank details were successfully updated.")
         if existing:
             ProviderModel.update_bank(provider_id, bank_name, swift_enc, acc_enc, holder_name, bank_statement)
         else:
             ProviderModel.insert_bank(provider_id, bank_name, swift_enc, acc_enc, holder_name, bank_statement)
 
-        send_email(email, "Bank Details Updated", "Your bank details were successfully updated.")
         return {"message": "Bank details updated"}, 200
 
     # ===================================================================
@@ -162,7 +164,14 @@ class ProviderController:
     # ===================================================================
 
     @staticmethod
-    def get_profile(email):
+    def get_profile(email, file_mode="inline"):
+        """
+        file_mode "inline" returns the documents base64-encoded; "descriptors"
+        returns {"url", "size", "sha256", "mime"} for each instead.
+        """
+        if file_mode not in FILE_MODES:
+            return {"error": f"files must be one of: {', '.join(FILE_MODES)}"}, 400
+
         provider = ProviderModel.get_provider(email)
 
         if not provider:
@@ -194,15 +203,21 @@ class ProviderController:
                 "swift": decrypt_value(bank_row["swift_code"]),
                 "bank_account_number": decrypt_value(bank_row["bank_account_number"]),
                 "holder_name": decrypt_value(bank_row["account_holder_name"]),
-                "bank_statement": base64.b64encode(bank_row["bank_statement"]).decode()
-                if bank_row.get("bank_statement") else None
+                "bank_statement": FileController.document_field(
+                    email, "bank_statement", bank_row["bank_statement_blob"], bank_row["bank_statement"], file_mode
+                )
             }
 
+        # Documents live in the blob store; the row only has their descriptors
         response = {
             **provider,
-            "profile_pic": base64.b64encode(provider['profile_pic']).decode() if provider.get('profile_pic') else None,
-            "authorized_certificate": base64.b64encode(provider['authorized_certificate']).decode()
-            if provider.get('authorized_certificate') else None,
+            "profile_pic": FileController.document_field(
+                email, "profile", provider.pop("profile_pic_blob"), provider["profile_pic"], file_mode
+            ),
+            "authorized_certificate": FileController.document_field(
+                email, "certificate", provider.pop("authorized_certificate_blob"),
+                provider["authorized_certificate"], file_mode
+            ),
             "services": services,
             "bank_details": bank_details
         }
@@ -223,15 +238,12 @@ class ProviderController:
         profile_file = files.get("profile_image")
         cert_file = files.get("certificate")
 
-        # ---- SAVE TO DISK (missing before) ----
-        profile_path = save_uploaded_file(profile_file, "provider_profile") if profile_file else None
-        certificate_path = save_uploaded_file(cert_file, "provider_certificates") if cert_file else None
-
-        if profile_file: profile_file.seek(0)
-        if cert_file: cert_file.seek(0)
-
-        profile_bytes = profile_file.read() if profile_file else provider["profile_pic"]
-        cert_bytes = cert_file.read() if cert_file else provider["authorized_certificate"]
+        # ---- SAVE TO THE BLOB STORE (None keeps the current file) ----
+        try:
+            profile_doc = blob_store.store_document(profile_file) if profile_file else None
+            cert_doc = blob_store.store_document(cert_file) if cert_file else None
+        except ValueError as e:
+            return {"error": str(e)}, 400
 
         updated_data = {
             "full_name": form.get("full_name"),
@@ -242,11 +254,15 @@ class ProviderController:
             "contact_number": form.get("contact_number"),
             "alternate_contact_number": form.get("alternate_contact_number"),
             "tin_number": form.get("tin_number"),
-            "profile_pic": profile_bytes,
-            "authorized_certificate": cert_bytes
+            "profile_pic": profile_doc,
+            "authorized_certificate": cert_doc
         }
 
         ProviderModel.update_provider(email, updated_data)
+
+        # notifications, committed together with the status change
+        queue_email(ADMIN_EMAIL, "New Provider Ready for Review", f"{email} submitted updated profile")
+        queue_email(email, "Profile Submitted", "Your profile is now under review")
         ProviderModel.update_status(email, "pending")
 
         # ----------- Replace services (now via user_uid) -------------
@@ -271,8 +287,4 @@ class ProviderController:
         if cleaned:
             ProviderModel.insert_services(user_uid, cleaned)
 
-        # notifications
-        send_email(ADMIN_EMAIL, "New Provider Ready for Review", f"{email} submitted updated profile")
-        send_email(email, "Profile Submitted", "Your profile is now under review")
-
         return {"message": "Profile submitted successfully", "status": "pending"}, 200
@@ -1,11 +1,13 @@
 from flask import request, jsonify
-from app.models.workorder_area import WorkOrderArea
+from app.models.workorder_area import WorkOrderArea, WORKORDER_AREAS_CACHE
+from app.utils import cache_utils
 
 # CREATE
 def create_workorder_area():
     try:
         data = request.get_json()
         new_area = WorkOrderArea.create(data)
+        cache_utils.invalidate(WORKORDER_AREAS_CACHE)
         return jsonify({"message": "Work Order Area created successfully!", "data": new_area}), 201
     except ValueError as ve:
         return jsonify({"error": str(ve)}), 400
@@ -35,6 +37,7 @@ def update_workorder_area(id):
     try:
         data = request.get_json()
         updated = WorkOrderArea.update(id, data)
+        cache_utils.invalidate(WORKORDER_AREAS_CACHE)
         return jsonify({"message": "Work Order Area updated successfully!", "data": updated}), 200
     except ValueError as ve:
         return jsonify({"error": str(ve)}), 404
@@ -45,6 +48,7 @@ def update_workorder_area(id):
 def delete_workorder_area(id):
     try:
         WorkOrderArea.delete(id)
+        cache_utils.invalidate(WORKORDER_AREAS_CACHE)
         return jsonify({"message": "Work Order Area deleted successfully!"}), 200
     except ValueError as ve:
         return jsonify({"error": str(ve)}), 404
@@ -48,7 +48,7 @@ def handle_get_assignment_attempts(workorder_id):
 # ----------------------------------------------------------------------
 # CONTROLLER 2: MANUALLY TRIGGER RETRY
 # ----------------------------------------------------------------------
-def handle_trigger_manual_retry(workorder_id, base_url):
+def handle_trigger_manual_retry(workorder_id, base_url, fanout=None):
     """
     Manually trigger automation for a workorder.
     Used when automation stopped or failed.
@@ -64,8 +64,16 @@ def handle_trigger_manual_retry(workorder_id, base_url):
         if workorder.STATUS == "Accepted":
             return {"error": "Workorder already accepted"}, 400
         
+        if fanout is not None:
+            try:
+                fanout = int(fanout)
+            except (TypeError, ValueError):
+                return {"error": "fanout must be an integer"}, 400
+            if fanout < 1:
+                return {"error": "fanout must be >= 1"}, 400
+
         # Trigger automation
-        success = trigger_automation_background(workorder_id, base_url)
+        success = trigger_automation_background(workorder_id, base_url, fanout)
         
         if success:
             return {
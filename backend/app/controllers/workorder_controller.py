@@ -1,12 +1,16 @@
-from flask import Blueprint, request, jsonify, current_app
-from ..models.workorder import WorkOrder
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from ..models.workorder import (
+    WorkOrder, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+)
 from ..models.contractor import Contractor
 from ..views.workorder_view import WorkOrderView
+from ..utils import blob_store
 from datetime import datetime, timedelta
 import base64
+import csv
+import io
 import json
 import os
-from werkzeug.utils import secure_filename
 
 workorder_bp = Blueprint("workorder", __name__)
 view = WorkOrderView()
@@ -85,15 +89,10 @@ def create_workorder():
                 image_dict[type_name] = []
                 for file in files:
                     if file and allowed_file(file.filename):
-                        filename = secure_filename(file.filename)
-                        unique_name = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{filename}"
-                        save_path = os.path.join(UPLOAD_FOLDER, unique_name)
-                        file.save(save_path)
-                        print(f"[DEBUG] Saved file: {save_path}")
-
-                        # relative path for DB
-                        rel_path = f"/uploads/{unique_name}"
-                        image_dict[type_name].append(rel_path)
+                        # Content-addressed: the same photo on several work orders is stored once
+                        content_key, _, _ = blob_store.store_file(file)
+                        print(f"[DEBUG] Stored file: {file.filename} -> {content_key}")
+                        image_dict[type_name].append(content_key)
                     else:
                         print(f"[DEBUG] File skipped (extension not allowed): {file.filename}")
 
@@ -129,12 +128,165 @@ def create_workorder():
         print(f"[ERROR] Exception in create_workorder: {str(e)}")
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
+# ------------------------------
+# Bulk create WorkOrders
+# ------------------------------
+BULK_BATCH_SIZE = 500
+NDJSON_MIMETYPES = ("application/x-ndjson", "application/ndjson")
+
+
+def _iter_bulk_payload():
+    """Yield (index, row) from a JSON array body or, lazily, from an NDJSON stream."""
+    if request.mimetype in NDJSON_MIMETYPES:
+        for idx, line in enumerate(request.stream):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield idx, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield idx, ValueError(f"Invalid JSON: {e.msg}")
+        return
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        raise ValueError("Body must be a JSON array or an NDJSON stream")
+    yield from enumerate(data)
+
+
+def _normalize_bulk_row(row):
+    """
+    Validate one bulk row and map it to workorder_t column values.
+    Returns (params, prefix, error). Child rows (parent_workorder set or
+    kind == "child") get W numbers, everything else P numbers.
+    """
+    if isinstance(row, Exception):
+        return None, None, str(row)
+    if not isinstance(row, dict):
+        return None, None, "Row must be a JSON object"
+
+    required = ["WORKORDER_TYPE", "WORKORDER_AREA", "REQUESTED_TIME_CLOSING"]
+    missing = [f for f in required if not row.get(f)]
+    if missing:
+        return None, None, f"Missing fields: {', '.join(missing)}"
+
+    try:
+        requested = datetime.fromisoformat(str(row["REQUESTED_TIME_CLOSING"]))
+    except ValueError:
+        return None, None, "REQUESTED_TIME_CLOSING must be a valid ISO datetime"
+
+    rate = row.get("RATE") or {"type_rates": {}, "total_rate": 0}
+    if isinstance(rate, str):
+        try:
+            rate = json.loads(rate)
+        except json.JSONDecodeError:
+            return None, None, "RATE must be JSON format"
+    if not isinstance(rate, dict):
+        return None, None, "RATE must be JSON format"
+
+    is_child = bool(row.get("parent_workorder")) or row.get("kind") == "child"
+
+    params = {
+        "WORKORDER": row.get("WORKORDER") or None,
+        "WORKORDER_TYPE": row["WORKORDER_TYPE"],
+        "WORKORDER_AREA": row["WORKORDER_AREA"],
+        "client": (row.get("CLIENT") or "").strip(),
+        "REQUESTED_TIME_CLOSING": requested,
+        "REMARKS": row.get("REMARKS", ""),
+        "STATUS": row.get("STATUS", "OPEN"),
+        "RATE": rate,
+        "image": row.get("image") or {},
+        "closing_images": [],
+        "parent_workorder": row.get("parent_workorder"),
+        "CREATED_T": datetime.utcnow(),
+        "created_by": row.get("created_by"),
+        "ticket_assignment_type": (row.get("ticket_assignment_type") or "").strip(),
+    }
+    return params, "W" if is_child else "P", None
+
+
+@workorder_bp.route("/bulk", methods=["POST"])
+def bulk_create_workorders():
+    """
+    Create many workorders in one request.
+    Body: JSON array of workorder objects, or NDJSON (one object per line,
+    Content-Type: application/x-ndjson) which is read as a stream.
+    Rows are inserted in multi-row batches of BULK_BATCH_SIZE. Invalid rows
+    are reported in "errors" by their 0-based index; other rows still go in.
+    """
+    created, errors = [], []
+    batch = []
+
+    def flush():
+        if batch:
+            ok, failed = WorkOrder.bulk_insert(batch)
+            created.extend(ok)
+            errors.extend(failed)
+            batch.clear()
+
+    try:
+        for idx, row in _iter_bulk_payload():
+            params, prefix, error = _normalize_bulk_row(row)
+            if error:
+                errors.append({"index": idx, "error": error})
+                continue
+            batch.append((idx, params, prefix))
+            if len(batch) >= BULK_BATCH_SIZE:
+                flush()
+        flush()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"[ERROR] Exception in bulk_create_workorders: {str(e)}")
+        return jsonify({
+            "error": f"Unexpected error: {str(e)}",
+            "created": created,
+            "errors": errors,
+        }), 500
+
+    errors.sort(key=lambda e: e["index"])
+    return jsonify({
+        "message": f"{len(created)} workorders created, {len(errors)} failed",
+        "created_count": len(created),
+        "failed_count": len(errors),
+        "created": created,
+        "errors": errors,
+    }), 201 if created else 400
+
+
 @workorder_bp.route("/", methods=["GET"])
 def get_all():
-    workorders, error = WorkOrder.get_all()
+    """
+    List workorders.
+    Without paging params this returns the full list (legacy behaviour).
+    With any of limit / cursor / fields it returns one keyset page:
+        {"items": [...], "next_cursor": "<opaque>" | null}
+    Query params:
+        - limit: page size (default 50, max 500)
+        - cursor: next_cursor from the previous page
+        - fields: comma separated projection, e.g. ID,WORKORDER,STATUS
+    """
+    if not any(k in request.args for k in ("limit", "cursor", "fields")):
+        workorders, error = WorkOrder.get_all()
+        if error:
+            return view.error(error, 400)
+        return view.list(workorders, 200)
+
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return view.error("limit must be an integer", 400)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    try:
+        fields = WorkOrder.resolve_fields(request.args.get("fields"))
+    except ValueError as e:
+        return view.error(str(e), 400)
+
+    page, error = WorkOrder.get_page(limit, request.args.get("cursor"), fields)
     if error:
         return view.error(error, 400)
-    return view.list(workorders, 200)
+    return jsonify(page), 200
 
 
 # @workorder_bp.route("/<int:id>", methods=["GET"])
@@ -171,6 +323,28 @@ def search_workorders():
     print(f"[DEBUG] API returning {len(workorders)} rows")
     return jsonify(workorders), 200
 
+@workorder_bp.route("/search/ranked", methods=["GET"])
+def search_workorders_ranked():
+    """
+    Ranked partial-match search.
+    Query params:
+        - q: partial workorder number, remark, client, area or contractor name
+        - page: 1-based page number (default 1)
+        - limit: page size (default 20, max 100)
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"items": [], "page": 1, "limit": 0, "has_more": False}), 200
+
+    page = max(1, request.args.get("page", 1, type=int))
+    limit = request.args.get("limit", DEFAULT_SEARCH_LIMIT, type=int)
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+
+    results, error = WorkOrder.search(query, page, limit)
+    if error:
+        return jsonify({"error": error}), 500
+    return jsonify(results), 200
+
 @workorder_bp.route("/<int:id>", methods=["PUT"])
 def update(id):
     workorder = WorkOrder.get_by_id(id)
@@ -191,14 +365,9 @@ def update(id):
 
         for file in closing_files:
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                unique_name = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{filename}"
-                save_path = os.path.join(UPLOAD_FOLDER, unique_name)
-                file.save(save_path)
-
-                print(f"[DEBUG] Saved closing image: {save_path}")
-                rel_path = f"/uploads/{unique_name}"
-                saved_closing_images.append(rel_path)
+                content_key, _, _ = blob_store.store_file(file)
+                print(f"[DEBUG] Stored closing image: {file.filename} -> {content_key}")
+                saved_closing_images.append(content_key)
             else:
                 print(f"[DEBUG] Skipped invalid closing file: {file.filename}")
 
@@ -273,9 +442,17 @@ def generate_workorder():
         if not workorder_type:
             return jsonify({"error": "workorder_type is required"}), 400
 
+        # Optional ?count=N reserves a block of numbers in one call
+        count = request.args.get("count", type=int)
+        if count:
+            workorder_ids = WorkOrder.reserve_workorder_ids("P", count)
+            return jsonify({"workorder": workorder_ids[0], "workorders": workorder_ids}), 200
+
         workorder_id = WorkOrder.generate_workorder_id(workorder_type)
         return jsonify({"workorder": workorder_id}), 200
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
@@ -287,9 +464,17 @@ def generates_workorder():
         if not workorder_type:
             return jsonify({"error": "workorder_type is required"}), 400
 
+        # Optional ?count=N reserves a block of numbers in one call
+        count = request.args.get("count", type=int)
+        if count:
+            workorder_ids = WorkOrder.reserve_workorder_ids("W", count)
+            return jsonify({"workorder": workorder_ids[0], "workorders": workorder_ids}), 200
+
         workorder_id = WorkOrder.generates_workorder_id(workorder_type)
         return jsonify({"workorder": workorder_id}), 200
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -345,6 +530,56 @@ def get_all_contractors():
 
 
 
+# Rows fetched per round trip when streaming an export
+EXPORT_BATCH_SIZE = 500
+
+
+def _apply_workorder_filters(query, status, from_date, to_date):
+    """Apply /filter status and date range. Raises ValueError on a bad date."""
+    # Filter by status if not "All"
+    if status.lower() != "all":
+        query = query.filter(WorkOrder.STATUS == status)
+
+    # Filter by date range if both dates provided
+    if from_date and to_date:
+        from_dt = datetime.strptime(from_date, "%Y-%m-%d")
+        to_dt = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1) - timedelta(seconds=1)
+        query = query.filter(WorkOrder.CREATED_T.between(from_dt, to_dt))
+
+    return query
+
+
+def _stream_export(query, fields, fmt):
+    """
+    Yield the export body row by row.
+    yield_per() makes psycopg2 use a server-side cursor, so only one batch
+    is held in memory at a time and the first rows go out immediately.
+    """
+    rows = query.order_by(WorkOrder.ID.asc()).yield_per(EXPORT_BATCH_SIZE)
+
+    if fmt == "ndjson":
+        for row in rows:
+            yield json.dumps(WorkOrder.serialize_projection(row, fields), default=str) + "\n"
+        return
+
+    # CSV: nested JSON values (RATE, images) are written as JSON strings
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    writer.writerow(fields)
+    yield buf.getvalue()
+
+    for row in rows:
+        buf.seek(0)
+        buf.truncate(0)
+        data = WorkOrder.serialize_projection(row, fields)
+        writer.writerow([
+            json.dumps(data[f]) if isinstance(data[f], (dict, list)) else data[f]
+            for f in fields
+        ])
+        yield buf.getvalue()
+
+
 @workorder_bp.route("/filter", methods=["GET"])
 def filter_workorders():
     """
@@ -353,30 +588,44 @@ def filter_workorders():
         - status: Pending, Accepted, Rejected, etc. (default: All)
         - from: YYYY-MM-DD
         - to: YYYY-MM-DD
+        - format: json (default), ndjson or csv. ndjson/csv are streamed.
+        - fields: comma separated projection for ndjson/csv exports
     """
     try:
         status = request.args.get("status", "All")
         from_date = request.args.get("from")
         to_date = request.args.get("to")
+        fmt = request.args.get("format", "json").lower()
 
-        query = WorkOrder.query
+        if fmt not in ("json", "ndjson", "csv"):
+            return jsonify({"error": "format must be json, ndjson or csv"}), 400
 
-        # Filter by status if not "All"
-        if status.lower() != "all":
-            query = query.filter(WorkOrder.STATUS == status)
-
-        # Filter by date range if both dates provided
-        if from_date and to_date:
+        if fmt == "json":
+            query = WorkOrder.query
+        else:
             try:
-                from_dt = datetime.strptime(from_date, "%Y-%m-%d")
-                to_dt = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1) - timedelta(seconds=1)
-                query = query.filter(WorkOrder.CREATED_T.between(from_dt, to_dt))
-            except ValueError:
-                return jsonify({"error": "Invalid date format, use YYYY-MM-DD"}), 400
-
-        workorders = query.all()
-        results = [wo.to_dict() for wo in workorders]
-        return jsonify(results), 200
+                fields = WorkOrder.resolve_fields(request.args.get("fields"))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            query = WorkOrder.projected_query(fields)
+
+        try:
+            query = _apply_workorder_filters(query, status, from_date, to_date)
+        except ValueError:
+            return jsonify({"error": "Invalid date format, use YYYY-MM-DD"}), 400
+
+        if fmt == "json":
+            workorders = query.all()
+            results = [wo.to_dict() for wo in workorders]
+            return jsonify(results), 200
+
+        mimetype = "application/x-ndjson" if fmt == "ndjson" else "text/csv"
+        filename = f"workorders_{datetime.now().strftime('%Y%m%d%H%M%S')}.{fmt}"
+        return Response(
+            stream_with_context(_stream_export(query, fields, fmt)),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename={filename}"},
+        )
 
     except Exception as e:
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500  
@@ -5,21 +5,28 @@ from datetime import datetime
 import os
 
 from app.models.database import db
+from app.models.workorder_automation_model import update_assignment_attempt_status
+from app.utils import assignment_events
 from app.models.workorder_mail_model import (
     get_contractor_from_db,
     get_workorder_from_db,
     get_expiry_minutes_from_db,
     get_admin_emails_from_db,
     build_assignment_email_html,
+    get_mail_image_mode,
     send_email_with_attachments,
     build_admin_notification_html,
     send_admin_notification_email,
     insert_email_notification_log,
     insert_workorder_lifecycle_log,
-    update_workorder_status_in_db,
-    get_first_workorder_image
+    claim_workorder_status,
+    build_no_longer_available_html,
+    get_workorder_image,
+    verify_workorder_image_url
 )
 
+WORKORDER_IMAGE_REQUIRE_SIGNATURE = os.getenv("WORKORDER_IMAGE_REQUIRE_SIGNATURE", "").lower() in ("1", "true", "yes")
+
 
 # ----------------------------------------------------------------------
 # CONTROLLER FUNCTIONS
@@ -72,11 +79,14 @@ def handle_send_acceptance_mail(workorder_id, request_data, base_url):
         # Rest of the code stays the same...
 
         # Build email HTML
+        image_mode = get_mail_image_mode(workorder.WORKORDER_AREA, workorder.client)
         html_body = build_assignment_email_html(
             workorder=workorder,
             contractor_name=contractor_name,
             response_url=response_url,
-            expiry_minutes=expiry_minutes
+            expiry_minutes=expiry_minutes,
+            image_mode=image_mode,
+            public_base_url=public_base_url
         )
 
         # Send email with attachments
@@ -84,7 +94,8 @@ def handle_send_acceptance_mail(workorder_id, request_data, base_url):
             workorder=workorder,
             contractor_email=contractor_email,
             contractor_name=contractor_name,
-            html_body=html_body
+            html_body=html_body,
+            embed_images=image_mode == "EMBED"
         )
 
         # Log notification
@@ -110,16 +121,24 @@ def handle_send_acceptance_mail(workorder_id, request_data, base_url):
         return {"error": str(e)}, 500
 
 
-def handle_get_workorder_image(workorder_id):
+def handle_get_workorder_image(workorder_id, index=1, size=None, args=None):
     """
-    Controller for serving workorder image.
+    Controller for serving workorder image ``index`` (1-based).
+    Signed links from LINK-mode e-mails (expires + sig in ``args``) must
+    verify; unsigned requests are refused when
+    WORKORDER_IMAGE_REQUIRE_SIGNATURE is set.
     Returns: tuple (image_bytes, image_type) or (error_html, status_code)
     """
+    args = args or {}
+    if "sig" in args or WORKORDER_IMAGE_REQUIRE_SIGNATURE:
+        if not verify_workorder_image_url(workorder_id, index, size, args):
+            return "<h3>Image link is invalid or has expired</h3>", 403
+
     workorder = get_workorder_from_db(workorder_id)
     if not workorder:
         return "<h3>Workorder not found</h3>", 404
 
-    img_bytes, img_type = get_first_workorder_image(workorder)
+    img_bytes, img_type = get_workorder_image(workorder, index)
     
     if not img_bytes:
         return "<h3>No image available</h3>", 404
@@ -152,6 +171,10 @@ def handle_respond_workorder_get(workorder_id, contractor_id, contractor_name, t
         </body></html>
         """, 403
 
+    # Already taken by another contractor
+    if workorder.STATUS == "Accepted":
+        return build_no_longer_available_html(workorder, contractor_name), 409
+
     # Generate response form
     html = f"""
     <html>
@@ -217,9 +240,13 @@ def handle_respond_workorder_post(workorder_id, contractor_id, contractor_name,
         </body></html>
         """, 403
 
-    # Update workorder status
+    # Claim the work order; with fan-out only the first accept wins
     status = "Accepted" if action == "accept" else "Rejected"
-    update_workorder_status_in_db(workorder, status)
+    if not claim_workorder_status(workorder, status):
+        update_assignment_attempt_status(
+            workorder_id, contractor_id, "WITHDRAWN", "Accepted by another contractor"
+        )
+        return build_no_longer_available_html(workorder, contractor_name), 409
 
     # Log lifecycle
     insert_workorder_lifecycle_log(
@@ -229,6 +256,12 @@ def handle_respond_workorder_post(workorder_id, contractor_id, contractor_name,
         remark=remark
     )
 
+    # Settle the automated attempt and wake the scheduler
+    update_assignment_attempt_status(
+        workorder_id, contractor_id, "ACCEPTED" if action == "accept" else "REJECTED", remark
+    )
+    assignment_events.publish(workorder_id, contractor_id, action, status)
+
     # Send admin notification
     # Send admin notification
     try:
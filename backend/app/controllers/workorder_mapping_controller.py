@@ -1,7 +1,7 @@
 from flask import Blueprint, jsonify, request
 from app.models.database import db
 from app.models.workorder import WorkOrder
-from app.models.workorder_mapping import WorkOrderMapping
+from app.models.workorder_mapping import WorkOrderMapping, MAX_TREE_DEPTH
 from app.views.workorder_mapping_view import WorkOrderMappingView
 
 workorder_mapping_bp = Blueprint("workorder_mapping", __name__)
@@ -25,28 +25,28 @@ def get_childs_for_parent(parent_wo):
         if not parent:
             return jsonify({"error": "Parent workorder not found"}), 404
 
-        # Already mapped children
-        mapped_childs = WorkOrderMapping.get_existing_children(
-            [wo.WORKORDER for wo in WorkOrder.query.all()]
-        )
-
-        # Eligible children
-        parent_types = [t.strip() for t in parent.WORKORDER_TYPE.split(",")]
-        childs = (
-            WorkOrder.query
-            .filter(
-                WorkOrder.WORKORDER.like("%W%"),
-                WorkOrder.WORKORDER_AREA == parent.WORKORDER_AREA,
-                WorkOrder.WORKORDER_TYPE.in_(parent_types),
-                ~WorkOrder.WORKORDER.in_(mapped_childs)  # exclude already mapped
-            )
-            .all()
-        )
+        # Eligible children (same area, matching type, not mapped yet)
+        childs = WorkOrderMapping.get_eligible_children(parent)
         return view.list_response(childs)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Fetch the whole Parent -> Child tree under a workorder
+@workorder_mapping_bp.route("/tree/<string:parent_wo>", methods=["GET"])
+def get_tree(parent_wo):
+    try:
+        max_depth = request.args.get("max_depth", MAX_TREE_DEPTH, type=int)
+        if max_depth < 0 or max_depth > MAX_TREE_DEPTH:
+            return jsonify({"error": f"max_depth must be between 0 and {MAX_TREE_DEPTH}"}), 400
+
+        tree = WorkOrderMapping.get_tree(parent_wo, max_depth)
+        if not tree:
+            return jsonify({"error": "Parent workorder not found"}), 404
+        return jsonify(tree), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @workorder_mapping_bp.route("/map", methods=["POST"])
 def map_workorders():
     try:
@@ -1,7 +1,10 @@
-from app.models.workorder_type import WorkOrderTypeModel
+from app.models.workorder_type import WorkOrderTypeModel, WORKORDER_TYPES_CACHE
+from app.utils import cache_utils
 
 def create_workorder_type(data):
-    return WorkOrderTypeModel.create(data)
+    result = WorkOrderTypeModel.create(data)
+    cache_utils.invalidate(WORKORDER_TYPES_CACHE)
+    return result
 
 def get_all_workorder_types():
     return WorkOrderTypeModel.get_all()
@@ -10,7 +13,11 @@ def get_workorder_type(id):
     return WorkOrderTypeModel.get_by_id(id)
 
 def update_workorder_type(id, data):
-    return WorkOrderTypeModel.update(id, data)
+    result = WorkOrderTypeModel.update(id, data)
+    cache_utils.invalidate(WORKORDER_TYPES_CACHE)
+    return result
 
 def delete_workorder_type(id):
-    return WorkOrderTypeModel.delete(id)
+    result = WorkOrderTypeModel.delete(id)
+    cache_utils.invalidate(WORKORDER_TYPES_CACHE)
+    return result
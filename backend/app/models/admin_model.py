@@ -1,5 +1,7 @@
 from sqlalchemy.sql import text
 from app.models.database import db
+from app.models.provider_model import CANDIDATE_CACHE
+from app.utils import assignment_events
 import pandas as pd
 from difflib import SequenceMatcher
 import re
@@ -168,6 +170,7 @@ class AdminModel:
         """)
         row = db.session.execute(sql, {"email": email}).fetchone()
         db.session.commit()
+        assignment_events.publish_invalidation(CANDIDATE_CACHE)
         return dict(row._mapping) if row else None
 
     @staticmethod
@@ -179,6 +182,7 @@ class AdminModel:
         """)
         result = db.session.execute(sql, {"email": email})
         db.session.commit()
+        assignment_events.publish_invalidation(CANDIDATE_CACHE)
         return result.rowcount > 0
 
     # ======================= CONTRACTORS (COMPANIES) =======================
@@ -1,8 +1,8 @@
 from sqlalchemy.sql import text
 from datetime import datetime
 from app.models.database import db
+from app.utils import blob_store
 from app.utils.encrypt_utils import decrypt_value
-import base64
 
 class ContractorModel:
 
@@ -123,7 +123,10 @@ class ContractorModel:
             SELECT 
                 u.user_uid, u.email_id, u.contact_number, u.mailing_address, u.billing_address,
                 u.alternate_contact_number, u.tin_number, u.status,
-                c.company_id, c.company_name, c.brn_number, c.logo_path, c.certificate_path,
+                c.company_id, c.company_name, c.brn_number, c.logo_blob, c.certificate_blob,
+                -- legacy BYTEA, only for rows migrate_blobs.py has not moved yet
+                CASE WHEN c.logo_blob IS NULL THEN c.logo_path END AS logo_path,
+                CASE WHEN c.certificate_blob IS NULL THEN c.certificate_path END AS certificate_path,
                 u.name  -- needed for admin approval mail
             FROM users_t u
             JOIN company_details_t c ON u.user_uid = c.user_uid
@@ -149,7 +152,8 @@ class ContractorModel:
 
         # ---- Fetch Bank Details ----
         sql_bank = text("""
-            SELECT bank_name, swift_code, holder_name, account_number, bank_statement
+            SELECT bank_name, swift_code, holder_name, account_number, bank_statement_blob,
+                   CASE WHEN bank_statement_blob IS NULL THEN bank_statement END AS bank_statement
             FROM company_bank_details_t
             WHERE company_id = :cid
         """)
@@ -160,13 +164,15 @@ class ContractorModel:
             # Convert DB row into clean JSON structure
             bank = dict(bank_row._mapping)
 
+            # bank_statement_blob / bank_statement (legacy BYTEA) are turned into
+            # the response value by the controller
             company["bank_details"] = {
                 "bank_name": bank["bank_name"],
                 "swift": decrypt_value(bank["swift_code"]) if bank["swift_code"] else None,
                 "holder_name": decrypt_value(bank["holder_name"]) if bank["holder_name"] else None,
                 "account_number": decrypt_value(bank["account_number"]) if bank["account_number"] else None,
-                "bank_statement": base64.b64encode(bank["bank_statement"]).decode()
-                if bank.get("bank_statement") else None
+                "bank_statement_blob": bank["bank_statement_blob"],
+                "bank_statement": bank["bank_statement"]
             }
         else:
             company["bank_details"] = None
@@ -176,7 +182,8 @@ class ContractorModel:
 
     # ---------------- UPDATE PROFILE ----------------
     @staticmethod
-    def update_company_profile(email, data, services, logo_bytes, cert_bytes):
+    def update_company_profile(email, data, services, logo, cert):
+        """``logo`` / ``cert`` are blob_store descriptors of new uploads, or None to keep the current file."""
 
         # Update common fields in users_t
         sql_user = text("""
@@ -202,22 +209,38 @@ class ContractorModel:
             "email": email
         })
 
-        # Update company specific info
+        # Update company specific info (a new document replaces the descriptor and clears the legacy BYTEA)
         sql_company = text("""
-            UPDATE company_details_t
+            WITH old AS (
+                SELECT company_id, logo_blob, certificate_blob
+                FROM company_details_t
+                WHERE user_uid = (SELECT user_uid FROM users_t WHERE email_id = :email)
+                FOR UPDATE
+            )
+            UPDATE company_details_t c
             SET company_name = :name, brn_number = :brn,
-                logo_path = COALESCE(:logo, logo_path),
-                certificate_path = COALESCE(:cert, certificate_path)
-            WHERE user_uid = (SELECT user_uid FROM users_t WHERE email_id = :email)
+                logo_blob = COALESCE(CAST(:logo AS JSONB), c.logo_blob),
+                logo_path = CASE WHEN CAST(:logo AS JSONB) IS NULL THEN c.logo_path END,
+                certificate_blob = COALESCE(CAST(:cert AS JSONB), c.certificate_blob),
+                certificate_path = CASE WHEN CAST(:cert AS JSONB) IS NULL THEN c.certificate_path END
+            FROM old
+            WHERE c.company_id = old.company_id
+            RETURNING old.logo_blob AS old_logo, old.certificate_blob AS old_cert
         """)
 
-        db.session.execute(sql_company, {
+        old = db.session.execute(sql_company, {
             "name": data["company_name"],
             "brn": data["brn_number"],
-            "logo": logo_bytes,
-            "cert": cert_bytes,
+            "logo": blob_store.descriptor_param(logo),
+            "cert": blob_store.descriptor_param(cert),
             "email": email
-        })
+        }).fetchone()
+
+        if old:
+            blob_store.release_documents([
+                old.old_logo if logo else None,
+                old.old_cert if cert else None,
+            ])
 
         # Update services (clear + add new)
         user_uid_sql = text("SELECT user_uid FROM users_t WHERE email_id = :email")
@@ -244,7 +267,8 @@ class ContractorModel:
 
     # ---------------- UPDATE BANK ----------------
     @staticmethod
-    def update_company_bank(email, bank_details, statement_bytes):
+    def update_company_bank(email, bank_details, statement):
+        """``statement``: blob_store descriptor of a new bank statement, or None."""
         try:
             # Step 1: Fetch company_id using updated structure
             sql_id = text("""
@@ -282,16 +306,29 @@ class ContractorModel:
             })
 
             # Step 3: Update bank statement (optional)
-            if statement_bytes:
+            if statement:
                 sql_statement = text("""
-                    UPDATE company_bank_details_t
-                    SET bank_statement = :statement
-                    WHERE company_id = :id
+                    WITH old AS (
+                        SELECT company_bank_id, bank_statement_blob
+                        FROM company_bank_details_t
+                        WHERE company_id = :id
+                        FOR UPDATE
+                    )
+                    UPDATE company_bank_details_t b
+                    SET bank_statement_blob = CAST(:statement AS JSONB),
+                        bank_statement = NULL
+                    FROM old
+                    WHERE b.company_bank_id = old.company_bank_id
+                    RETURNING old.bank_statement_blob AS old_statement
                 """)
-                db.session.execute(sql_statement, {
-                    "statement": statement_bytes,
+                rows = db.session.execute(sql_statement, {
+                    "statement": blob_store.descriptor_param(statement),
                     "id": company_id
-                })
+                }).fetchall()
+                if len(rows) > 1:
+                    # store_document took one reference; every updated row holds one
+                    blob_store.add_reference(statement["key"], count=len(rows) - 1)
+                blob_store.release_documents([r.old_statement for r in rows])
 
             db.session.commit()
             return True
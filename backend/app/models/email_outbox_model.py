@@ -0,0 +1,131 @@
+"""
+Email Outbox - email_outbox_t
+File: app/models/email_outbox_model.py
+
+enqueue_email() only INSERTs; it never commits. Call it before the model
+call that commits the business change, so the mail and the change land in
+the same transaction (or neither does). run_mail_worker.py delivers it.
+
+Workers claim due rows with FOR UPDATE SKIP LOCKED and push
+next_attempt_at forward by CLAIM_LEASE_SECONDS before sending, so the row
+lock is held only for the claim and a crashed worker's rows come back
+once the lease runs out. Delivery is therefore at-least-once.
+"""
+
+import json
+import os
+import traceback
+
+from sqlalchemy import text
+
+from app.models.database import db
+
+MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+# Retry n waits BACKOFF_BASE_SECONDS * 2^(n-1), capped at BACKOFF_MAX_SECONDS
+BACKOFF_BASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "30"))
+BACKOFF_MAX_SECONDS = 3600
+CLAIM_LEASE_SECONDS = 300
+
+
+def enqueue_email(to_email, subject, body, body_type="plain", attachment=None,
+                  attachment_name=None, idempotency_key=None, profile="default",
+                  attachment_certificate=None):
+    """
+    Queue a mail (no commit). A second call with the same idempotency_key
+    is ignored. Returns the outbox id, or None for a duplicate.
+    ``attachment_certificate`` (certificate details) is rendered and
+    attached by the worker (see pdf_utils).
+    """
+    row = db.session.execute(text("""
+        INSERT INTO email_outbox_t
+            (idempotency_key, profile, to_email, subject, body, body_type,
+             attachment, attachment_name, attachment_certificate)
+        VALUES (:key, :profile, :to_email, :subject, :body, :body_type,
+                :attachment, :attachment_name, CAST(:certificate AS JSON))
+        ON CONFLICT (idempotency_key) WHERE idempotency_key IS NOT NULL DO NOTHING
+        RETURNING id
+    """), {
+        "key": idempotency_key,
+        "profile": profile,
+        "to_email": to_email,
+        "subject": subject,
+        "body": body,
+        "body_type": body_type,
+        "attachment": attachment,
+        "attachment_name": attachment_name,
+        "certificate": json.dumps(attachment_certificate, default=str) if attachment_certificate else None,
+    }).fetchone()
+    return row.id if row else None
+
+
+def claim_due_emails(limit):
+    """Claim up to ``limit`` due rows for this worker and commit the lease."""
+    rows = db.session.execute(text("""
+        UPDATE email_outbox_t
+        SET attempts = attempts + 1,
+            next_attempt_at = NOW() + make_interval(secs => :lease)
+        WHERE id IN (
+            SELECT id FROM email_outbox_t
+            WHERE status = 'PENDING' AND next_attempt_at <= NOW()
+            ORDER BY next_attempt_at
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING *
+    """), {"lease": CLAIM_LEASE_SECONDS, "limit": limit}).fetchall()
+    db.session.commit()
+    return rows
+
+
+def mark_sent(email_id):
+    db.session.execute(text("""
+        UPDATE email_outbox_t
+        SET status = 'SENT', sent_at = NOW(), last_error = NULL,
+            attachment = NULL
+        WHERE id = :id
+    """), {"id": email_id})
+    db.session.commit()
+
+
+def backoff_seconds(attempts):
+    return min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS)
+
+
+def mark_failed(email_id, attempts, error):
+    """Schedule a retry, or move the row to DEAD after MAX_ATTEMPTS. Returns the new status."""
+    status = "DEAD" if attempts >= MAX_ATTEMPTS else "PENDING"
+    db.session.execute(text("""
+        UPDATE email_outbox_t
+        SET status = :status,
+            last_error = :error,
+            next_attempt_at = NOW() + make_interval(secs => :delay)
+        WHERE id = :id
+    """), {"id": email_id, "status": status, "error": str(error)[:2000], "delay": backoff_seconds(attempts)})
+    db.session.commit()
+    return status
+
+
+def requeue_dead(email_ids=None):
+    """Give DEAD mails (all, or the given ids) a fresh set of attempts."""
+    try:
+        result = db.session.execute(text("""
+            UPDATE email_outbox_t
+            SET status = 'PENDING', attempts = 0, next_attempt_at = NOW()
+            WHERE status = 'DEAD'
+              AND (CAST(:ids AS BIGINT[]) IS NULL OR id = ANY(:ids))
+        """), {"ids": email_ids})
+        db.session.commit()
+        return result.rowcount, None
+    except Exception as e:
+        db.session.rollback()
+        traceback.print_exc()
+        return None, str(e)
+
+
+def count_outbox_backlog():
+    rows = db.session.execute(text("""
+        SELECT status, COUNT(*) AS n FROM email_outbox_t
+        WHERE status IN ('PENDING', 'DEAD')
+        GROUP BY status
+    """)).fetchall()
+    return {(r.status,): r.n for r in rows}
@@ -0,0 +1,103 @@
+"""
+Email Outbox Workers - deliver email_outbox_t
+File: app/models/email_outbox_worker.py
+
+run_mail_worker.py starts a pool of threads. Each one claims a small batch
+of due rows (SKIP LOCKED, so workers in any number of processes never
+pick the same row), sends them through smtp_pool and records the result:
+SENT, a retry with exponential back-off, or DEAD after MAX_ATTEMPTS.
+"""
+
+import os
+import threading
+import traceback
+
+from app.models.database import db
+from app.models.email_outbox_model import claim_due_emails, mark_failed, mark_sent
+from app.utils import metrics, pdf_utils
+from app.utils.email_utils import send_email
+
+OUTBOX_WORKERS = int(os.getenv("EMAIL_OUTBOX_WORKERS", "4"))
+BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "10"))
+POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "2"))
+
+
+def deliver(row):
+    attachment = row.attachment
+    certificate = getattr(row, "attachment_certificate", None)
+    if attachment is None and certificate:
+        # Usually already rendered by the approval request; else renders now
+        attachment = pdf_utils.certificate_pdf(certificate)
+    send_email(
+        row.to_email,
+        row.subject,
+        row.body,
+        attachment=attachment,
+        attachment_name=row.attachment_name,
+        subtype=row.body_type,
+        profile=row.profile,
+    )
+
+
+class OutboxWorkerPool:
+    def __init__(self, app, workers=OUTBOX_WORKERS, batch_size=BATCH_SIZE, poll_seconds=POLL_SECONDS):
+        self.app = app
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, name=f"mail-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        print(f"[OUTBOX] Started ({self.workers} workers)")
+
+    def run_forever(self):
+        self.start()
+        try:
+            while not self._stopped.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stopped.set()
+        for t in self._threads:
+            t.join()
+        print("[OUTBOX] Stopped")
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            try:
+                with self.app.app_context():
+                    try:
+                        sent = self.run_once()
+                    finally:
+                        db.session.remove()
+            except Exception as e:
+                print(f"[OUTBOX] Worker error: {e}")
+                traceback.print_exc()
+                sent = 0
+            if not sent:
+                self._stopped.wait(self.poll_seconds)
+
+    def run_once(self):
+        """Claim and deliver one batch. Returns the number of rows claimed."""
+        rows = claim_due_emails(self.batch_size)
+        for row in rows:
+            try:
+                deliver(row)
+            except Exception as e:
+                status = mark_failed(row.id, row.attempts, e)
+                result = "dead" if status == "DEAD" else "retry"
+                metrics.EMAIL_OUTBOX_DELIVERIES.inc(result)
+                print(f"[OUTBOX] #{row.id} to {row.to_email} failed (attempt {row.attempts}, {result}): {e}")
+                continue
+            mark_sent(row.id)
+            metrics.EMAIL_OUTBOX_DELIVERIES.inc("sent")
+        return len(rows)
@@ -1,6 +1,31 @@
 from datetime import datetime, timedelta
 from sqlalchemy.sql import text
 from app.models.database import db
+from app.utils import assignment_events, blob_store
+
+# Cache of ranked assignment candidates (workorder_automation_model)
+CANDIDATE_CACHE = "contractor_candidates"
+
+# Rebuild one provider's rows in provider_area_index_t from services_t.
+# Every non-empty state / city / region is an area key (lower-cased);
+# the rate is the provider's cheapest service there.
+CLEAR_AREA_INDEX_SQL = text("""
+    DELETE FROM provider_area_index_t
+    WHERE provider_id IN (SELECT provider_id FROM providers_t WHERE user_uid = :uid)
+""")
+FILL_AREA_INDEX_SQL = text("""
+    INSERT INTO provider_area_index_t (area_key, provider_id, rate)
+    SELECT a.area_key, p.provider_id, MIN(s.service_rate)
+    FROM services_t s
+    JOIN providers_t p ON p.user_uid = s.user_uid
+    CROSS JOIN LATERAL (
+        VALUES (lower(btrim(s.state))), (lower(btrim(s.city))), (lower(btrim(s.region)))
+    ) AS a(area_key)
+    WHERE s.user_uid = :uid
+      AND s.service_type = 0
+      AND a.area_key <> ''
+    GROUP BY a.area_key, p.provider_id
+""")
 
 
 class ProviderModel:
@@ -139,7 +164,11 @@ class ProviderModel:
                 u.user_uid, u.email_id, u.name, u.contact_number, u.alternate_contact_number, 
                 u.billing_address, u.mailing_address, u.tin_number, u.status,
                 p.provider_id, p.id_type, p.id_number, 
-                p.profile_pic, p.authorized_certificate
+                p.profile_pic_blob, p.authorized_certificate_blob,
+                -- legacy BYTEA, only for rows migrate_blobs.py has not moved yet
+                CASE WHEN p.profile_pic_blob IS NULL THEN p.profile_pic END AS profile_pic,
+                CASE WHEN p.authorized_certificate_blob IS NULL
+                     THEN p.authorized_certificate END AS authorized_certificate
             FROM users_t u
             JOIN providers_t p ON p.user_uid = u.user_uid
             WHERE u.email_id = :email
@@ -153,10 +182,15 @@ class ProviderModel:
         sql = text("UPDATE users_t SET status=:status WHERE email_id=:email")
         db.session.execute(sql, {"status": status, "email": email})
         db.session.commit()
+        assignment_events.publish_invalidation(CANDIDATE_CACHE)
 
     @staticmethod
     def update_provider(email, data):
-        """Update shared values in users_t and provider-specific in providers_t"""
+        """
+        Update shared values in users_t and provider-specific in providers_t.
+        data["profile_pic"] / data["authorized_certificate"] are blob_store
+        descriptors of new uploads, or None to keep the current file.
+        """
 
         # Update users_t
         sql_user = text("""
@@ -181,25 +215,43 @@ class ProviderModel:
             "email": email
         })
 
-        # Update providers_t
+        # Update providers_t (a new document replaces the descriptor and clears the legacy BYTEA)
         sql_provider = text("""
-            UPDATE providers_t
+            WITH old AS (
+                SELECT provider_id, profile_pic_blob, authorized_certificate_blob
+                FROM providers_t
+                WHERE user_uid = (SELECT user_uid FROM users_t WHERE email_id = :email)
+                FOR UPDATE
+            )
+            UPDATE providers_t p
             SET id_type = :id_type,
                 id_number = :id_number,
-                profile_pic = :profile_pic,
-                authorized_certificate = :certificate
-            WHERE user_uid = (SELECT user_uid FROM users_t WHERE email_id = :email)
+                profile_pic_blob = COALESCE(CAST(:profile_pic AS JSONB), p.profile_pic_blob),
+                profile_pic = CASE WHEN CAST(:profile_pic AS JSONB) IS NULL THEN p.profile_pic END,
+                authorized_certificate_blob = COALESCE(CAST(:certificate AS JSONB), p.authorized_certificate_blob),
+                authorized_certificate = CASE WHEN CAST(:certificate AS JSONB) IS NULL
+                                              THEN p.authorized_certificate END
+            FROM old
+            WHERE p.provider_id = old.provider_id
+            RETURNING old.profile_pic_blob AS old_profile_pic, old.authorized_certificate_blob AS old_certificate
         """)
 
-        db.session.execute(sql_provider, {
+        old = db.session.execute(sql_provider, {
             "id_type": data["id_type"],
             "id_number": data["id_number"],
-            "profile_pic": data["profile_pic"],
-            "certificate": data["authorized_certificate"],
+            "profile_pic": blob_store.descriptor_param(data["profile_pic"]),
+            "certificate": blob_store.descriptor_param(data["authorized_certificate"]),
             "email": email
-        })
+        }).fetchone()
+
+        if old:
+            blob_store.release_documents([
+                old.old_profile_pic if data["profile_pic"] else None,
+                old.old_certificate if data["authorized_certificate"] else None,
+            ])
 
         db.session.commit()
+        assignment_events.publish_invalidation(CANDIDATE_CACHE)
 
     # ============================================================
     #  SECTION 5 — SERVICES (NOW IN services_t)
@@ -209,7 +261,9 @@ class ProviderModel:
     def delete_services(user_uid):
         sql = text("DELETE FROM services_t WHERE user_uid = :uid AND service_type = 0")
         db.session.execute(sql, {"uid": user_uid})
+        ProviderModel.refresh_area_index(user_uid)
         db.session.commit()
+        assignment_events.publish_invalidation(CANDIDATE_CACHE)
 
     @staticmethod
     def insert_services(user_uid, bulk_data):
@@ -229,7 +283,15 @@ class ProviderModel:
         } for r in bulk_data]
 
         db.session.execute(sql, data)
+        ProviderModel.refresh_area_index(user_uid)
         db.session.commit()
+        assignment_events.publish_invalidation(CANDIDATE_CACHE)
+
+    @staticmethod
+    def refresh_area_index(user_uid):
+        """Re-derive the provider's area index rows (no commit)."""
+        db.session.execute(CLEAR_AREA_INDEX_SQL, {"uid": user_uid})
+        db.session.execute(FILL_AREA_INDEX_SQL, {"uid": user_uid})
 
     @staticmethod
     def get_services(user_uid):
@@ -260,7 +322,8 @@ class ProviderModel:
     def get_bank(provider_id):
         sql = text("""
             SELECT bank_name, swift_code, bank_account_number, 
-                   account_holder_name, bank_statement
+                   account_holder_name, bank_statement_blob,
+                   CASE WHEN bank_statement_blob IS NULL THEN bank_statement END AS bank_statement
             FROM providers_bank_details_t
             WHERE provider_id = :id
             LIMIT 1
@@ -281,33 +344,47 @@ class ProviderModel:
 
     @staticmethod
     def update_bank(provider_id, bank_name, swift, acc, holder, statement):
+        """``statement`` is the blob_store descriptor of the new bank statement."""
         sql = text("""
-            UPDATE providers_bank_details_t
+            WITH old AS (
+                SELECT provider_bank_id, bank_statement_blob
+                FROM providers_bank_details_t
+                WHERE provider_id = :provider_id
+                FOR UPDATE
+            )
+            UPDATE providers_bank_details_t b
             SET 
                 bank_name = :bank_name,
                 swift_code = :swift,
                 bank_account_number = :acc,
                 account_holder_name = :holder,
-                bank_statement = :statement
-            WHERE provider_id = :provider_id
+                bank_statement_blob = CAST(:statement AS JSONB),
+                bank_statement = NULL
+            FROM old
+            WHERE b.provider_bank_id = old.provider_bank_id
+            RETURNING old.bank_statement_blob AS old_statement
         """)
-        db.session.execute(sql, {
+        rows = db.session.execute(sql, {
             "provider_id": provider_id,
             "bank_name": bank_name,
             "swift": swift,
             "acc": acc,
             "holder": holder,
-            "statement": statement
-        })
+            "statement": blob_store.descriptor_param(statement)
+        }).fetchall()
+        if len(rows) > 1:
+            # store_document took one reference; every updated row holds one
+            blob_store.add_reference(statement["key"], count=len(rows) - 1)
+        blob_store.release_documents([r.old_statement for r in rows])
         db.session.commit()
 
     @staticmethod
     def insert_bank(provider_id, bank_name, swift, acc, holder, statement):
         sql = text("""
             INSERT INTO providers_bank_details_t 
-                (provider_id, bank_name, swift_code, bank_account_number, account_holder_name, bank_statement)
+                (provider_id, bank_name, swift_code, bank_account_number, account_holder_name, bank_statement_blob)
             VALUES 
-                (:provider_id, :bank_name, :swift, :acc, :holder, :statement)
+                (:provider_id, :bank_name, :swift, :acc, :holder, CAST(:statement AS JSONB))
         """)
         db.session.execute(sql, {
             "provider_id": provider_id,
@@ -315,6 +392,6 @@ class ProviderModel:
             "swift": swift,
             "acc": acc,
             "holder": holder,
-            "statement": statement
+            "statement": blob_store.descriptor_param(statement)
         })
         db.session.commit()
@@ -1,12 +1,60 @@
 from .database import db
-from sqlalchemy import text, func, LargeBinary
+from .workorder_area import WORKORDER_AREAS_CACHE
+from .workorder_type import WORKORDER_TYPES_CACHE
+from ..utils import blob_store, cache_utils
+from sqlalchemy import text, func, LargeBinary, tuple_, insert, literal_column
+from collections import Counter
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import JSON
 import json
 import base64
+import os
 from sqlalchemy.dialects.postgresql import JSON, JSONB
 
 
+# Public field name (as returned by to_dict) -> model attribute.
+# RATE and total_rate are both read from the RATE JSON column.
+LIST_FIELDS = {
+    "ID": "ID",
+    "WORKORDER": "WORKORDER",
+    "WORKORDER_TYPE": "WORKORDER_TYPE",
+    "WORKORDER_AREA": "WORKORDER_AREA",
+    "CREATED_T": "CREATED_T",
+    "REQUESTED_TIME_CLOSING": "REQUESTED_TIME_CLOSING",
+    "REMARKS": "REMARKS",
+    "STATUS": "STATUS",
+    "RATE": "RATE",
+    "total_rate": "RATE",
+    "closing_images": "closing_images",
+    "image": "image",
+    "CLIENT": "client",
+    "ticket_assignment_type": "ticket_assignment_type",
+    "created_by": "created_by",
+    "parent_workorder": "parent_workorder",
+}
+
+# Heavy JSONB image columns are only returned when asked for via fields=
+DEFAULT_LIST_FIELDS = [f for f in LIST_FIELDS if f not in ("image", "closing_images")]
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rows with no CREATED_T sort as if created at the epoch (last, newest first);
+# the expression must match the index in migrations/013.
+KEYSET_EPOCH = datetime(1970, 1, 1)
+KEYSET_CREATED_SQL = "COALESCE(\"CREATED_T\", TIMESTAMP '1970-01-01 00:00:00')"
+
+# Postgres sequence backing the 6-digit WORKORDER serial (see migrations/002)
+WORKORDER_SEQUENCE = "workorder_serial_seq"
+MAX_WORKORDER_ID_BLOCK = 10000
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+MASTER_DATA_TTL = int(os.getenv("MASTER_DATA_CACHE_TTL", "300"))
+WORKORDER_TYPES = cache_utils.get_cache(WORKORDER_TYPES_CACHE, ttl_seconds=MASTER_DATA_TTL)
+WORKORDER_AREAS = cache_utils.get_cache(WORKORDER_AREAS_CACHE, ttl_seconds=MASTER_DATA_TTL)
+
+
 
 
 class WorkOrder(db.Model):
@@ -92,6 +140,54 @@ class WorkOrder(db.Model):
             return None, str(e)
 
     
+    @classmethod
+    def bulk_insert(cls, rows):
+        """
+        Insert one batch of normalized rows with a single multi-row
+        INSERT ... RETURNING and one commit.
+        rows: list of (index, params, prefix), params keyed by column name.
+        Rows without a WORKORDER get numbers from one block reservation per
+        prefix. If the batch insert fails it is retried row by row inside
+        savepoints, so a bad row is reported instead of sinking the batch.
+        Returns (created, errors).
+        """
+        for prefix in ("P", "W"):
+            missing = [params for _, params, pf in rows if pf == prefix and not params.get("WORKORDER")]
+            if missing:
+                numbers = cls.reserve_workorder_ids(prefix, len(missing))
+                for params, number in zip(missing, numbers):
+                    params["WORKORDER"] = number
+
+        table = cls.__table__
+        stmt = insert(table).returning(table.c.ID, table.c.WORKORDER, sort_by_parameter_order=True)
+
+        created, errors = [], []
+        try:
+            with db.session.begin_nested():
+                result = db.session.execute(stmt, [params for _, params, _ in rows]).all()
+            created = [
+                {"index": idx, "ID": r.ID, "WORKORDER": r.WORKORDER}
+                for (idx, _, _), r in zip(rows, result)
+            ]
+        except Exception as batch_error:
+            print(f"[WARN] bulk_insert batch failed, retrying row by row: {batch_error}")
+            for idx, params, _ in rows:
+                try:
+                    with db.session.begin_nested():
+                        r = db.session.execute(stmt, [params]).one()
+                    created.append({"index": idx, "ID": r.ID, "WORKORDER": r.WORKORDER})
+                except Exception as e:
+                    errors.append({"index": idx, "error": str(getattr(e, "orig", e)).strip()})
+
+        # Rows may point at images already in the blob store; count those references
+        created_idx = {c["index"] for c in created}
+        blob_store.add_references(
+            key for idx, params, _ in rows if idx in created_idx
+            for key in blob_store.iter_keys(params.get("image"))
+        )
+        db.session.commit()
+        return created, errors
+
     @classmethod
     def get_all(cls):
         """Get all workorders"""
@@ -100,16 +196,57 @@ class WorkOrder(db.Model):
         except Exception as e:
             return None, str(e)
     
+    @classmethod
+    def get_page(cls, limit=DEFAULT_PAGE_SIZE, cursor=None, fields=None):
+        """
+        Keyset page of workorders, newest first.
+        Ordered by (CREATED_T, ID) so each page is an index range scan
+        regardless of table size; a NULL CREATED_T counts as KEYSET_EPOCH.
+        Returns ({"items", "next_cursor"}, error).
+        """
+        try:
+            fields = fields or DEFAULT_LIST_FIELDS
+            query = cls.projected_query(fields)
+            created = literal_column(KEYSET_CREATED_SQL)
+
+            if cursor:
+                created_t, last_id = cls.decode_cursor(cursor)
+                query = query.filter(tuple_(created, cls.ID) < (created_t, last_id))
+
+            rows = (
+                query.order_by(created.desc(), cls.ID.desc())
+                .limit(limit + 1)
+                .all()
+            )
+
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            next_cursor = None
+            if has_more:
+                next_cursor = cls.encode_cursor(rows[-1].CREATED_T or KEYSET_EPOCH, rows[-1].ID)
+
+            return {
+                "items": [cls.serialize_projection(r, fields) for r in rows],
+                "next_cursor": next_cursor,
+            }, None
+        except Exception as e:
+            return None, str(e)
+
     @classmethod
     def get_by_id(cls, id):
         """Get single workorder by ID"""
         return cls.query.get(id)
     
     def update(self, data):
-        """Update workorder"""
+        """Update workorder. Replaced image keys move their blob references."""
         try:
             for key, value in data.items():
                 if hasattr(self, key):
+                    if key in ("image", "closing_images"):
+                        old_keys = Counter(blob_store.iter_keys(getattr(self, key)))
+                        new_keys = Counter(blob_store.iter_keys(value))
+                        blob_store.add_references((new_keys - old_keys).elements())
+                        blob_store.release_references((old_keys - new_keys).elements())
                     setattr(self, key, value)
             db.session.commit()
             return True, None
@@ -118,8 +255,11 @@ class WorkOrder(db.Model):
             return False, str(e)
     
     def delete(self):
-        """Delete workorder"""
+        """Delete workorder and release its stored images"""
         try:
+            blob_store.release_references(
+                list(blob_store.iter_keys(self.image)) + list(blob_store.iter_keys(self.closing_images))
+            )
             db.session.delete(self)
             db.session.commit()
             return True, None
@@ -133,23 +273,25 @@ class WorkOrder(db.Model):
     # ──────────────────────────────────────────────
     @classmethod
     def get_workorder_types(cls):
-        """Fetch all active workorder types"""
+        """Fetch all active workorder types (cached)"""
         try:
-            result = db.session.execute(
-                text("SELECT WORKORDER_TYPE FROM WORKORDER_TYPE_T WHERE STATUS='ACTIVE'")
-            ).fetchall()
-            return [r[0] for r in result], None
+            return WORKORDER_TYPES.get_or_load("active", lambda: [
+                r[0] for r in db.session.execute(
+                    text("SELECT WORKORDER_TYPE FROM WORKORDER_TYPE_T WHERE STATUS='ACTIVE'")
+                ).fetchall()
+            ]), None
         except Exception as e:
             return None, str(e)
 
     @classmethod
     def get_workorder_areas(cls):
-        """Fetch all active workorder areas"""
+        """Fetch all active workorder areas (cached)"""
         try:
-            result = db.session.execute(
-                text("SELECT WORKORDER_AREA FROM WORKORDER_AREA_T WHERE STATUS='ACTIVE'")
-            ).fetchall()
-            return [r[0] for r in result], None
+            return WORKORDER_AREAS.get_or_load("active", lambda: [
+                r[0] for r in db.session.execute(
+                    text("SELECT WORKORDER_AREA FROM WORKORDER_AREA_T WHERE STATUS='ACTIVE'")
+                ).fetchall()
+            ]), None
         except Exception as e:
             return None, str(e)
         
@@ -181,7 +323,7 @@ class WorkOrder(db.Model):
             print(f"[DEBUG] Number of rows returned: {len(results)}")
     
             combined = []
-            for idx, row in enumerate(results):
+            for row in results:
                 row_dict = dict(row)  # now safe
     
                 # Convert datetime columns to ISO format
@@ -197,16 +339,103 @@ class WorkOrder(db.Model):
  
                 combined.append(row_dict)
     
-                if idx == 0:
-                    print(f"[DEBUG] First row keys: {row_dict.keys()}")
-    
-            print(f"[DEBUG] Combined results: {combined}")
             return combined, None
     
         except Exception as e:
             print(f"[ERROR] search_by_workorder_raw exception: {e}")
             return None, str(e)
 
+    @classmethod
+    def search(cls, query, page=1, limit=DEFAULT_SEARCH_LIMIT):
+        """
+        Ranked, paginated search for the operator search box.
+        Matches WORKORDER (exact / prefix / substring), REMARKS, client, area
+        and lifecycle contractor_name. Every branch of the candidate UNION is
+        served by an index from migrations/003 (text_pattern_ops for the
+        prefix, pg_trgm GIN for substrings). Queries shorter than 3 characters
+        only use the prefix branch, since trigrams cannot help them.
+        Returns ({"items", "page", "limit", "has_more"}, error).
+        """
+        try:
+            q = query.strip()
+            escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params = {
+                "q": q,
+                "q_upper": q.upper(),
+                "prefix": f"{escaped.upper()}%",
+                "contains": f"%{escaped}%",
+                "limit": limit + 1,
+                "offset": (page - 1) * limit,
+            }
+
+            fuzzy_branches = ""
+            if len(q) >= 3:
+                fuzzy_branches = """
+                    UNION
+                    SELECT "ID" FROM workorder_t
+                    WHERE "WORKORDER" ILIKE :contains
+                       OR "REMARKS" ILIKE :contains
+                       OR client ILIKE :contains
+                       OR "WORKORDER_AREA" ILIKE :contains
+                    UNION
+                    SELECT w."ID"
+                    FROM workorder_life_cycle_t b
+                    JOIN workorder_t w ON w."WORKORDER" = b.workorder
+                    WHERE b.contractor_name ILIKE :contains
+                """
+
+            sql = text(f"""
+                WITH hits AS (
+                    SELECT "ID" FROM workorder_t WHERE "WORKORDER" LIKE :prefix
+                    {fuzzy_branches}
+                )
+                SELECT
+                    a."ID", a."WORKORDER", a."WORKORDER_TYPE", a."WORKORDER_AREA",
+                    a."CREATED_T", a."REQUESTED_TIME_CLOSING", a."REMARKS", a."STATUS",
+                    a.client AS "CLIENT", a.parent_workorder,
+                    lc.contractor_name,
+                    CASE
+                        WHEN a."WORKORDER" = :q_upper THEN 3.0
+                        WHEN a."WORKORDER" LIKE :prefix THEN 2.0
+                        ELSE 0.0
+                    END
+                    + GREATEST(
+                        similarity(a."WORKORDER", :q),
+                        similarity(COALESCE(a."REMARKS", ''), :q),
+                        similarity(COALESCE(a.client, ''), :q),
+                        similarity(COALESCE(a."WORKORDER_AREA", ''), :q),
+                        similarity(COALESCE(lc.contractor_name, ''), :q)
+                    ) AS rank
+                FROM hits
+                JOIN workorder_t a ON a."ID" = hits."ID"
+                LEFT JOIN LATERAL (
+                    SELECT b.contractor_name
+                    FROM workorder_life_cycle_t b
+                    WHERE b.workorder = a."WORKORDER"
+                    ORDER BY (b.contractor_name ILIKE :contains) DESC, b.created_t DESC
+                    LIMIT 1
+                ) lc ON TRUE
+                ORDER BY rank DESC, a."ID" DESC
+                LIMIT :limit OFFSET :offset
+            """)
+
+            rows = db.session.execute(sql, params).mappings().all()
+            has_more = len(rows) > limit
+
+            items = []
+            for row in rows[:limit]:
+                item = dict(row)
+                if isinstance(item["CREATED_T"], datetime):
+                    item["CREATED_T"] = item["CREATED_T"].isoformat()
+                item["rank"] = float(item["rank"])
+                items.append(item)
+
+            return {"items": items, "page": page, "limit": limit, "has_more": has_more}, None
+
+        except Exception as e:
+            print(f"[ERROR] WorkOrder.search: {e}")
+            return None, str(e)
+
     # ──────────────────────────────────────────────
     # Utility
     # ──────────────────────────────────────────────
@@ -216,6 +445,63 @@ class WorkOrder(db.Model):
         max_id = db.session.query(func.max(cls.id)).scalar()
         return (max_id + 1) if max_id is not None else 1
 
+    # ──────────────────────────────────────────────
+    # Field projection / cursors
+    # ──────────────────────────────────────────────
+    @staticmethod
+    def resolve_fields(fields_param):
+        """Parse a comma separated fields= value. Raises ValueError on unknown names."""
+        if not fields_param:
+            return list(DEFAULT_LIST_FIELDS)
+
+        fields = [f.strip() for f in fields_param.split(",") if f.strip()]
+        unknown = [f for f in fields if f not in LIST_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return fields
+
+    @classmethod
+    def projected_query(cls, fields):
+        """Select only the columns behind ``fields`` (ID/CREATED_T always, for the cursor)."""
+        names = ["ID", "CREATED_T"] + [LIST_FIELDS[f] for f in fields]
+        columns = [getattr(cls, n) for n in dict.fromkeys(names)]
+        return db.session.query(*columns)
+
+    @staticmethod
+    def serialize_projection(row, fields):
+        """Serialize a projected row the same way to_dict() does, limited to ``fields``."""
+        data = row._mapping
+        rate_json = data.get("RATE") or {}
+        out = {}
+        for field in fields:
+            if field == "RATE":
+                out[field] = rate_json.get("type_rates", {})
+            elif field == "total_rate":
+                out[field] = rate_json.get("total_rate", 0)
+            elif field == "CREATED_T":
+                created = data.get("CREATED_T")
+                out[field] = created.isoformat() if created else None
+            elif field == "closing_images":
+                out[field] = data.get("closing_images") or []
+            else:
+                out[field] = data.get(LIST_FIELDS[field])
+        return out
+
+    @staticmethod
+    def encode_cursor(created_t, last_id):
+        payload = json.dumps({"t": created_t.isoformat(), "id": last_id})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Inverse of encode_cursor. Raises ValueError on a malformed cursor."""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(payload["t"]), int(payload["id"])
+        except Exception:
+            raise ValueError("Invalid cursor")
+
     # ──────────────────────────────────────────────
     # Serialization
     # ──────────────────────────────────────────────
@@ -256,44 +542,35 @@ class WorkOrder(db.Model):
     # Workorder ID generation
     # ──────────────────────────────────────────────
     @classmethod
-    def generate_workorder_id(cls, workorder_type):
-        """Generates next unique Parent WORKORDER ID"""
-        today_str = datetime.now().strftime("%d%m%Y")
-        prefix = "P"
-
-        result = db.session.execute(
-            text('SELECT "WORKORDER" FROM "workorder_t" ORDER BY "ID" DESC LIMIT 1')
-        ).fetchone()
+    def reserve_workorder_ids(cls, prefix, count=1):
+        """
+        Reserve ``count`` WORKORDER numbers: ddmmyyyy + prefix + 6-digit serial.
+        Serials come from the workorder_serial_seq sequence. nextval() is atomic,
+        so concurrent creates never share a number, and a whole block costs a
+        single round trip. Numbers that are reserved but never used leave gaps.
+        The sequence cycles after 999999 (migrations/014), so the serial
+        always fits 6 digits; the date keeps the full number unique.
+        """
+        if count < 1 or count > MAX_WORKORDER_ID_BLOCK:
+            raise ValueError(f"count must be between 1 and {MAX_WORKORDER_ID_BLOCK}")
+
+        rows = db.session.execute(
+            text("SELECT nextval(:seq) FROM generate_series(1, :n)"),
+            {"seq": WORKORDER_SEQUENCE, "n": count}
+        ).fetchall()
 
-        last_serial = 0
-        if result and result[0] and len(result[0]) >= 15:
-            try:
-                last_serial = int(result[0][-6:])
-            except ValueError:
-                pass
+        today_str = datetime.now().strftime("%d%m%Y")
+        return [f"{today_str}{prefix}{str(serial).zfill(6)}" for serial in sorted(r[0] for r in rows)]
 
-        serial_str = str(last_serial + 1).zfill(6)
-        return f"{today_str}{prefix}{serial_str}"
+    @classmethod
+    def generate_workorder_id(cls, workorder_type):
+        """Generates next unique Parent WORKORDER ID"""
+        return cls.reserve_workorder_ids("P")[0]
 
     @classmethod
     def generates_workorder_id(cls, workorder_type):
         """Generates next unique Child WORKORDER ID"""
-        today_str = datetime.now().strftime("%d%m%Y")
-        prefix = "W"
-
-        result = db.session.execute(
-            text('SELECT "WORKORDER" FROM "workorder_t" ORDER BY "ID" DESC LIMIT 1')
-        ).fetchone()
-
-        last_serial = 0
-        if result and result[0] and len(result[0]) >= 15:
-            try:
-                last_serial = int(result[0][-6:])
-            except ValueError:
-                pass
-
-        serial_str = str(last_serial + 1).zfill(6)
-        return f"{today_str}{prefix}{serial_str}"
+        return cls.reserve_workorder_ids("W")[0]
 
 
 
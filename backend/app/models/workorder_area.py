@@ -1,6 +1,9 @@
 from app.models.database import db
 from sqlalchemy import text
 
+# Active areas list cached by WorkOrder.get_workorder_areas; cleared by the CRUD controller
+WORKORDER_AREAS_CACHE = "workorder_areas"
+
 class WorkOrderArea:
     __tablename__ = "workorder_area_t"
 
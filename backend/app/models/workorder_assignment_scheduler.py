@@ -0,0 +1,198 @@
+"""
+Assignment Scheduler - drives workorder_assignment_jobs_t
+File: app/models/workorder_assignment_scheduler.py
+
+One process (run_scheduler.py) owns every live assignment:
+  - a min-heap of (due_ts, job_id) decides what runs next,
+  - a fixed ThreadPoolExecutor runs process_assignment_job (the e-mail sends),
+  - accept/reject events wake a job immediately; otherwise it sleeps until
+    its link-expiry deadline.
+Jobs live in the database, so a restart just reloads the heap.
+"""
+
+import heapq
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from app.models.database import db
+from app.models.workorder_automation_model import (
+    get_active_assignment_jobs,
+    process_assignment_job
+)
+from app.utils import assignment_events, cache_utils
+
+SCHEDULER_WORKERS = int(os.getenv("ASSIGNMENT_SCHEDULER_WORKERS", "4"))
+# Safety net for jobs whose NOTIFY was lost (queued while the scheduler was down, etc.)
+RESCAN_SECONDS = int(os.getenv("ASSIGNMENT_SCHEDULER_RESCAN_SECONDS", "60"))
+# Back-off after an unexpected error in a job step
+ERROR_RETRY_SECONDS = 60
+
+
+class SystemClock:
+    """Wall clock. ``scale`` is simulated seconds per real second."""
+    scale = 1.0
+
+    def now(self):
+        return time.time()
+
+
+class AssignmentScheduler:
+    def __init__(self, app, workers=SCHEDULER_WORKERS, clock=None, rescan_seconds=RESCAN_SECONDS):
+        self.app = app
+        self.clock = clock or SystemClock()
+        self.rescan_seconds = rescan_seconds
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assignment")
+
+        self._cond = threading.Condition()
+        self._heap = []            # (due_ts, job_id); stale entries are skipped
+        self._due = {}             # job_id -> current due_ts
+        self._jobs_by_wo = {}      # workorder_id -> job_id
+        self._wo_by_job = {}       # job_id -> workorder_id
+        self._running = set()
+        self._rerun = set()        # woken while running: run again right after
+        self._rescan_requested = True
+        self._stopped = False
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def start(self):
+        """Load live jobs and start the dispatch loop in a background thread."""
+        with self.app.app_context():
+            assignment_events.subscribe_all(self._on_event)
+        self._thread = threading.Thread(target=self._loop, name="assignment-scheduler", daemon=True)
+        self._thread.start()
+        print(f"[SCHEDULER] Started ({self.workers} workers)")
+
+    def run_forever(self):
+        self.start()
+        try:
+            while self._thread.is_alive():
+                self._thread.join(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self, wait=True):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._executor.shutdown(wait=wait)
+        print("[SCHEDULER] Stopped")
+
+    def schedule(self, job_id, workorder_id, due_ts):
+        """(Re)arm a job. An earlier due time replaces a later one."""
+        with self._cond:
+            self._jobs_by_wo[workorder_id] = job_id
+            self._wo_by_job[job_id] = workorder_id
+            if job_id in self._running:
+                if due_ts <= self.clock.now():
+                    self._rerun.add(job_id)
+                return
+            current = self._due.get(job_id)
+            if current is not None and current <= due_ts:
+                return
+            self._due[job_id] = due_ts
+            heapq.heappush(self._heap, (due_ts, job_id))
+            self._cond.notify()
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._due) + len(self._running)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _on_event(self, event):
+        if event.get("action") == assignment_events.INVALIDATE:
+            # Provider status / rate changed in a web process
+            names = event.get("caches")
+            if names:
+                cache_utils.invalidate(*names)
+            return
+        workorder_id = int(event["workorder_id"])
+        with self._cond:
+            job_id = self._jobs_by_wo.get(workorder_id)
+            if job_id is None:
+                # New job queued by a web worker: pick it up from the table
+                self._rescan_requested = True
+                self._cond.notify()
+                return
+        self.schedule(job_id, workorder_id, self.clock.now())
+
+    def _rescan(self):
+        try:
+            with self.app.app_context():
+                jobs = get_active_assignment_jobs()
+        except Exception as e:
+            print(f"[SCHEDULER] Rescan failed: {e}")
+            return
+        for job_id, workorder_id, due_ts in jobs:
+            self.schedule(job_id, workorder_id, due_ts)
+
+    def _loop(self):
+        next_rescan = 0.0
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                rescan = self._rescan_requested or self.clock.now() >= next_rescan
+                self._rescan_requested = False
+
+            if rescan:
+                self._rescan()
+                next_rescan = self.clock.now() + self.rescan_seconds
+
+            with self._cond:
+                now = self.clock.now()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due_ts, job_id = heapq.heappop(self._heap)
+                    if self._due.get(job_id) == due_ts:
+                        del self._due[job_id]
+                        self._running.add(job_id)
+                        due.append(job_id)
+
+                if not due:
+                    wake_at = next_rescan
+                    if self._heap:
+                        wake_at = min(wake_at, self._heap[0][0])
+                    timeout = max(wake_at - now, 0) / self.clock.scale
+                    if not self._stopped and not self._rescan_requested:
+                        self._cond.wait(timeout)
+                    continue
+
+            for job_id in due:
+                self._executor.submit(self._run, job_id)
+
+    def _run(self, job_id):
+        next_due = None
+        try:
+            with self.app.app_context():
+                try:
+                    next_due = process_assignment_job(job_id, self.clock.now())
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            print(f"[SCHEDULER] Job {job_id} failed, retrying in {ERROR_RETRY_SECONDS}s: {e}")
+            traceback.print_exc()
+            next_due = self.clock.now() + ERROR_RETRY_SECONDS
+
+        with self._cond:
+            self._running.discard(job_id)
+            rerun = job_id in self._rerun
+            self._rerun.discard(job_id)
+            workorder_id = self._wo_by_job.get(job_id)
+            if next_due is None:
+                self._wo_by_job.pop(job_id, None)
+                if self._jobs_by_wo.get(workorder_id) == job_id:
+                    del self._jobs_by_wo[workorder_id]
+                return
+
+        self.schedule(job_id, workorder_id, self.clock.now() if rerun else next_due)
@@ -3,72 +3,85 @@ Automation Model - Database operations for automation
 File: app/models/workorder_automation_model.py
 """
 
+import calendar
 import os
 import time
 import traceback
 from datetime import datetime
-from threading import Thread
 from sqlalchemy import text
 
 from app.models.database import db
 from app.models.workorder import WorkOrder
+from app.models.provider_model import CANDIDATE_CACHE
+from app.utils import assignment_events, cache_utils, metrics, smtp_pool
 from app.models.workorder_mail_model import (
     get_expiry_minutes_from_db,
     build_assignment_email_html,
+    get_mail_image_mode,
     send_email_with_attachments,
     insert_email_notification_log,
-    get_admin_email_by_id
+    get_admin_email_by_id,
+    get_contractor_from_db,
+    build_no_longer_available_html
 )
 
 # Configuration
 MAX_RETRY_ATTEMPTS = 5
-POLLING_INTERVAL = 30  # seconds
+# Contractors offered a job at once; 1 = one after another.
+# The first to accept wins (claim_workorder_status), the rest are withdrawn.
+ASSIGNMENT_FANOUT = int(os.getenv("ASSIGNMENT_FANOUT", "1"))
+
+# Ranked candidates per (area, client). Read in the scheduler process; web
+# writes clear it through assignment_events.publish_invalidation.
+CANDIDATES = cache_utils.get_cache(
+    CANDIDATE_CACHE, ttl_seconds=int(os.getenv("CANDIDATE_CACHE_TTL", "300"))
+)
 
 
 # ----------------------------------------------------------------------
 # DATABASE OPERATIONS
 # ----------------------------------------------------------------------
+def _load_contractors_for_area(area_key):
+    rows = db.session.execute(text("""
+        SELECT
+            ai.provider_id,
+            u.name AS full_name,
+            u.email_id,
+            ai.rate AS final_rate,
+            ai.area_key
+        FROM provider_area_index_t ai
+        JOIN providers_t p ON p.provider_id = ai.provider_id
+        JOIN users_t u ON u.user_uid = p.user_uid
+        WHERE ai.area_key = :area_key
+            AND u.email_id IS NOT NULL
+            AND u.status = 'approved'
+        ORDER BY ai.rate ASC, ai.provider_id ASC
+    """), {"area_key": area_key}).fetchall()
+
+    return [{
+        "provider_id": r.provider_id,
+        "full_name": r.full_name,
+        "email_id": r.email_id,
+        "rate": float(r.final_rate) if r.final_rate else 0,
+        "service_locations": r.area_key
+    } for r in rows]
+
+
 def get_contractors_by_area_sorted(area, client):
     """
     Get contractors for area sorted by rate (lowest first).
-    Checks standard_rates_t for client-specific rates.
+    An index probe on provider_area_index_t (kept in sync by
+    ProviderModel.insert_services / delete_services), cached per
+    (area, client) until a provider profile, status or rate changes.
     """
     try:
-        # Query with LEFT JOIN to get client-specific rates if available
-        result = db.session.execute(text("""
-            SELECT DISTINCT 
-                p.provider_id, 
-                p.full_name, 
-                p.email_id,
-                COALESCE(sr.price, p.rate) as final_rate,
-                p.service_locations
-            FROM providers_t p
-            LEFT JOIN standard_rates_t sr 
-                ON p.provider_id = sr.provider_id 
-                AND sr.client = :client
-                AND sr.state = :area
-            WHERE p.service_locations LIKE :area_pattern
-                AND p.email_id IS NOT NULL
-                AND p.status = 'ACTIVE'
-            ORDER BY final_rate ASC
-        """), {
-            "area": area,
-            "client": client,
-            "area_pattern": f"%{area}%"
-        }).fetchall()
-        
-        contractors = []
-        for r in result:
-            contractors.append({
-                "provider_id": r.provider_id,
-                "full_name": r.full_name,
-                "email_id": r.email_id,
-                "rate": float(r.final_rate) if r.final_rate else 0,
-                "service_locations": r.service_locations
-            })
-        
+        area_key = (area or "").strip().lower()
+        contractors = CANDIDATES.get_or_load(
+            (area_key, client or ""),
+            lambda: _load_contractors_for_area(area_key)
+        )
         print(f"[AUTO] Found {len(contractors)} contractors for area={area}, client={client}")
-        return contractors
+        return [dict(c) for c in contractors]
         
     except Exception as e:
         print(f"[ERROR] get_contractors_by_area_sorted: {e}")
@@ -163,6 +176,16 @@ def mark_automation_stopped(workorder_id):
             "wid": workorder_id,
             "now": datetime.utcnow()
         })
+        db.session.execute(text("""
+            UPDATE workorder_assignment_jobs_t
+            SET state = 'STOPPED',
+                updated_at = :now
+            WHERE workorder_id = :wid
+                AND state IN ('PENDING', 'WAITING')
+        """), {
+            "wid": workorder_id,
+            "now": datetime.utcnow()
+        })
         db.session.commit()
         return True
     except Exception as e:
@@ -174,6 +197,31 @@ def mark_automation_stopped(workorder_id):
 # ----------------------------------------------------------------------
 # EMAIL OPERATIONS
 # ----------------------------------------------------------------------
+def send_plain_html_email(to_email, subject, html):
+    """Send a single HTML email without attachments. Returns a status string."""
+    try:
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+
+        EMAIL_USER = os.getenv("MAIL_USER")
+
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = EMAIL_USER
+        msg["To"] = to_email
+        msg.attach(MIMEText(html, "html"))
+
+        with metrics.smtp_timer("send_plain_html_email"):
+            smtp_pool.get_pool("workorder").send(msg)
+
+        print(f"[MAIL] Sent '{subject}' to: {to_email}")
+        return "SENT"
+
+    except Exception as e:
+        print(f"[ERROR] send_plain_html_email: {e}")
+        return f"FAILED: {e}"
+
+
 def send_admin_no_acceptance_email(workorder, all_attempts):
     """Send email to admin when no contractor accepts."""
     try:
@@ -252,12 +300,10 @@ def send_admin_no_acceptance_email(workorder, all_attempts):
         </html>
         """
         
-        import smtplib
         from email.mime.text import MIMEText
         from email.mime.multipart import MIMEMultipart
         
         EMAIL_USER = os.getenv("MAIL_USER")
-        EMAIL_PASS = os.getenv("MAIL_PASS")
         
         msg = MIMEMultipart("alternative")
         msg["Subject"] = f"⚠️ Assignment Failed – {workorder.WORKORDER}"
@@ -265,9 +311,8 @@ def send_admin_no_acceptance_email(workorder, all_attempts):
         msg["To"] = admin_email
         msg.attach(MIMEText(html, "html"))
         
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(EMAIL_USER, EMAIL_PASS)
-            server.send_message(msg)
+        with metrics.smtp_timer("send_admin_no_acceptance_email"):
+            smtp_pool.get_pool("workorder").send(msg)
         
         print(f"[ADMIN] No-acceptance email sent to: {admin_email}")
         
@@ -317,18 +362,22 @@ def assign_to_contractor(workorder_id, contractor, attempt_number, base_url):
         )
         
         # Build and send email
+        image_mode = get_mail_image_mode(workorder.WORKORDER_AREA, workorder.client)
         html_body = build_assignment_email_html(
             workorder=workorder,
             contractor_name=contractor_name,
             response_url=response_url,
-            expiry_minutes=expiry_minutes
+            expiry_minutes=expiry_minutes,
+            image_mode=image_mode,
+            public_base_url=public_base_url
         )
         
         status, attached_cnt, attached_sz = send_email_with_attachments(
             workorder=workorder,
             contractor_email=contractor_email,
             contractor_name=contractor_name,
-            html_body=html_body
+            html_body=html_body,
+            embed_images=image_mode == "EMBED"
         )
         
         # Log notification
@@ -350,134 +399,228 @@ def assign_to_contractor(workorder_id, contractor, attempt_number, base_url):
         return False, str(e)
 
 
-def monitor_contractor_response(workorder_id, contractor_id, expiry_minutes):
+# ----------------------------------------------------------------------
+# ASSIGNMENT JOBS (driven by run_scheduler.py)
+# ----------------------------------------------------------------------
+ACTIVE_JOB_STATES = ("PENDING", "WAITING")
+
+
+def _to_db_time(ts):
+    return datetime.utcfromtimestamp(ts)
+
+
+def _from_db_time(dt):
+    return calendar.timegm(dt.timetuple()) + dt.microsecond / 1e6
+
+
+def enqueue_assignment_job(workorder_id, base_url, fanout=None):
     """
-    Monitor contractor response for expiry_minutes.
-    Returns: 'ACCEPTED', 'REJECTED', or 'EXPIRED'
+    Create the assignment job for a work order, due immediately.
+    fanout: contractors offered the job per round (default ASSIGNMENT_FANOUT).
+    Returns the job id, or the existing one if a job is already live.
     """
-    start_time = time.time()
-    timeout = expiry_minutes * 60
-    
-    print(f"[AUTO] Monitoring for {expiry_minutes} minutes...")
-    
-    while time.time() - start_time < timeout:
-        try:
-            status = get_current_assignment_status(workorder_id)
-            
-            if status == "Accepted":
-                print(f"[AUTO] ✅ Contractor accepted!")
-                update_assignment_attempt_status(workorder_id, contractor_id, "ACCEPTED")
-                return "ACCEPTED"
-            
-            elif status == "Rejected":
-                print(f"[AUTO] ❌ Contractor rejected!")
-                update_assignment_attempt_status(workorder_id, contractor_id, "REJECTED")
-                return "REJECTED"
-            
-            time.sleep(POLLING_INTERVAL)
-            
-        except Exception as e:
-            print(f"[ERROR] monitor_contractor_response: {e}")
-            time.sleep(POLLING_INTERVAL)
-    
-    # Timeout
-    print(f"[AUTO] ⏰ Link expired")
-    update_assignment_attempt_status(
-        workorder_id, 
-        contractor_id, 
-        "EXPIRED",
-        remark="No response within timeout"
+    fanout = max(1, min(int(fanout or ASSIGNMENT_FANOUT), MAX_RETRY_ATTEMPTS))
+    now = datetime.utcnow()
+    row = db.session.execute(text("""
+        INSERT INTO workorder_assignment_jobs_t
+            (workorder_id, base_url, state, fanout, next_run_at, created_at, updated_at)
+        VALUES (:wid, :url, 'PENDING', :fanout, :now, :now, :now)
+        ON CONFLICT (workorder_id) WHERE state IN ('PENDING', 'WAITING') DO NOTHING
+        RETURNING id
+    """), {"wid": workorder_id, "url": base_url, "fanout": fanout, "now": now}).fetchone()
+
+    if row is None:
+        row = db.session.execute(text("""
+            SELECT id FROM workorder_assignment_jobs_t
+            WHERE workorder_id = :wid AND state IN ('PENDING', 'WAITING')
+        """), {"wid": workorder_id}).fetchone()
+    db.session.commit()
+    return row.id if row else None
+
+
+def get_active_assignment_jobs():
+    """[(job_id, workorder_id, due_ts)] for every live job."""
+    rows = db.session.execute(text("""
+        SELECT id, workorder_id, next_run_at FROM workorder_assignment_jobs_t
+        WHERE state IN ('PENDING', 'WAITING')
+    """)).fetchall()
+    db.session.commit()
+    return [(r.id, r.workorder_id, _from_db_time(r.next_run_at)) for r in rows]
+
+
+def _update_job(job_id, **fields):
+    fields["updated_at"] = datetime.utcnow()
+    assignments = ", ".join(f"{k} = :{k}" for k in fields)
+    db.session.execute(
+        text(f"UPDATE workorder_assignment_jobs_t SET {assignments} WHERE id = :job_id"),
+        {**fields, "job_id": job_id},
     )
-    return "EXPIRED"
+    db.session.commit()
 
 
-def automated_assignment_process(workorder_id, base_url):
-    """Main automation process - runs in background."""
-    try:
-        print(f"\n{'#'*60}")
-        print(f"[AUTO] Starting for WO ID: {workorder_id}")
-        print(f"{'#'*60}\n")
-        
-        workorder = WorkOrder.query.get(workorder_id)
-        if not workorder:
-            print("[ERROR] Workorder not found")
-            return
-        
-        area = workorder.WORKORDER_AREA
-        client = workorder.client or ""
-        
-        # Get contractors sorted by rate
-        contractors = get_contractors_by_area_sorted(area, client)
-        
-        if not contractors:
-            print(f"[ERROR] No contractors for area: {area}")
-            send_admin_no_acceptance_email(workorder, [])
-            return
-        
-        print(f"[AUTO] Found {len(contractors)} contractors")
-        
-        all_attempts = []
-        
-        # Try each contractor
-        for idx, contractor in enumerate(contractors, 1):
-            if idx > MAX_RETRY_ATTEMPTS:
-                print(f"[AUTO] Max attempts reached ({MAX_RETRY_ATTEMPTS})")
-                break
-            
-            # Send assignment
-            success, message = assign_to_contractor(workorder_id, contractor, idx, base_url)
-            
-            if not success:
-                print(f"[AUTO] Failed: {message}")
-                all_attempts.append({
-                    "contractor_name": contractor['full_name'],
-                    "status": "EMAIL_FAILED",
-                    "remark": message
-                })
-                continue
-            
-            # Monitor response
-            expiry_minutes = get_expiry_minutes_from_db(area)
-            response = monitor_contractor_response(workorder_id, contractor['provider_id'], expiry_minutes)
-            
-            all_attempts.append({
-                "contractor_name": contractor['full_name'],
-                "status": response,
-                "remark": None
-            })
-            
-            if response == "ACCEPTED":
-                print(f"\n[AUTO] ✅ SUCCESS! {contractor['full_name']} accepted\n")
-                return
-            
-            elif response == "REJECTED":
-                print(f"[AUTO] Rejected, trying next...")
-                continue
-            
-            elif response == "EXPIRED":
-                print(f"[AUTO] Expired, trying next...")
-                continue
-        
-        # No one accepted
-        print(f"\n[AUTO] ❌ FAILED - No acceptance\n")
-        send_admin_no_acceptance_email(workorder, all_attempts)
-        
-    except Exception as e:
-        print(f"[FATAL] automated_assignment_process: {e}")
-        traceback.print_exc()
+def _job_attempts(workorder_id, since):
+    rows = db.session.execute(text("""
+        SELECT contractor_id, contractor_name, status, remark
+        FROM workorder_assignment_attempts_t
+        WHERE workorder_id = :wid AND created_at >= :since
+        ORDER BY attempt_number ASC, id ASC
+    """), {"wid": workorder_id, "since": since}).fetchall()
+    return [dict(r._mapping) for r in rows]
 
 
-def trigger_automation_background(workorder_id, base_url):
-    """Trigger automation in background thread."""
-    try:
-        thread = Thread(
-            target=automated_assignment_process,
-            args=(workorder_id, base_url),
-            daemon=True
+def withdraw_open_offers(workorder, since):
+    """
+    After the claim is won: close every other contractor's pending offer
+    and tell them the job is no longer available.
+    """
+    rows = db.session.execute(text("""
+        UPDATE workorder_assignment_attempts_t
+        SET status = 'WITHDRAWN',
+            remark = 'Accepted by another contractor',
+            updated_at = :now
+        WHERE workorder_id = :wid
+            AND status = 'PENDING'
+            AND created_at >= :since
+        RETURNING contractor_id, contractor_name
+    """), {"wid": workorder.ID, "since": since, "now": datetime.utcnow()}).fetchall()
+    db.session.commit()
+
+    for r in rows:
+        contractor = get_contractor_from_db(r.contractor_id)
+        if not contractor or not contractor.email_id:
+            continue
+        status = send_plain_html_email(
+            contractor.email_id,
+            f"Work Order {workorder.WORKORDER} – No Longer Available",
+            build_no_longer_available_html(workorder, r.contractor_name or contractor.full_name),
         )
-        thread.start()
-        print(f"[AUTO] Background thread started for WO ID: {workorder_id}")
+        insert_email_notification_log(workorder.WORKORDER, r.contractor_name, contractor.email_id, status)
+    return len(rows)
+
+
+def process_assignment_job(job_id, now_ts):
+    """
+    Advance one job by a single step.
+    WAITING: settle the current round. Any accept finishes the job; once
+             every offer is answered or the deadline passes, move on.
+    PENDING: offer the job to the next ``fanout`` cheapest untried
+             contractors at once and start waiting.
+    Returns the timestamp the job is next due, or None once it is finished.
+    """
+    job = db.session.execute(text("""
+        SELECT * FROM workorder_assignment_jobs_t WHERE id = :id
+    """), {"id": job_id}).fetchone()
+    if not job or job.state not in ACTIVE_JOB_STATES:
+        return None
+
+    workorder = WorkOrder.query.get(job.workorder_id)
+    if not workorder:
+        _update_job(job_id, state="FAILED", last_error="Workorder not found")
+        return None
+
+    attempts = _job_attempts(job.workorder_id, job.created_at)
+
+    if job.state == "WAITING":
+        statuses = [a["status"] for a in attempts]
+
+        if "ACCEPTED" in statuses:
+            print(f"\n[AUTO] ✅ SUCCESS! WO {workorder.WORKORDER} accepted\n")
+            _update_job(job_id, state="DONE")
+            metrics.TIME_TO_ACCEPT_SECONDS.observe(
+                now_ts - _from_db_time(job.created_at), workorder.WORKORDER_AREA or "unknown"
+            )
+            metrics.ATTEMPTS_PER_WORKORDER.observe(job.attempt_number, "accepted")
+            withdraw_open_offers(workorder, job.created_at)
+            return None
+        if "STOPPED" in statuses:
+            _update_job(job_id, state="STOPPED")
+            return None
+        if "PENDING" in statuses:
+            deadline = _from_db_time(job.next_run_at)
+            if deadline > now_ts:
+                return deadline  # offers still open
+            print(f"[AUTO] ⏰ Link expired")
+            for a in attempts:
+                if a["status"] == "PENDING":
+                    update_assignment_attempt_status(
+                        job.workorder_id,
+                        a["contractor_id"],
+                        "EXPIRED",
+                        remark="No response within timeout"
+                    )
+        else:
+            print(f"[AUTO] Round rejected, trying next...")
+
+    # Next round; e-mail failures are replaced from the remaining contractors
+    tried = {a["contractor_id"] for a in attempts}
+    contractors = [
+        c for c in get_contractors_by_area_sorted(workorder.WORKORDER_AREA, workorder.client or "")
+        if c["provider_id"] not in tried
+    ]
+    fanout = job.fanout or 1
+    attempt_number = job.attempt_number
+    offered = []
+
+    for contractor in contractors:
+        if len(offered) >= fanout:
+            break
+        if attempt_number >= MAX_RETRY_ATTEMPTS:
+            print(f"[AUTO] Max attempts reached ({MAX_RETRY_ATTEMPTS})")
+            break
+        attempt_number += 1
+
+        success, message = assign_to_contractor(job.workorder_id, contractor, attempt_number, job.base_url)
+        if success:
+            offered.append(contractor)
+            continue
+
+        print(f"[AUTO] Failed: {message}")
+        update_assignment_attempt_status(
+            job.workorder_id, contractor["provider_id"], "EMAIL_FAILED", remark=message
+        )
+
+    if offered:
+        expiry_minutes = get_expiry_minutes_from_db(workorder.WORKORDER_AREA)
+        deadline = now_ts + expiry_minutes * 60
+        _update_job(
+            job_id,
+            state="WAITING",
+            attempt_number=attempt_number,
+            contractor_id=offered[-1]["provider_id"],
+            next_run_at=_to_db_time(deadline),
+        )
+        names = ", ".join(c["full_name"] for c in offered)
+        print(f"[AUTO] Waiting up to {expiry_minutes} minutes for: {names}")
+        return deadline
+
+    # No one accepted
+    print(f"\n[AUTO] ❌ FAILED - No acceptance\n")
+    _update_job(job_id, state="FAILED", attempt_number=attempt_number)
+    metrics.ATTEMPTS_PER_WORKORDER.observe(attempt_number, "failed")
+    send_admin_no_acceptance_email(workorder, _job_attempts(job.workorder_id, job.created_at))
+    return None
+
+
+def count_active_assignment_jobs():
+    row = db.session.execute(text("""
+        SELECT COUNT(*) AS n FROM workorder_assignment_jobs_t
+        WHERE state IN ('PENDING', 'WAITING')
+    """)).fetchone()
+    return row.n
+
+
+def trigger_automation_background(workorder_id, base_url, fanout=None):
+    """
+    Queue automated assignment for a work order. The scheduler process
+    (run_scheduler.py) picks it up immediately via NOTIFY, or on its next
+    rescan.
+    """
+    try:
+        job_id = enqueue_assignment_job(workorder_id, base_url, fanout)
+        assignment_events.publish(workorder_id, None, "scheduled")
+        print(f"[AUTO] Assignment job {job_id} queued for WO ID: {workorder_id}")
         return True
     except Exception as e:
+        db.session.rollback()
         print(f"[ERROR] trigger_automation_background: {e}")
-        return False
\ No newline at end of file
+        return False
@@ -1,17 +1,19 @@
 import os
 import json
 import base64
+import hashlib
+import time
 import traceback
 from datetime import datetime
 
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.image import MIMEImage
+from email.mime.nonmultipart import MIMENonMultipart
 from sqlalchemy import text
 
 from app.models.database import db
 from app.models.workorder import WorkOrder
+from app.utils import blob_store, cache_utils, metrics, smtp_pool, url_signing
 
 # ----------------------------------------------------------------------
 # SMTP Credentials
@@ -19,6 +21,30 @@ from app.models.workorder import WorkOrder
 EMAIL_USER = os.getenv("MAIL_USER")
 EMAIL_PASS = os.getenv("MAIL_PASS")
 
+# ----------------------------------------------------------------------
+# Master-data caches (link expiry per area, admin e-mail per id)
+# ----------------------------------------------------------------------
+DEFAULT_EXPIRY_MINUTES = 15
+MASTER_DATA_TTL = int(os.getenv("MASTER_DATA_CACHE_TTL", "300"))
+LINK_EXPIRY_CACHE = "link_expiry"
+ADMIN_EMAIL_CACHE = "admin_emails"
+
+LINK_EXPIRY = cache_utils.get_cache(LINK_EXPIRY_CACHE, ttl_seconds=MASTER_DATA_TTL)
+ADMIN_EMAILS = cache_utils.get_cache(ADMIN_EMAIL_CACHE, ttl_seconds=MASTER_DATA_TTL)
+
+# ----------------------------------------------------------------------
+# Image mode: EMBED (inline parts) or LINK (signed image URLs)
+# ----------------------------------------------------------------------
+MAIL_IMAGE_MODE_CACHE = "mail_image_mode"
+DEFAULT_MAIL_IMAGE_MODE = os.getenv("MAIL_IMAGE_MODE", "EMBED").upper()
+# Size variant shown in LINK mails; the image links to the original
+MAIL_LINK_IMAGE_SIZE = os.getenv("MAIL_LINK_IMAGE_SIZE", "small")
+# Image links outlive the offer link by this much
+MAIL_IMAGE_LINK_GRACE_MINUTES = int(os.getenv("MAIL_IMAGE_LINK_GRACE_MINUTES", "60"))
+WORKORDER_IMAGE_URL_PURPOSE = "workorder-image"
+
+MAIL_IMAGE_MODES = cache_utils.get_cache(MAIL_IMAGE_MODE_CACHE, ttl_seconds=MASTER_DATA_TTL, maxsize=1)
+
 
 # ----------------------------------------------------------------------
 # Helper Functions
@@ -91,8 +117,86 @@ def parse_image_field(image_field):
     return images
 
 
+# ----------------------------------------------------------------------
+# Decoded images (cached)
+# ----------------------------------------------------------------------
+# Raw image bytes by source, so repeated views / re-sends of the same work
+# order skip the file read or base64 decode. Bounded by total size (LRU).
+DECODED_IMAGE_CACHE_BYTES = int(os.getenv("DECODED_IMAGE_CACHE_MB", "64")) * 1024 * 1024
+DECODED_IMAGE_TTL = int(os.getenv("DECODED_IMAGE_CACHE_TTL", "3600"))
+
+DECODED_IMAGES = cache_utils.get_byte_cache(
+    "decoded_images",
+    max_bytes=DECODED_IMAGE_CACHE_BYTES,
+    ttl_seconds=DECODED_IMAGE_TTL,
+    sizeof=lambda value: len(value[0]),
+)
+
+
+def _is_inline_image(img_entry):
+    return img_entry.startswith("data:image") or (len(img_entry) > 100 and not img_entry.startswith("/"))
+
+
+def _resolve_upload_path(img_entry):
+    """First existing file for an /uploads/... entry, or None."""
+    possible_paths = [
+        img_entry,
+        img_entry.lstrip("/"),
+        os.path.join(os.getcwd(), img_entry.lstrip("/")),
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), img_entry.lstrip("/")),
+    ]
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _decoded_image_key(img_entry):
+    """
+    Cache key for decode_image: the content hash for inline images, the key
+    itself for content-addressed uploads (never rewritten), and
+    (path, mtime, size) for other files. None = don't cache.
+    """
+    if not isinstance(img_entry, str):
+        return None    # raw bytes: nothing to decode
+    if _is_inline_image(img_entry):
+        return ("inline", hashlib.blake2b(img_entry.encode(), digest_size=16).digest())
+    if blob_store.is_content_key(img_entry):
+        return ("cas", img_entry)
+
+    if img_entry.startswith("/uploads/"):
+        path = _resolve_upload_path(img_entry)
+    else:
+        path = img_entry if os.path.exists(img_entry) else None
+    if path is None:
+        return None
+    stat = os.stat(path)
+    return ("file", os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+
+
 def decode_image(img_entry):
-    """Decode image from various sources: data URL, base64, file path, or bytes."""
+    """
+    Decode image from various sources: data URL, base64, file path, or bytes.
+    Results are kept in DECODED_IMAGES.
+    """
+    try:
+        key = _decoded_image_key(img_entry)
+    except Exception as e:
+        print(f"[ERROR] decode_image: {e}")
+        key = None
+    if key is None:
+        return _decode_image(img_entry)
+
+    cached = DECODED_IMAGES.get(key)
+    if cached is not None:
+        return cached
+    img_bytes, filename = _decode_image(img_entry)
+    if img_bytes:
+        DECODED_IMAGES.set(key, (img_bytes, filename))
+    return img_bytes, filename
+
+
+def _decode_image(img_entry):
     img_bytes = None
     filename = "image.jpg"
 
@@ -117,21 +221,11 @@ def decode_image(img_entry):
 
         # file path under /uploads/
         if img_bytes is None and isinstance(img_entry, str) and img_entry.startswith("/uploads/"):
-            possible_paths = [
-                img_entry,
-                img_entry.lstrip("/"),
-                os.path.join(os.getcwd(), img_entry.lstrip("/")),
-                os.path.join(os.path.dirname(os.path.dirname(__file__)), img_entry.lstrip("/")),
-            ]
-            for path in possible_paths:
-                try:
-                    if os.path.exists(path):
-                        with open(path, "rb") as f:
-                            img_bytes = f.read()
-                        filename = os.path.basename(img_entry)
-                        break
-                except Exception:
-                    continue
+            path = _resolve_upload_path(img_entry)
+            if path is not None:
+                with open(path, "rb") as f:
+                    img_bytes = f.read()
+                filename = os.path.basename(img_entry)
 
         # absolute path
         elif img_bytes is None and isinstance(img_entry, str) and os.path.exists(img_entry):
@@ -150,46 +244,125 @@ def decode_image(img_entry):
     return img_bytes, filename
 
 
-def attach_workorder_images(msg, msg_related, workorder, workorder_id):
-    """Attach workorder images as both inline and attachment."""
-    attached_count = 0
-    total_size = 0
+# ----------------------------------------------------------------------
+# Encoded image parts (cached)
+# ----------------------------------------------------------------------
+# Images above this size are sent as the MAIL_IMAGE_PRESET derivative
+# (JPEG, longest edge from image_derivatives.PRESETS) instead of the original.
+MAIL_IMAGE_DOWNSCALE_BYTES = int(os.getenv("MAIL_IMAGE_DOWNSCALE_KB", "300")) * 1024
+MAIL_IMAGE_PRESET = os.getenv("MAIL_IMAGE_PRESET", "medium")
+MAIL_PARTS_TTL = int(os.getenv("MAIL_PARTS_CACHE_TTL", "3600"))
+# Bounded by the size of the base64 payloads they hold (LRU), per process.
+# A work order's parts share their payload strings with IMAGE_PARTS, so the
+# two budgets overlap rather than add up.
+MAIL_IMAGE_PARTS_CACHE_BYTES = int(os.getenv("MAIL_IMAGE_PARTS_CACHE_MB", "64")) * 1024 * 1024
+MAIL_WORKORDER_PARTS_CACHE_BYTES = int(os.getenv("MAIL_WORKORDER_PARTS_CACHE_MB", "64")) * 1024 * 1024
+
+# sha256 of the original bytes -> (subtype, base64 payload, size)
+IMAGE_PARTS = cache_utils.get_byte_cache(
+    "mail_image_parts",
+    max_bytes=MAIL_IMAGE_PARTS_CACHE_BYTES,
+    ttl_seconds=MAIL_PARTS_TTL,
+    sizeof=lambda entry: len(entry[1]),
+)
+# (workorder id, image field fingerprint) -> [(cid, filename, subtype, payload, size)]
+WORKORDER_PARTS = cache_utils.get_byte_cache(
+    "mail_workorder_parts",
+    max_bytes=MAIL_WORKORDER_PARTS_CACHE_BYTES,
+    ttl_seconds=MAIL_PARTS_TTL,
+    sizeof=lambda parts: sum(len(part[3]) for part in parts),
+)
+
+
+def _optimize_image(img_bytes):
+    """
+    Downscale + recompress oversized photos. Returns (bytes, final);
+    final is False when the original is used only because the render
+    failed or is still pending, so the result is not cached.
+    """
+    if len(img_bytes) <= MAIL_IMAGE_DOWNSCALE_BYTES:
+        return img_bytes, True
+    from app.utils import image_derivatives
+    try:
+        path = image_derivatives.get_derivative(img_bytes, MAIL_IMAGE_PRESET, "jpeg")
+        with open(path, "rb") as f:
+            smaller = f.read()
+    except Exception as e:
+        print(f"[MAIL] downscale failed, attaching original: {e}")
+        return img_bytes, False
+    return (smaller if len(smaller) < len(img_bytes) else img_bytes), True
+
+
+def _encode_image(img_bytes):
+    """
+    ((subtype, base64 payload, size), final) for one image, shared by every
+    work order using it.
+    """
+    key = hashlib.sha256(img_bytes).hexdigest()
+    entry = IMAGE_PARTS.get(key)
+    if entry is not None:
+        return entry, True
+    data, final = _optimize_image(img_bytes)
+    entry = (detect_image_type(data), base64.encodebytes(data).decode("ascii"), len(data))
+    if final:
+        IMAGE_PARTS.set(key, entry)
+    return entry, final
+
+
+def _image_fingerprint(image_field):
+    raw = image_field if isinstance(image_field, str) else json.dumps(image_field, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _workorder_image_parts(workorder, workorder_id):
     image_field = getattr(workorder, "image", None) or getattr(workorder, "IMAGE", None)
     if not image_field:
-        return attached_count, total_size
+        return []
 
-    images = parse_image_field(image_field)
-    if not images:
-        return attached_count, total_size
+    key = (workorder_id, _image_fingerprint(image_field))
+    parts = WORKORDER_PARTS.get(key)
+    if parts is not None:
+        return parts
 
-    for idx, entry in enumerate(images, start=1):
+    parts = []
+    complete = True
+    for idx, entry in enumerate(parse_image_field(image_field), start=1):
         try:
-            img_bytes, base_name = decode_image(entry)
+            img_bytes, _ = decode_image(entry)
             if not img_bytes or len(img_bytes) < 50:
                 continue
-
-            img_type = detect_image_type(img_bytes)
-            filename = f"workorder_{workorder_id}_image_{idx}.{img_type}"
-            cid = f"image{idx}@workorder{workorder_id}"
-
-            # Inline image for HTML <img src="cid:...">
-            inline = MIMEImage(img_bytes, _subtype=img_type)
-            inline.add_header('Content-Disposition', 'inline', filename=filename)
-            inline.add_header('Content-ID', f'<{cid}>')
-            inline.add_header('X-Attachment-Id', cid)
-            msg_related.attach(inline)
-
-            # Attachment copy
-            attach = MIMEImage(img_bytes, _subtype=img_type)
-            attach.add_header('Content-Disposition', 'attachment', filename=filename)
-            msg.attach(attach)
-
-            attached_count += 1
-            total_size += len(img_bytes)
+            (subtype, payload, size), final = _encode_image(img_bytes)
+            complete = complete and final
+            filename = f"workorder_{workorder_id}_image_{idx}.{subtype}"
+            parts.append((f"image{idx}@workorder{workorder_id}", filename, subtype, payload, size))
         except Exception as e:
+            complete = False
             print(f"[ERROR] attach image #{idx}: {e}")
             traceback.print_exc()
+    if complete:
+        WORKORDER_PARTS.set(key, parts)
+    return parts
+
 
+def attach_workorder_images(msg_related, workorder, workorder_id):
+    """
+    Attach workorder images once each, inline (cid:) with a filename so
+    clients also offer them for download. Encoded parts are cached per
+    work order and per image content, so repeat sends skip decode,
+    resize and base64.
+    """
+    attached_count = 0
+    total_size = 0
+    for cid, filename, subtype, payload, size in _workorder_image_parts(workorder, workorder_id):
+        part = MIMENonMultipart("image", subtype)
+        part.set_payload(payload)
+        part["Content-Transfer-Encoding"] = "base64"
+        part.add_header('Content-Disposition', 'inline', filename=filename)
+        part.add_header('Content-ID', f'<{cid}>')
+        part.add_header('X-Attachment-Id', cid)
+        msg_related.attach(part)
+        attached_count += 1
+        total_size += size
     return attached_count, total_size
 
 
@@ -197,15 +370,55 @@ def attach_workorder_images(msg, msg_related, workorder, workorder_id):
 # Database Operations
 # ----------------------------------------------------------------------
 def get_expiry_minutes_from_db(area):
-    """Get expiry minutes for a specific area from link_expiry_t table."""
+    """
+    Get expiry minutes for a specific area from link_expiry_t table
+    (cached for MASTER_DATA_TTL seconds).
+    """
+    return LINK_EXPIRY.get_or_load(area, lambda: _load_expiry_minutes(area))
+
+
+def _load_expiry_minutes(area):
     try:
         result = db.session.execute(
             text("SELECT expiry_minutes FROM link_expiry_t WHERE area = :area LIMIT 1"),
             {"area": area},
         ).fetchone()
-        return result.expiry_minutes if result else 15
-    except Exception:
-        return 15
+        return result.expiry_minutes if result else DEFAULT_EXPIRY_MINUTES
+    except Exception as e:
+        # The failed statement aborts the transaction; don't leave it to the caller.
+        # The default is cached too, so a missing table costs one query per TTL.
+        db.session.rollback()
+        print(f"[WARN] get_expiry_minutes_from_db: {e}; using {DEFAULT_EXPIRY_MINUTES} minutes")
+        return DEFAULT_EXPIRY_MINUTES
+
+
+def get_mail_image_mode(area, client):
+    """
+    EMBED or LINK for a work order, from mail_image_mode_t (area + client,
+    then client, then area), else MAIL_IMAGE_MODE. LINK needs a signing key.
+    """
+    rules = MAIL_IMAGE_MODES.get_or_load("all", _load_mail_image_modes)
+    mode = DEFAULT_MAIL_IMAGE_MODE
+    for scope in ((area, client), (None, client), (area, None)):
+        if scope in rules:
+            mode = rules[scope]
+            break
+    if mode == "LINK" and not url_signing.is_configured():
+        print("[WARN] MAIL_IMAGE_MODE LINK without URL_SIGNING_KEY; embedding images")
+        return "EMBED"
+    return mode
+
+
+def _load_mail_image_modes():
+    try:
+        rows = db.session.execute(
+            text("SELECT area, client, mode FROM mail_image_mode_t")
+        ).fetchall()
+        return {(r.area, r.client): r.mode.upper() for r in rows}
+    except Exception as e:
+        db.session.rollback()
+        print(f"[WARN] get_mail_image_mode: {e}; using {DEFAULT_MAIL_IMAGE_MODE}")
+        return {}
 
 
 def get_admin_emails_from_db():
@@ -227,31 +440,32 @@ def get_admin_emails_from_db():
 
 def get_admin_email_by_id(admin_id):
     """
-    Fetch admin email + name based on CREATED_BY value in workorder_t.
+    Fetch admin email + name based on CREATED_BY value in workorder_t
+    (cached for MASTER_DATA_TTL seconds).
     Returns: (email, name) OR None if not found.
     """
     try:
-        row = db.session.execute(
-            text("""
-                SELECT email_id, admin_name
-                FROM admins_t
-                WHERE "ADMIN_ID" = :aid
-                LIMIT 1
-            """),
-            {"aid": admin_id}
-        ).fetchone()
-
-        if row:
-            return (row.email_id, row.admin_name)
-
-        return None
-
+        return ADMIN_EMAILS.get_or_load(admin_id, lambda: _load_admin_email(admin_id))
     except Exception as e:
+        db.session.rollback()
         print(f"[ERROR] get_admin_email_by_id: {e}")
         traceback.print_exc()
         return None
 
 
+def _load_admin_email(admin_id):
+    row = db.session.execute(
+        text("""
+            SELECT email_id, admin_name
+            FROM admins_t
+            WHERE "ADMIN_ID" = :aid
+            LIMIT 1
+        """),
+        {"aid": admin_id}
+    ).fetchone()
+    return (row.email_id, row.admin_name) if row else None
+
+
 
 def get_contractor_from_db(provider_id):
     """Fetch contractor details from providers_t table."""
@@ -346,24 +560,98 @@ def update_workorder_status_in_db(workorder, status):
         raise
 
 
+def claim_workorder_status(workorder, status):
+    """
+    Conditionally set STATUS in a single UPDATE: an Accepted work order is
+    never overwritten, so when several contractors are offered the job at
+    once only the first accept wins.
+    Returns True if this call changed the row.
+    """
+    try:
+        row = db.session.execute(text("""
+            UPDATE workorder_t
+            SET "STATUS" = :status
+            WHERE "ID" = :wid
+              AND "STATUS" IS DISTINCT FROM 'Accepted'
+            RETURNING "ID"
+        """), {"status": status, "wid": workorder.ID}).fetchone()
+        db.session.commit()
+        db.session.refresh(workorder)
+        return row is not None
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERROR] claim_workorder_status: {e}")
+        raise
+
+
+def build_no_longer_available_html(workorder, contractor_name):
+    """E-mail / page body for contractors who did not win the claim."""
+    return f"""
+    <html>
+    <head><meta charset="UTF-8"></head>
+    <body style="font-family:Arial,sans-serif;line-height:1.6;color:#333;max-width:600px;margin:0 auto;padding:20px;">
+        <div style="background:#6c757d;padding:20px;border-radius:8px;margin-bottom:20px;">
+            <h2 style="margin:0;color:white;">Work Order No Longer Available</h2>
+        </div>
+        <p>Hello {contractor_name},</p>
+        <p>
+            Work order <strong>{workorder.WORKORDER}</strong> ({workorder.WORKORDER_AREA})
+            has already been accepted by another contractor. No action is needed.
+        </p>
+        <p>Thank you for your quick response.</p>
+    </body>
+    </html>
+    """
+
+
 # ----------------------------------------------------------------------
 # Email Sending Functions
 # ----------------------------------------------------------------------
-def build_assignment_email_html(workorder, contractor_name, response_url, expiry_minutes):
-    """Build HTML content for assignment email with inline images."""
+def workorder_image_url(public_base_url, workorder_id, index, size, expires_at):
+    """Signed /workorder-image URL for image ``index`` (1-based); size None = original."""
+    query = url_signing.sign_query(
+        f"{WORKORDER_IMAGE_URL_PURPOSE}/{workorder_id}", _image_url_params(index, size), expires_at
+    )
+    return f"{public_base_url}/api/workorders/workorder-image/{workorder_id}?{query}"
+
+
+def verify_workorder_image_url(workorder_id, index, size, args):
+    return url_signing.verify_query(
+        f"{WORKORDER_IMAGE_URL_PURPOSE}/{workorder_id}", _image_url_params(index, size), args
+    )
+
+
+def _image_url_params(index, size):
+    return {"index": index, "size": size} if size else {"index": index}
+
+
+def build_assignment_email_html(workorder, contractor_name, response_url, expiry_minutes,
+                                image_mode="EMBED", public_base_url=None):
+    """
+    Build HTML content for assignment email. EMBED references the inline
+    parts attached by send_email_with_attachments (cid:); LINK references
+    signed image URLs under public_base_url, so nothing is attached.
+    """
     workorder_id = workorder.ID
     
     # Parse images for inline display
     image_field = getattr(workorder, "image", None) or getattr(workorder, "IMAGE", None)
     images = parse_image_field(image_field)
+    link_expires_at = time.time() + (expiry_minutes + MAIL_IMAGE_LINK_GRACE_MINUTES) * 60
     inline_html = ""
     if images:
         inline_html += '<div style="display:flex;flex-wrap:wrap;gap:15px;margin:20px 0;">'
         for i in range(len(images)):
-            cid = f"image{i+1}@workorder{workorder_id}"
+            if image_mode == "LINK":
+                src = workorder_image_url(public_base_url, workorder_id, i + 1, MAIL_LINK_IMAGE_SIZE, link_expires_at)
+                full = workorder_image_url(public_base_url, workorder_id, i + 1, None, link_expires_at)
+                img_tag = f'<a href="{full}"><img src="{src}" style="max-width:280px;max-height:280px;display:block;border-radius:4px;" alt="Img {i+1}"/></a>'
+            else:
+                cid = f"image{i+1}@workorder{workorder_id}"
+                img_tag = f'<img src="cid:{cid}" style="max-width:280px;max-height:280px;display:block;border-radius:4px;" alt="Img {i+1}"/>'
             inline_html += f'''
             <div style="border:2px solid #ddd;padding:10px;border-radius:8px;background:#f9f9f9;text-align:center;">
-                <img src="cid:{cid}" style="max-width:280px;max-height:280px;display:block;border-radius:4px;" alt="Img {i+1}"/>
+                {img_tag}
                 <p style="margin:8px 0 0 0;font-size:13px;color:#666;">Image {i+1}</p>
             </div>'''
         inline_html += '</div>'
@@ -416,9 +704,10 @@ def build_assignment_email_html(workorder, contractor_name, response_url, expiry
     return html_body
 
 
-def send_email_with_attachments(workorder, contractor_email, contractor_name, html_body):
+def send_email_with_attachments(workorder, contractor_email, contractor_name, html_body, embed_images=True):
     """
-    Send email with workorder images as attachments.
+    Send email with workorder images as attachments (skipped with
+    embed_images=False, for LINK-mode bodies).
     Returns: (status_string, attached_count, attached_size)
     """
     workorder_id = workorder.ID
@@ -433,16 +722,17 @@ def send_email_with_attachments(workorder, contractor_email, contractor_name, ht
     alt.attach(MIMEText(html_body, "html"))
     related.attach(alt)
 
-    attached_cnt, attached_sz = attach_workorder_images(msg, related, workorder, workorder_id)
+    attached_cnt, attached_sz = 0, 0
+    if embed_images:
+        attached_cnt, attached_sz = attach_workorder_images(related, workorder, workorder_id)
     msg.attach(related)
 
     status = "UNSENT"
     try:
         if not EMAIL_USER or not EMAIL_PASS:
             raise RuntimeError("SMTP credentials missing")
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as srv:
-            srv.login(EMAIL_USER, EMAIL_PASS)
-            srv.send_message(msg)
+        with metrics.smtp_timer("send_email_with_attachments"):
+            smtp_pool.get_pool("workorder").send(msg)
         status = "SENT"
     except Exception as e:
         status = f"FAILED: {str(e)[:80]}"
@@ -518,9 +808,8 @@ def send_admin_notification_email(workorder, html_content, status_text, admins):
             msg["Bcc"] = ", ".join(admin_emails)
         msg.attach(MIMEText(html_content, "html"))
 
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(EMAIL_USER, EMAIL_PASS)
-            server.send_message(msg)
+        with metrics.smtp_timer("send_admin_notification_email"):
+            smtp_pool.get_pool("workorder").send(msg)
 
         print(f"[ADMIN] Notification sent (BCC) to: {admin_emails}")
         success = len(admin_emails)
@@ -545,17 +834,17 @@ def send_admin_notification_email(workorder, html_content, status_text, admins):
     return success, failed
 
 
-def get_first_workorder_image(workorder):
-    """Get first image data from workorder for serving."""
+def get_workorder_image(workorder, index):
+    """Get image ``index`` (1-based, as numbered in the e-mail) for serving."""
     field = getattr(workorder, "image", None) or getattr(workorder, "IMAGE", None)
     if not field:
         return None, None
 
     imgs = parse_image_field(field)
-    if not imgs:
+    if not 1 <= index <= len(imgs):
         return None, None
 
-    img_bytes, _ = decode_image(imgs[0])
+    img_bytes, _ = decode_image(imgs[index - 1])
     if not img_bytes:
         return None, None
 
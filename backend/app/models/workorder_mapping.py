@@ -1,6 +1,11 @@
 from app.models.database import db
+from app.models.workorder import WorkOrder
+from sqlalchemy import exists, text
 from datetime import datetime
 
+# Recursion limit for get_tree; the path array also stops cycles
+MAX_TREE_DEPTH = 20
+
 class WorkOrderMapping(db.Model):
     """
     Model for storing parent-child workorder mapping relationships.
@@ -40,6 +45,84 @@ class WorkOrderMapping(db.Model):
         ).all()
         return [r.child_workorder for r in records]
 
+    @staticmethod
+    def get_eligible_children(parent):
+        """
+        Unmapped child workorders with the parent's area and one of its types.
+        NOT EXISTS is an anti-join on idx_workorder_mapping_child instead of
+        an IN (...) over every workorder number.
+        """
+        parent_types = [t.strip() for t in (parent.WORKORDER_TYPE or "").split(",") if t.strip()]
+        already_mapped = exists().where(WorkOrderMapping.child_workorder == WorkOrder.WORKORDER)
+        return (
+            WorkOrder.query
+            .filter(
+                WorkOrder.WORKORDER_AREA == parent.WORKORDER_AREA,
+                WorkOrder.WORKORDER_TYPE.in_(parent_types),
+                WorkOrder.WORKORDER.like("%W%"),
+                ~already_mapped,
+            )
+            .all()
+        )
+
+    @staticmethod
+    def get_tree(root_workorder, max_depth=MAX_TREE_DEPTH):
+        """
+        Whole parent -> child tree under root_workorder in one recursive query.
+        Returns a nested dict, or None if the root does not exist.
+        """
+        rows = db.session.execute(text("""
+            WITH RECURSIVE tree AS (
+                SELECT w."WORKORDER" AS workorder,
+                       NULL::varchar AS parent_workorder,
+                       0 AS depth,
+                       ARRAY[w."WORKORDER"]::varchar[] AS path
+                FROM workorder_t w
+                WHERE w."WORKORDER" = :root
+
+                UNION ALL
+
+                SELECT m.child_workorder,
+                       m.parent_workorder,
+                       t.depth + 1,
+                       t.path || m.child_workorder::varchar
+                FROM tree t
+                JOIN workorder_mapping_t m ON m.parent_workorder = t.workorder
+                WHERE t.depth < :max_depth
+                  AND NOT (m.child_workorder = ANY(t.path))
+            )
+            SELECT t.workorder, t.parent_workorder, t.depth,
+                   w."ID", w."STATUS", w."WORKORDER_TYPE", w."WORKORDER_AREA"
+            FROM tree t
+            LEFT JOIN workorder_t w ON w."WORKORDER" = t.workorder
+            ORDER BY t.depth, t.workorder
+        """), {"root": root_workorder, "max_depth": max_depth}).fetchall()
+
+        if not rows:
+            return None
+
+        nodes = {}
+        root = None
+        for r in rows:
+            if r.workorder in nodes:
+                # Reached through a second parent: keep the first (shallowest) placement
+                continue
+            node = {
+                "ID": r.ID,
+                "WORKORDER": r.workorder,
+                "STATUS": r.STATUS,
+                "WORKORDER_TYPE": r.WORKORDER_TYPE,
+                "WORKORDER_AREA": r.WORKORDER_AREA,
+                "depth": r.depth,
+                "children": [],
+            }
+            nodes[r.workorder] = node
+            if r.parent_workorder is None:
+                root = node
+            else:
+                nodes[r.parent_workorder]["children"].append(node)
+        return root
+
     @staticmethod
     def create_mapping(parent_workorder, child_workorder):
         """Create a new parent-child mapping."""
@@ -1,6 +1,9 @@
 from app.models.database import db
 from sqlalchemy import text
 
+# Active types list cached by WorkOrder.get_workorder_types; cleared by the CRUD controller
+WORKORDER_TYPES_CACHE = "workorder_types"
+
 class WorkOrderTypeModel:
     __tablename__ = "workorder_type_t"
 
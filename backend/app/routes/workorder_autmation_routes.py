@@ -35,9 +35,11 @@ def retry_automation(workorder_id):
     """
     Manually trigger automation retry for a failed workorder.
     Admin can use this if automation stopped unexpectedly.
+    Optional JSON: {"fanout": K} to offer the job to K contractors at once.
     """
     base_url = request.host_url.rstrip("/")
-    response_data, status_code = handle_trigger_manual_retry(workorder_id, base_url)
+    fanout = (request.get_json(silent=True) or {}).get("fanout")
+    response_data, status_code = handle_trigger_manual_retry(workorder_id, base_url, fanout)
     return jsonify(response_data), status_code
 
 
@@ -3,6 +3,8 @@ from urllib.parse import unquote
 
 from flask import Blueprint, jsonify, request, send_file
 
+from app.utils import image_derivatives
+
 from app.controllers.workorder_mail_controller import (
     handle_send_acceptance_mail,
     handle_get_workorder_image,
@@ -41,9 +43,13 @@ def send_acceptance_mail(workorder_id):
 @workorder_mail_bp.route("/workorder-image/<int:workorder_id>")
 def workorder_image(workorder_id):
     """
-    Serve the first image from a workorder as a downloadable file.
+    Serve a workorder image (?index=, 1-based, default the first) as a
+    downloadable file, or a resized variant when ?size= is given.
+    Links from LINK-mode e-mails also carry ?expires=&sig=.
     """
-    result = handle_get_workorder_image(workorder_id)
+    index = request.args.get("index", 1, type=int)
+    size = request.args.get("size")
+    result = handle_get_workorder_image(workorder_id, index=index, size=size, args=request.args)
     
     # Check if it's an error response (HTML string)
     if isinstance(result, tuple) and isinstance(result[0], str):
@@ -51,11 +57,20 @@ def workorder_image(workorder_id):
     
     # It's image data
     img_bytes, img_type = result
-    return send_file(
-        BytesIO(img_bytes),
-        mimetype=f"image/{img_type}",
-        as_attachment=True,
-        download_name=f"workorder_{workorder_id}.{img_type}"
+
+    def original():
+        return send_file(
+            BytesIO(img_bytes),
+            mimetype=f"image/{img_type}",
+            as_attachment=True,
+            download_name=f"workorder_{workorder_id}_image_{index}.{img_type}"
+        )
+
+    # ?size=thumb|small|medium (&format=webp|jpeg) for list thumbnails / e-mail previews
+    if not size:
+        return original()
+    return image_derivatives.send_derivative(
+        img_bytes, size, request.args.get("format"), request.headers.get("Accept"), original
     )
 
 
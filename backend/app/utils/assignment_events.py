@@ -0,0 +1,166 @@
+"""
+Accept / reject events for work order assignments.
+
+The respond-workorder handler calls publish() after it has committed the
+new STATUS. Callbacks registered in this process with subscribe_all() are
+called directly. Other processes receive the event through Postgres
+NOTIFY on CHANNEL, picked up by a LISTEN thread that subscribe_all()
+starts. Only the scheduler (run_scheduler.py) subscribes; web processes
+publish but never listen.
+
+publish_invalidation() uses the same channel to clear cache_utils caches
+in the scheduler after a web process writes.
+
+    assignment_events.subscribe_all(callback)   # callback(event) per event
+"""
+
+import json
+import select
+import threading
+import time
+import traceback
+
+from sqlalchemy import text
+
+from app.models.database import db
+from app.utils import cache_utils
+
+CHANNEL = "workorder_assignment"
+# Cache invalidation, sent on the same channel (see publish_invalidation)
+INVALIDATE = "invalidate"
+LISTEN_POLL_SECONDS = 5
+RECONNECT_DELAY_SECONDS = 5
+
+_registry_lock = threading.Lock()
+_callbacks = []            # called for every event (the scheduler)
+_listener = None
+
+
+def subscribe_all(callback):
+    """
+    Call ``callback(event)`` for every event, from the delivering thread.
+    Must be called inside an app context (the listener needs db.engine).
+    """
+    _ensure_listener()
+    with _registry_lock:
+        _callbacks.append(callback)
+
+
+def _dispatch(event):
+    if event.get("action") != INVALIDATE:
+        try:
+            int(event["workorder_id"])
+        except (KeyError, TypeError, ValueError):
+            print(f"[EVENTS] Ignoring malformed event: {event}")
+            return
+    with _registry_lock:
+        callbacks = list(_callbacks)
+    for callback in callbacks:
+        try:
+            callback(event)
+        except Exception as e:
+            print(f"[EVENTS] Callback failed: {e}")
+
+
+def publish(workorder_id, contractor_id, action, status=None):
+    """
+    Announce an accept/reject, or "scheduled" for a new assignment job.
+    Call after committing the change: the NOTIFY goes out on its own
+    connection, so the scheduler could otherwise read the old state.
+    Never raises: a lost NOTIFY only means the scheduler notices at the
+    deadline or its next rescan instead of immediately.
+    """
+    _send({
+        "workorder_id": int(workorder_id),
+        "contractor_id": contractor_id,
+        "action": action,
+        "status": status,
+        "ts": time.time(),
+    })
+
+
+def publish_invalidation(*cache_names):
+    """
+    Clear the named cache_utils caches here and in the scheduler, the only
+    listening process (it reads the contractor candidate cache). Call after
+    the write is committed. Never raises: if the NOTIFY is lost the other
+    processes catch up when their TTL expires.
+    """
+    cache_utils.invalidate(*cache_names)
+    _send({"action": INVALIDATE, "caches": list(cache_names), "ts": time.time()}, dispatch=False)
+
+
+def _send(event, dispatch=True):
+    if dispatch:
+        # In-process callbacks: no round trip needed
+        _dispatch(event)
+
+    # Own connection and transaction: the caller's session (and anything
+    # still pending in it) is neither committed nor rolled back here
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": CHANNEL, "payload": json.dumps(event)},
+            )
+    except Exception as e:
+        print(f"[EVENTS] pg_notify failed (in-process callbacks already called): {e}")
+
+
+# ----------------------------------------------------------------------
+# LISTEN thread
+# ----------------------------------------------------------------------
+class _Listener(threading.Thread):
+    def __init__(self, dsn):
+        super().__init__(name="assignment-events-listener", daemon=True)
+        self.dsn = dsn
+
+    def run(self):
+        import psycopg2
+        import psycopg2.extensions
+
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+                print(f"[EVENTS] Listening on '{CHANNEL}'")
+
+                while True:
+                    if select.select([conn], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            _dispatch(json.loads(notify.payload))
+                        except ValueError:
+                            print(f"[EVENTS] Bad payload: {notify.payload!r}")
+            except Exception as e:
+                print(f"[EVENTS] Listener error, reconnecting in {RECONNECT_DELAY_SECONDS}s: {e}")
+                traceback.print_exc()
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            time.sleep(RECONNECT_DELAY_SECONDS)
+
+
+def _ensure_listener():
+    global _listener
+    with _registry_lock:
+        if _listener is not None:
+            return
+        try:
+            url = db.engine.url.set(drivername="postgresql")
+            _listener = _Listener(url.render_as_string(hide_password=False))
+            _listener.start()
+        except Exception as e:
+            # Cross-process events are lost until the next attempt;
+            # in-process publish() still reaches the callbacks.
+            print(f"[EVENTS] Could not start listener: {e}")
+            _listener = None
@@ -0,0 +1,372 @@
+"""
+Content-addressed upload store.
+
+Every uploaded file is stored once under uploads/cas/<aa>/<bb>/<sha256><ext>
+and referenced by its URL path ("/uploads/cas/aa/bb/<sha256>.jpg"). That
+content key is stable, so the same photo attached to a parent and all its
+children occupies disk space once.
+
+upload_blobs_t keeps a reference count per key (see migrations/004).
+References are written in the caller's DB transaction and committed with
+it. collect_garbage() removes blobs whose count has dropped to zero.
+
+Provider / company documents (profile picture, certificates, logo, bank
+statements) are stored the same way; their rows keep only a descriptor
+(see store_document and migrations/011).
+"""
+
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+
+from sqlalchemy import text
+from werkzeug.utils import secure_filename
+
+from app.models.database import db
+
+# Same directory the workorder controller has always written to (backend/uploads)
+UPLOAD_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "uploads"))
+CAS_DIR = "cas"
+KEY_PREFIX = f"/uploads/{CAS_DIR}/"
+# Exactly what content_key() produces; anything else is not a store key
+KEY_PATTERN = re.compile(r"^/uploads/cas/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]+)?$")
+EXT_PATTERN = re.compile(r"^\.[a-z0-9]+$")
+CHUNK_SIZE = 64 * 1024
+
+# Unreferenced blobs and stray temp files younger than this are left alone,
+# so an upload that is still being committed is never collected.
+GC_GRACE_SECONDS = 3600
+
+
+# ----------------------------------------------------------------------
+# Keys / paths
+# ----------------------------------------------------------------------
+def content_key(sha256_hex, ext=""):
+    return f"{KEY_PREFIX}{sha256_hex[:2]}/{sha256_hex[2:4]}/{sha256_hex}{ext}"
+
+
+def is_content_key(value):
+    return isinstance(value, str) and KEY_PATTERN.fullmatch(value) is not None
+
+
+def key_to_path(key):
+    """Filesystem path for a content key. Raises ValueError for anything else."""
+    if not is_content_key(key):
+        raise ValueError(f"Not a content key: {key!r}")
+    cas_root = os.path.realpath(os.path.join(UPLOAD_ROOT, CAS_DIR))
+    path = os.path.realpath(os.path.join(UPLOAD_ROOT, key[len("/uploads/"):]))
+    if os.path.commonpath([cas_root, path]) != cas_root:
+        raise ValueError(f"Content key outside the store: {key!r}")
+    return path
+
+
+def content_key_for_path(path):
+    rel = os.path.relpath(path, UPLOAD_ROOT).replace(os.sep, "/")
+    return f"/uploads/{rel}"
+
+
+def iter_keys(image_field):
+    """Yield the content keys found in an image / closing_images JSON value."""
+    if not image_field:
+        return
+    if isinstance(image_field, dict):
+        for value in image_field.values():
+            yield from iter_keys(value)
+    elif isinstance(image_field, (list, tuple)):
+        for value in image_field:
+            yield from iter_keys(value)
+    elif is_content_key(image_field):
+        yield image_field
+
+
+# ----------------------------------------------------------------------
+# Writes
+# ----------------------------------------------------------------------
+def store_stream(stream, filename="", add_ref=True):
+    """
+    Copy ``stream`` into the store, hashing each chunk as it is written.
+    Identical content is detected after the copy and the duplicate is
+    dropped. Returns (key, sha256, size).
+    """
+    ext = os.path.splitext(secure_filename(filename or ""))[1].lower()
+    if not EXT_PATTERN.fullmatch(ext):
+        ext = ""
+    tmp_dir = os.path.join(UPLOAD_ROOT, CAS_DIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    hasher = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+
+        digest = hasher.hexdigest()
+        key = content_key(digest, ext)
+        path = key_to_path(key)
+
+        if os.path.exists(path):
+            # Already stored: drop the copy, refresh mtime so GC keeps it
+            os.remove(tmp_path)
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if add_ref:
+        add_reference(key, digest, size)
+    return key, digest, size
+
+
+def store_file(file_storage, add_ref=True):
+    """Store a werkzeug FileStorage. Rewinds the stream so callers can still read it."""
+    result = store_stream(file_storage.stream, file_storage.filename, add_ref)
+    file_storage.stream.seek(0)
+    return result
+
+
+def store_bytes(data, filename="", add_ref=True):
+    return store_stream(io.BytesIO(data), filename, add_ref)
+
+
+# ----------------------------------------------------------------------
+# Documents
+# ----------------------------------------------------------------------
+# Document columns hold a descriptor instead of the file:
+#   {"key": "/uploads/cas/..", "size": 1234, "mime": "application/pdf", "sha256": ".."}
+MIME_SNIFF_BYTES = 2048
+
+# Types get_image will serve inline. Raster images only: an SVG (image/svg+xml)
+# can carry script and would run on the API origin.
+DOCUMENT_MIMES = frozenset({"image/jpeg", "image/png", "image/gif", "image/webp", "application/pdf"})
+
+
+def is_document_mime(mime):
+    return mime in DOCUMENT_MIMES
+
+
+def sniff_mime(head):
+    import magic
+    try:
+        return magic.from_buffer(head, mime=True) or "application/octet-stream"
+    except Exception:
+        return "application/octet-stream"
+
+
+def store_document(source, filename=""):
+    """
+    Store an uploaded document (FileStorage or bytes) and return its
+    descriptor. The reference is committed with the caller's transaction.
+    Raises ValueError for anything outside DOCUMENT_MIMES.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        stream = io.BytesIO(bytes(source))
+    else:
+        stream, filename = source.stream, filename or source.filename
+    head = stream.read(MIME_SNIFF_BYTES)
+    stream.seek(0)
+    mime = sniff_mime(head)
+    if not is_document_mime(mime):
+        raise ValueError(f"Unsupported file type '{mime}'. Upload a JPEG, PNG, GIF, WebP or PDF file")
+    if not os.path.splitext(filename or "")[1]:
+        filename = "document" + (mimetypes.guess_extension(mime) or "")
+    key, digest, size = store_stream(stream, filename)
+    stream.seek(0)
+    return describe(key, digest, size, mime)
+
+
+def describe(key, sha256, size, mime):
+    return {"key": key, "size": size, "mime": mime, "sha256": sha256}
+
+
+def descriptor_param(descriptor):
+    """Bind value for a JSONB descriptor column (None stays NULL)."""
+    return json.dumps(descriptor) if descriptor else None
+
+
+def document_path(descriptor):
+    return key_to_path(descriptor["key"])
+
+
+def read_document(descriptor):
+    with open(document_path(descriptor), "rb") as f:
+        return f.read()
+
+
+def document_bytes(descriptor, legacy=None):
+    """
+    File content for a document column: from the store, or from the
+    legacy BYTEA value of a row migrate_blobs.py has not reached yet.
+    """
+    if descriptor:
+        return read_document(descriptor)
+    if isinstance(legacy, memoryview):
+        return legacy.tobytes()
+    return legacy or None
+
+
+def release_documents(descriptors):
+    """Drop the references held by replaced descriptors (no commit)."""
+    release_references(d["key"] for d in descriptors if d)
+
+
+# ----------------------------------------------------------------------
+# Reference counting (no commit: rides on the caller's transaction)
+# ----------------------------------------------------------------------
+def add_reference(key, sha256=None, size=None, count=1):
+    db.session.execute(text("""
+        INSERT INTO upload_blobs_t (content_key, sha256, size_bytes, ref_count, created_at, updated_at)
+        VALUES (:key, :sha, :size, :count, NOW(), NOW())
+        ON CONFLICT (content_key) DO UPDATE
+            SET ref_count = upload_blobs_t.ref_count + EXCLUDED.ref_count,
+                updated_at = NOW()
+    """), {"key": key, "sha": sha256, "size": size, "count": count})
+
+
+def add_references(keys):
+    """
+    Count references for keys the store actually holds (a row, or a file
+    store_stream wrote). Anything else came from a client and is ignored.
+    """
+    counts = Counter(k for k in keys if is_content_key(k))
+    if not counts:
+        return
+    known = {
+        r.content_key for r in db.session.execute(
+            text("SELECT content_key FROM upload_blobs_t WHERE content_key = ANY(:keys)"),
+            {"keys": list(counts)},
+        )
+    }
+    for key, count in counts.items():
+        if key in known:
+            add_reference(key, count=count)
+            continue
+        path = key_to_path(key)
+        if not os.path.isfile(path):
+            print(f"[BLOB] Ignoring reference to unknown key {key}")
+            continue
+        sha256 = os.path.splitext(os.path.basename(path))[0]
+        add_reference(key, sha256, os.path.getsize(path), count=count)
+
+
+def release_references(keys):
+    for key, count in Counter(k for k in keys if is_content_key(k)).items():
+        db.session.execute(text("""
+            UPDATE upload_blobs_t
+            SET ref_count = GREATEST(ref_count - :count, 0),
+                updated_at = NOW()
+            WHERE content_key = :key
+        """), {"key": key, "count": count})
+
+
+# ----------------------------------------------------------------------
+# Garbage collection
+# ----------------------------------------------------------------------
+def collect_garbage(grace_seconds=GC_GRACE_SECONDS, batch_size=500):
+    """
+    Delete unreferenced blobs older than the grace period, plus files on
+    disk that never got a reference row (e.g. the create that stored them
+    rolled back). Returns {"deleted": n, "bytes_freed": bytes}.
+    """
+    cutoff = time.time() - grace_seconds
+    deleted = 0
+    freed = 0
+
+    def unlink_if_stale(path):
+        nonlocal deleted, freed
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return True
+        if stat.st_mtime > cutoff:
+            return False
+        os.remove(path)
+        deleted += 1
+        freed += stat.st_size
+        return True
+
+    def row_gone(key):
+        try:
+            path = key_to_path(key)
+        except ValueError:
+            # Never a store file: drop the row, touch nothing on disk
+            print(f"[BLOB GC] dropping row for invalid key {key!r}")
+            return True
+        return unlink_if_stale(path)
+
+    # 1) Zero-ref rows. A file touched again since (re-uploaded) is skipped,
+    #    not a reason to stop: keep going until no candidates are left.
+    skipped = []
+    while True:
+        rows = db.session.execute(text("""
+            SELECT content_key FROM upload_blobs_t
+            WHERE ref_count <= 0
+              AND updated_at < NOW() - make_interval(secs => :grace)
+              AND content_key <> ALL(:skipped)
+            ORDER BY updated_at
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        """), {"grace": grace_seconds, "limit": batch_size, "skipped": skipped}).fetchall()
+        if not rows:
+            db.session.commit()
+            break
+
+        gone = []
+        for r in rows:
+            (gone if row_gone(r.content_key) else skipped).append(r.content_key)
+        if gone:
+            db.session.execute(
+                text("DELETE FROM upload_blobs_t WHERE content_key = ANY(:keys) AND ref_count <= 0"),
+                {"keys": gone},
+            )
+        db.session.commit()
+
+    # 2) Orphan files and stale temp files
+    cas_root = os.path.join(UPLOAD_ROOT, CAS_DIR)
+    tmp_dir = os.path.join(cas_root, "tmp")
+    pending = []
+
+    def check_orphans():
+        keys = [content_key_for_path(p) for p in pending]
+        known = {
+            r.content_key for r in db.session.execute(
+                text("SELECT content_key FROM upload_blobs_t WHERE content_key = ANY(:keys)"),
+                {"keys": keys},
+            )
+        }
+        for path, key in zip(pending, keys):
+            if key not in known:
+                unlink_if_stale(path)
+        pending.clear()
+
+    for dirpath, _, filenames in os.walk(cas_root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if dirpath == tmp_dir:
+                unlink_if_stale(path)
+                continue
+            pending.append(path)
+            if len(pending) >= batch_size:
+                check_orphans()
+    if pending:
+        check_orphans()
+    db.session.commit()
+
+    print(f"[BLOB GC] deleted={deleted} bytes_freed={freed}")
+    return {"deleted": deleted, "bytes_freed": freed}
@@ -0,0 +1,163 @@
+"""
+Small in-process TTL caches.
+
+Caches are registered by name so the code that changes the underlying
+data can invalidate them without importing the module that reads them:
+
+    CANDIDATES = cache_utils.get_cache("contractor_candidates", ttl_seconds=60)
+    rows = CANDIDATES.get_or_load(key, lambda: query(...))
+    ...
+    cache_utils.invalidate("contractor_candidates")   # after a write
+
+Entries are per process. Other processes see a change once their TTL
+expires, unless the writer uses assignment_events.publish_invalidation().
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+_registry_lock = threading.Lock()
+_caches = {}
+
+
+class TTLCache:
+    def __init__(self, name, ttl_seconds=60, maxsize=1024):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._data = OrderedDict()     # key -> (expires_at, value), LRU order
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                self._discard(key)
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._discard(next(iter(self._data)))
+
+    def get_or_load(self, key, loader):
+        """Return the cached value, calling ``loader()`` on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=_MISSING):
+        """Drop one key, or everything when no key is given."""
+        with self._lock:
+            if key is _MISSING:
+                self._data.clear()
+            elif key in self._data:
+                self._discard(key)
+
+    def _discard(self, key):
+        # Caller holds the lock
+        del self._data[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+class ByteLRUCache(TTLCache):
+    """
+    TTLCache bounded by the total size of its values (``sizeof(value)``)
+    instead of the entry count. Values larger than the whole budget are
+    not cached.
+    """
+
+    def __init__(self, name, max_bytes, ttl_seconds=3600, sizeof=len):
+        super().__init__(name, ttl_seconds, maxsize=sys.maxsize)
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self._sizes = {}
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._discard(key)
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._sizes[key] = size
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._discard(next(iter(self._data)))
+
+    def invalidate(self, key=_MISSING):
+        # One lock hold: a set() in between would leave _data and _sizes apart
+        with self._lock:
+            if key is _MISSING:
+                self._data.clear()
+                self._sizes.clear()
+                self.bytes = 0
+            elif key in self._data:
+                self._discard(key)
+
+    def _discard(self, key):
+        del self._data[key]
+        self.bytes -= self._sizes.pop(key)
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats.update(bytes=self.bytes, max_bytes=self.max_bytes)
+        return stats
+
+
+def get_cache(name, ttl_seconds=60, maxsize=1024):
+    """Return the cache registered under ``name``, creating it on first use."""
+    with _registry_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = TTLCache(name, ttl_seconds, maxsize)
+        return cache
+
+
+def get_byte_cache(name, max_bytes, ttl_seconds=3600, sizeof=len):
+    """Like get_cache, for a ByteLRUCache holding at most ``max_bytes``."""
+    with _registry_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = ByteLRUCache(name, max_bytes, ttl_seconds, sizeof)
+        return cache
+
+
+def invalidate(*names):
+    """Clear the named caches (all of them when called without names)."""
+    with _registry_lock:
+        targets = [_caches[n] for n in names if n in _caches] if names else list(_caches.values())
+    for cache in targets:
+        cache.invalidate()
+
+
+def all_stats():
+    with _registry_lock:
+        caches = list(_caches.values())
+    return {c.name: c.stats() for c in caches}
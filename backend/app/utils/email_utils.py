@@ -1,47 +1,77 @@
 # backend/app/utils/email_utils.py
 
 import os
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 
 from app.config import Config
+from app.models.email_outbox_model import enqueue_email
+from app.utils import metrics, smtp_pool
 
 EMAIL = Config.EMAIL_CONFIG
 FRONTEND_URL = Config.FRONTEND_URL.rstrip("/")  # e.g. http://44.222.194.21
 FROM_EMAIL = Config.FROM_EMAIL or EMAIL.get("sender_email")
 
 
-def send_email(to_email: str, subject: str, body: str, attachment: str | None = None):
+def send_email(to_email: str, subject: str, body: str, attachment=None,
+               attachment_name: str | None = None, subtype: str = "plain", profile: str = "default"):
     """
-    Generic email sender using SMTP settings from Config.EMAIL_CONFIG
-    and FROM_EMAIL / SMTP_USER as sender.
+    Send one email now, over the pooled SMTP connection for ``profile``.
+    ``attachment`` is a file path or raw bytes. Request handlers should use
+    queue_email instead; this is what the outbox workers call.
     """
     msg = MIMEMultipart()
     msg["Subject"] = subject
     msg["From"] = FROM_EMAIL
     msg["To"] = to_email
-    msg.attach(MIMEText(body))
+    msg.attach(MIMEText(body, subtype))
 
     # Optional attachment
     if attachment:
-        with open(attachment, "rb") as f:
-            part = MIMEApplication(f.read(), Name=os.path.basename(attachment))
-        part["Content-Disposition"] = f'attachment; filename="{os.path.basename(attachment)}"'
+        if isinstance(attachment, (bytes, memoryview)):
+            data, name = bytes(attachment), attachment_name or "attachment"
+        else:
+            with open(attachment, "rb") as f:
+                data = f.read()
+            name = attachment_name or os.path.basename(attachment)
+        part = MIMEApplication(data, Name=name)
+        part["Content-Disposition"] = f'attachment; filename="{name}"'
         msg.attach(part)
 
-    with smtplib.SMTP(EMAIL["smtp_server"], EMAIL["smtp_port"]) as server:
-        # Always use STARTTLS (works for Gmail, etc.)
-        server.starttls()
-        server.login(EMAIL["sender_email"], EMAIL["sender_password"])
-        server.send_message(msg)
+    with metrics.smtp_timer("send_email"):
+        # Pooled connection: STARTTLS + login happen once per connection
+        smtp_pool.get_pool(profile).send(msg)
 
     return True
 
 
+def queue_email(to_email: str, subject: str, body: str, attachment: str | None = None,
+                idempotency_key: str | None = None, certificate: dict | None = None,
+                attachment_name: str | None = None):
+    """
+    Queue an email in email_outbox_t (no commit) for run_mail_worker.py.
+    Call it before the model call that commits the change it reports, so
+    both are committed together. ``attachment`` is read now, so the file
+    may be deleted afterwards. ``certificate`` (details for
+    pdf_utils) is rendered and attached at delivery instead.
+    """
+    data = None
+    name = attachment_name
+    if attachment:
+        with open(attachment, "rb") as f:
+            data = f.read()
+        name = name or os.path.basename(attachment)
+    return enqueue_email(
+        to_email, subject, body,
+        attachment=data, attachment_name=name, idempotency_key=idempotency_key,
+        attachment_certificate=certificate,
+    )
+
+
 # ===============================================================
 # ✅ Provider Email Templates
+# (queued via queue_email; the caller's next commit sends them)
 # ===============================================================
 
 def send_activation_email(email: str, token: str):
@@ -64,7 +94,7 @@ def send_activation_email(email: str, token: str):
     Regards,
     Ontract Team
     """
-    return send_email(email, subject, body.strip())
+    return queue_email(email, subject, body.strip(), idempotency_key=f"activation:{token}")
 
 
 def send_otp_email(email: str, otp: str):
@@ -80,7 +110,7 @@ def send_otp_email(email: str, otp: str):
     Thank you,
     Ontract
     """
-    return send_email(email, subject, body.strip())
+    return queue_email(email, subject, body.strip(), idempotency_key=f"otp:{email}:{otp}")
 
 
 def send_reset_otp_email(email: str, otp: str):
@@ -96,7 +126,7 @@ def send_reset_otp_email(email: str, otp: str):
     Thank you,
     Ontract
     """
-    return send_email(email, subject, body.strip())
+    return queue_email(email, subject, body.strip(), idempotency_key=f"reset-otp:{email}:{otp}")
 
 
 # ===============================================================
@@ -123,7 +153,7 @@ def send_contractor_activation_email(email: str, token: str):
     Regards,
     Ontract Team
     """
-    return send_email(email, subject, body.strip())
+    return queue_email(email, subject, body.strip(), idempotency_key=f"activation:{token}")
 
 
 def send_contractor_otp_email(email: str, otp: str):
@@ -139,7 +169,7 @@ def send_contractor_otp_email(email: str, otp: str):
     Regards,
     Ontract Team
     """
-    return send_email(email, subject, body.strip())
+    return queue_email(email, subject, body.strip(), idempotency_key=f"contractor-otp:{email}:{otp}")
 
 
 def send_contractor_profile_submitted_email(email: str, company_name: str):
@@ -153,7 +183,7 @@ def send_contractor_profile_submitted_email(email: str, company_name: str):
     Regards,
     Ontract Admin Team
     """
-    return send_email(email, subject, body.strip())
+    return queue_email(email, subject, body.strip())
 
 
 def send_admin_new_contractor_notification(admin_email: str, company_name: str, email: str):
@@ -166,7 +196,7 @@ def send_admin_new_contractor_notification(admin_email: str, company_name: str,
 
     Please log in to the Admin Portal to review and approve.
     """
-    return send_email(admin_email, subject, body.strip())
+    return queue_email(admin_email, subject, body.strip())
 
 
 def send_admin_otp_email(email: str, otp: str):
@@ -181,5 +211,5 @@ def send_admin_otp_email(email: str, otp: str):
     Thanks,
     Ontract
     """.strip()
-    return send_email(email, subject, body)
+    return queue_email(email, subject, body, idempotency_key=f"admin-otp:{email}:{otp}")
 
@@ -0,0 +1,240 @@
+"""
+Image derivatives (thumbnails / previews).
+
+Each (source, preset, format) variant is rendered once by a process pool,
+written to uploads/derivatives/ and reused from there. The directory is a
+size-bounded LRU cache: hits bump the file's mtime and the oldest files are
+evicted once DERIVATIVE_CACHE_MAX_MB is exceeded.
+
+Request threads only wait on the render future; they never run Pillow.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from app.utils import blob_store
+
+# Longest edge in pixels
+PRESETS = {
+    "thumb": 160,
+    "small": 480,
+    "medium": 1024,
+}
+
+# format -> (Pillow format, mimetype, extension, save options)
+FORMATS = {
+    "webp": ("WEBP", "image/webp", ".webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", ".jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+CACHE_DIR = os.path.join(blob_store.UPLOAD_ROOT, "derivatives")
+CACHE_MAX_BYTES = int(os.getenv("DERIVATIVE_CACHE_MAX_MB", "512")) * 1024 * 1024
+MAX_WORKERS = int(os.getenv("DERIVATIVE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# How long a request waits for a render before falling back to the original
+WAIT_SECONDS = float(os.getenv("DERIVATIVE_WAIT_SECONDS", "10"))
+
+
+class DerivativePending(Exception):
+    """Render still running after WAIT_SECONDS; it keeps going in the pool."""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_lock = threading.Lock()
+_in_flight = {}
+_cache_bytes = None
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a process holding DB connections / request threads
+            _pool = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def pick_format(requested, accept_header):
+    """Explicit ?format= wins, otherwise WebP when the client accepts it."""
+    if requested:
+        return requested if requested in FORMATS else None
+    return "webp" if "image/webp" in (accept_header or "") else "jpeg"
+
+
+# ----------------------------------------------------------------------
+# Rendering (runs in the worker processes)
+# ----------------------------------------------------------------------
+def _render(source, max_edge, pil_format, save_options, out_path):
+    import io
+    from PIL import Image, ImageOps
+
+    src = io.BytesIO(source) if isinstance(source, bytes) else source
+    with Image.open(src) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_edge, max_edge))
+        if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGBA")
+
+        tmp_path = f"{out_path}.{os.getpid()}.tmp"
+        img.save(tmp_path, pil_format, **save_options)
+    os.replace(tmp_path, out_path)
+    return os.path.getsize(out_path)
+
+
+# ----------------------------------------------------------------------
+# Cache
+# ----------------------------------------------------------------------
+def _source_id(source):
+    """
+    Stable identity of the source. Content-addressed files already carry
+    their hash; other files use path+mtime+size; raw bytes are hashed.
+    """
+    if isinstance(source, bytes):
+        return hashlib.sha256(source).hexdigest()
+    if source.startswith(os.path.join(blob_store.UPLOAD_ROOT, blob_store.CAS_DIR)):
+        return os.path.splitext(os.path.basename(source))[0]
+    st = os.stat(source)
+    return f"{os.path.abspath(source)}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def derivative_name(source, preset, fmt):
+    digest = hashlib.sha256(f"{_source_id(source)}|{preset}|{fmt}".encode()).hexdigest()
+    return f"{digest}{FORMATS[fmt][2]}"
+
+
+def _scan_cache():
+    total = 0
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        total += st.st_size
+        entries.append((st.st_mtime, st.st_size, path))
+    return total, entries
+
+
+def _account(added_bytes):
+    """Track cache size and evict least recently used files when over budget."""
+    global _cache_bytes
+    with _lock:
+        if _cache_bytes is None:
+            _cache_bytes, _ = _scan_cache()
+        else:
+            _cache_bytes += added_bytes
+        if _cache_bytes <= CACHE_MAX_BYTES:
+            return
+
+        total, entries = _scan_cache()
+        target = int(CACHE_MAX_BYTES * 0.9)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        _cache_bytes = total
+    print(f"[DERIVATIVES] evicted {evicted} files, cache now {total} bytes")
+
+
+def get_derivative(source, preset, fmt, wait=WAIT_SECONDS):
+    """
+    Path of the ``preset``/``fmt`` variant of ``source`` (a file path or
+    raw bytes), rendering it in the pool on first use. Concurrent requests
+    for the same variant share one render. Raises DerivativePending if it
+    is not ready within ``wait`` seconds.
+    """
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown size '{preset}'. Use one of: {', '.join(PRESETS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    name = derivative_name(source, preset, fmt)
+    out_path = os.path.join(CACHE_DIR, name)
+
+    if os.path.exists(out_path):
+        os.utime(out_path)  # LRU: mark as recently used
+        return out_path
+
+    submitted = False
+    with _lock:
+        future = _in_flight.get(name)
+        if future is None:
+            pil_format, _, _, options = FORMATS[fmt]
+            future = _get_pool().submit(_render, source, PRESETS[preset], pil_format, options, out_path)
+            _in_flight[name] = future
+            submitted = True
+    if submitted:
+        # Outside the lock: the callback runs inline if the render already finished
+        future.add_done_callback(lambda f, n=name: _finish(n, f))
+
+    try:
+        future.result(timeout=wait)
+    except FutureTimeout:
+        raise DerivativePending(name)
+    return out_path
+
+
+def _finish(name, future):
+    with _lock:
+        _in_flight.pop(name, None)
+    if future.exception() is not None:
+        print(f"[DERIVATIVES] render failed for {name}: {future.exception()}")
+        return
+    _account(future.result())
+
+
+def mimetype_for(fmt):
+    return FORMATS[fmt][1]
+
+
+def send_derivative(source, preset, requested_format, accept_header, fallback):
+    """
+    Flask response for a variant, with ETag / If-None-Match handling.
+    ``fallback`` returns the original when the render is still pending or
+    fails, so <img> tags never break.
+    """
+    from flask import jsonify, send_file
+
+    fmt = pick_format(requested_format, accept_header)
+    if fmt is None or preset not in PRESETS:
+        return jsonify({
+            "error": "Invalid size/format",
+            "sizes": list(PRESETS),
+            "formats": list(FORMATS),
+        }), 400
+
+    try:
+        path = get_derivative(source, preset, fmt)
+    except DerivativePending:
+        response = fallback()
+        response.headers["Cache-Control"] = "no-store"
+        return response
+    except Exception as e:
+        print(f"[DERIVATIVES] falling back to original: {e}")
+        return fallback()
+
+    response = send_file(
+        path,
+        mimetype=mimetype_for(fmt),
+        conditional=True,
+        etag=os.path.splitext(os.path.basename(path))[0],
+        max_age=86400,
+    )
+    response.headers["Vary"] = "Accept"
+    return response
@@ -0,0 +1,371 @@
+"""
+In-process metrics in Prometheus text format (served at /metrics).
+
+Counters and histograms are sharded per thread: a thread only ever writes
+its own shard, so the hot path is a thread-local lookup and an add, with
+no lock. The lock is taken once per thread (to register its shard) and
+by the scraper, which sums the shards. Shards of finished threads are
+folded into a retired total so short-lived request threads don't pile up.
+
+    metrics.SMTP_SEND_SECONDS.observe(0.42, "send_email")
+    with metrics.smtp_timer("send_email"):
+        server.send_message(msg)
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.utils import cache_utils, smtp_pool
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+MAX_LIVE_SHARDS = 256
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_registry_lock = threading.Lock()
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        with _registry_lock:
+            _registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _ShardedMetric(_Metric):
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []           # (thread, {label_values: value})
+        self._retired = {}
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+                if len(self._shards) > MAX_LIVE_SHARDS:
+                    self._retire_dead()
+            self._local.shard = shard
+        return shard
+
+    def _retire_dead(self):
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                for key, value in shard.items():
+                    self._merge(self._retired, key, value)
+        self._shards = live
+
+    def _collect(self):
+        with self._lock:
+            self._retire_dead()
+            total = {}
+            for key, value in self._retired.items():
+                self._merge(total, key, value)
+            for _, shard in self._shards:
+                for key, value in list(shard.items()):
+                    self._merge(total, key, value)
+        return total
+
+
+class Counter(_ShardedMetric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount=1):
+        shard = self._shard()
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+    @staticmethod
+    def _merge(into, key, value):
+        into[key] = into.get(key, 0) + value
+
+    def _samples(self):
+        for key, value in sorted(self._collect().items()):
+            yield f"{self.name}{_label_str(self.labelnames, key)} {value}"
+
+
+class Histogram(_ShardedMetric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *label_values):
+        shard = self._shard()
+        entry = shard.get(label_values)
+        if entry is None:
+            # [per-bucket counts..., +Inf count, sum]
+            entry = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    @staticmethod
+    def _merge(into, key, value):
+        current = into.get(key)
+        if current is None:
+            into[key] = list(value)
+        else:
+            for i, v in enumerate(value):
+                current[i] += v
+
+    def _samples(self):
+        for key, entry in sorted(self._collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_label_str(self.labelnames, key, le)} {cumulative}"
+            cumulative += entry[len(self.buckets)]
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_label_str(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_label_str(self.labelnames, key)} {entry[-1]}"
+            yield f"{self.name}_count{_label_str(self.labelnames, key)} {cumulative}"
+
+
+class Gauge(_Metric):
+    """Value read at scrape time from ``function()`` -> number or {label_values: number}."""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self._function = function
+
+    def set_function(self, function):
+        self._function = function
+
+    def _samples(self):
+        if self._function is None:
+            return
+        try:
+            value = self._function()
+        except Exception as e:
+            print(f"[METRICS] gauge {self.name} failed: {e}")
+            return
+        if isinstance(value, dict):
+            for key, v in sorted(value.items()):
+                yield f"{self.name}{_label_str(self.labelnames, key)} {v}"
+        elif value is not None:
+            yield f"{self.name} {value}"
+
+
+class CallbackCounter(Gauge):
+    """Monotonic total kept elsewhere and read at scrape time."""
+    kind = "counter"
+
+
+def render():
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+
+# ----------------------------------------------------------------------
+# Assignment pipeline
+# ----------------------------------------------------------------------
+TIME_TO_ACCEPT_SECONDS = Histogram(
+    "assignment_time_to_accept_seconds",
+    "Time from queuing an assignment job to the winning accept.",
+    ("area",),
+    buckets=(30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400),
+)
+ATTEMPTS_PER_WORKORDER = Histogram(
+    "assignment_attempts_per_workorder",
+    "Contractors offered a work order before the job finished.",
+    ("outcome",),
+    buckets=(1, 2, 3, 4, 5, 10),
+)
+ASSIGNMENTS_IN_FLIGHT = Gauge(
+    "assignment_jobs_in_flight",
+    "Assignment jobs that are pending or waiting for a response.",
+)
+
+# ----------------------------------------------------------------------
+# Mail
+# ----------------------------------------------------------------------
+SMTP_SEND_SECONDS = Histogram(
+    "smtp_send_seconds",
+    "SMTP connect + send latency.",
+    ("function",),
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+SMTP_FAILURES = Counter(
+    "smtp_send_failures_total",
+    "SMTP sends that raised.",
+    ("function",),
+)
+
+
+@contextmanager
+def smtp_timer(function):
+    """Time an SMTP send; a raised exception is counted as a failure and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        SMTP_FAILURES.inc(function)
+        raise
+    finally:
+        SMTP_SEND_SECONDS.observe(time.perf_counter() - start, function)
+
+EMAIL_OUTBOX_DELIVERIES = Counter(
+    "email_outbox_deliveries_total",
+    "Outbox delivery attempts by result: sent, retry, dead.",
+    ("result",),
+)
+EMAIL_OUTBOX_BACKLOG = Gauge(
+    "email_outbox_backlog",
+    "Outbox rows waiting to be sent (PENDING) or given up on (DEAD).",
+    ("status",),
+)
+
+
+SMTP_POOL_EVENTS = CallbackCounter(
+    "smtp_pool_events_total",
+    "SMTP pool activity: connects, reused, sent, retries, discarded.",
+    ("pool", "event"),
+    function=lambda: {
+        (pool, event): n
+        for pool, stats in smtp_pool.all_stats().items()
+        for event, n in stats.items()
+    },
+)
+
+
+# ----------------------------------------------------------------------
+# Database
+# ----------------------------------------------------------------------
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds",
+    "SQL statement latency by Flask endpoint ('background' outside requests).",
+    ("endpoint",),
+)
+
+
+def _current_endpoint():
+    if has_request_context():
+        return request.endpoint or "unknown"
+    return "background"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if starts:
+        DB_QUERY_SECONDS.observe(time.perf_counter() - starts.pop(), _current_endpoint())
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    starts = conn.info.get("query_start") if conn is not None else None
+    if starts:
+        DB_QUERY_SECONDS.observe(time.perf_counter() - starts.pop(), _current_endpoint())
+
+
+# ----------------------------------------------------------------------
+# In-process caches (cache_utils)
+# ----------------------------------------------------------------------
+def _cache_stat(field):
+    return lambda: {
+        (name,): stats[field] for name, stats in cache_utils.all_stats().items() if field in stats
+    }
+
+
+CACHE_HITS = CallbackCounter(
+    "cache_hits_total",
+    "Lookups answered from an in-process cache.",
+    ("cache",),
+    function=_cache_stat("hits"),
+)
+CACHE_MISSES = CallbackCounter(
+    "cache_misses_total",
+    "Lookups that had to load from the database.",
+    ("cache",),
+    function=_cache_stat("misses"),
+)
+CACHE_ENTRIES = Gauge(
+    "cache_entries",
+    "Entries currently held by an in-process cache.",
+    ("cache",),
+    function=_cache_stat("size"),
+)
+CACHE_BYTES = Gauge(
+    "cache_bytes",
+    "Bytes held by a size-bounded in-process cache.",
+    ("cache",),
+    function=_cache_stat("bytes"),
+)
+
+
+# ----------------------------------------------------------------------
+# Standalone exporter (scheduler process)
+# ----------------------------------------------------------------------
+def start_http_server(port, host="0.0.0.0"):
+    """Serve /metrics from a daemon thread, for processes without Flask routes."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"[METRICS] Exporter listening on {host}:{port}/metrics")
+    return server
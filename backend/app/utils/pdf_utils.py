@@ -1,14 +1,212 @@
+"""
+Provider / company registration certificates.
+
+A certificate is identified by the hash of its details (certificate_key)
+and rendered once, by a process pool, to cache/certificates/<key>.pdf.
+That directory is outside uploads/, so certificates are never served by
+URL, and files older than CERTIFICATE_CACHE_MAX_AGE_HOURS are removed.
+Approval only queues the mail with the details
+(email_utils.queue_email(..., certificate=details)) and starts the render;
+the mail worker attaches the file, rendering it itself if it is not there
+(or no longer there) yet.
+"""
+
+import hashlib
+import json
+import multiprocessing
 import os
-import random
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait as wait_futures
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from fpdf import FPDF
 
+# backend/cache/certificates: next to uploads/, not under the public /uploads route
+CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "cache", "certificates"))
+# Certificates hold contact details; keep them only until they are mailed
+CACHE_MAX_AGE_SECONDS = float(os.getenv("CERTIFICATE_CACHE_MAX_AGE_HOURS", "72")) * 3600
+PRUNE_INTERVAL_SECONDS = 3600
+# Hidden detail (see stamp_issue) printed in the footer, not as a line
+ISSUED_AT_KEY = "Issued At"
+MAX_WORKERS = int(os.getenv("CERTIFICATE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# How long certificate_pdf / render_batch wait for the pool
+WAIT_SECONDS = float(os.getenv("CERTIFICATE_WAIT_SECONDS", "30"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_lock = threading.Lock()
+_in_flight = {}
+_last_prune = 0.0
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a process holding DB connections / request threads
+            _pool = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+# ----------------------------------------------------------------------
+# Cache
+# ----------------------------------------------------------------------
+def normalize_details(details):
+    """JSON-safe copy of ``details`` (Decimal rates etc. as strings), key order kept."""
+    return json.loads(json.dumps(details, default=str))
+
+
+def stamp_issue(details):
+    """
+    Copy of ``details`` with the issue time, set once at approval. It is part
+    of the hash, so each issue gets its own file, certificate ID and date.
+    """
+    return {**details, ISSUED_AT_KEY: datetime.now().isoformat(timespec="seconds")}
+
+
+def certificate_key(details):
+    # Key order is part of the layout, so it is part of the hash
+    return hashlib.sha256(json.dumps(normalize_details(details)).encode()).hexdigest()
+
+
+def certificate_path(details):
+    return os.path.join(CACHE_DIR, f"{certificate_key(details)}.pdf")
+
+
+def prune_cache(max_age=CACHE_MAX_AGE_SECONDS):
+    """Delete cached certificates older than ``max_age`` seconds. Returns the count."""
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        names = os.listdir(CACHE_DIR)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    if removed:
+        print(f"[CERTIFICATE] pruned {removed} cached certificates")
+    return removed
+
+
+def _maybe_prune():
+    global _last_prune
+    with _lock:
+        now = time.time()
+        if now - _last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        _last_prune = now
+    prune_cache()
+
+
+def certificate_filename(email):
+    safe_email = email.replace('@', '_').replace('.', '_')
+    return f"{safe_email}_certificate.pdf"
+
+
+def submit_certificate(details):
+    """
+    Start rendering ``details`` in the pool unless it is cached or already
+    running. Returns the future, or None when the file already exists.
+    """
+    _maybe_prune()
+    details = normalize_details(details)
+    key = certificate_key(details)
+    out_path = os.path.join(CACHE_DIR, f"{key}.pdf")
+    if os.path.exists(out_path):
+        return None
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    submitted = False
+    with _lock:
+        future = _in_flight.get(key)
+        if future is None:
+            future = _get_pool().submit(_render, details, out_path)
+            _in_flight[key] = future
+            submitted = True
+    if submitted:
+        # Outside the lock: the callback runs inline if the render already finished
+        future.add_done_callback(lambda f, k=key: _finish(k, f))
+    return future
+
+
+def _finish(key, future):
+    global _pool
+    with _lock:
+        _in_flight.pop(key, None)
+    error = future.exception()
+    if error is None:
+        return
+    print(f"[CERTIFICATE] render failed for {key}: {error}")
+    if isinstance(error, BrokenProcessPool):
+        # A worker died; start a fresh pool on the next submit
+        with _pool_lock:
+            _pool = None
+
+
+def certificate_pdf(details, wait=WAIT_SECONDS):
+    """Path of the certificate for ``details``, rendering it first if needed."""
+    future = submit_certificate(details)
+    if future is not None:
+        future.result(timeout=wait)
+    return certificate_path(details)
+
+
+def render_batch(details_list, wait=WAIT_SECONDS):
+    """
+    Render many certificates in parallel. Returns one status per entry:
+    "cached", "rendered", "failed" or "pending" (still running after ``wait``).
+    """
+    futures = [submit_certificate(details) for details in details_list]
+    wait_futures([f for f in futures if f is not None], timeout=wait)
+
+    statuses = []
+    for future in futures:
+        if future is None:
+            statuses.append("cached")
+        elif not future.done():
+            statuses.append("pending")
+        elif future.exception() is not None:
+            statuses.append("failed")
+        else:
+            statuses.append("rendered")
+    return statuses
+
+
 def generate_certificate_pdf(details, email, upload_folder="uploads"):
     """
-    Generates a professional provider/company certificate PDF.
-    Accepts a details dict and saves it under uploads/<email>_certificate.pdf
+    Copy of the certificate saved under uploads/<email>_certificate.pdf.
     Returns the full PDF file path.
     """
+    os.makedirs(upload_folder, exist_ok=True)
+    pdf_path = os.path.join(upload_folder, certificate_filename(email))
+    shutil.copyfile(certificate_pdf(details), pdf_path)
+    return pdf_path
+
+
+# ----------------------------------------------------------------------
+# Rendering (runs in the worker processes)
+# ----------------------------------------------------------------------
+def _render(details, out_path):
+    pdf = _build_certificate(details, f"ONC{int(certificate_key(details)[:8], 16) % 9000 + 1000}")
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    pdf.output(tmp_path)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def _build_certificate(details, cert_id):
+    """Lay out a professional provider/company certificate for ``details``."""
 
     pdf = FPDF(orientation='L', unit='mm', format='A4')
     pdf.set_auto_page_break(auto=False, margin=15)
@@ -29,7 +227,6 @@ def generate_certificate_pdf(details, email, upload_folder="uploads"):
         pdf.set_xy(15, 25)
         pdf.cell(267, 15, "Ontract Registration Certificate", 0, 1, 'C')
 
-        cert_id = f"ONC{random.randint(1000, 9999)}"
         pdf.set_font("Arial", 'I', 12)
         pdf.set_xy(15, 42)
         pdf.cell(267, 6, f"Certificate ID: {cert_id}", 0, 1, 'C')
@@ -49,7 +246,7 @@ def generate_certificate_pdf(details, email, upload_folder="uploads"):
     # ---------- Loop over certificate details ----------
     for key, value in details.items():
         # Skip hidden/internal keys
-        if key.lower() in ["provider id", "company id"]:
+        if key.lower() in ["provider id", "company id", ISSUED_AT_KEY.lower()]:
             continue
 
         # Page overflow handling
@@ -89,7 +286,9 @@ def generate_certificate_pdf(details, email, upload_folder="uploads"):
     pdf.set_font("Arial", 'I', 10)
     pdf.set_text_color(100, 100, 100)
     pdf.set_xy(15, 170)
-    issue_date = datetime.now().strftime("%B %d, %Y")
+    # Mails queued before stamp_issue existed carry no issue time
+    issued_at = details.get(ISSUED_AT_KEY)
+    issue_date = (datetime.fromisoformat(issued_at) if issued_at else datetime.now()).strftime("%B %d, %Y")
     pdf.cell(133, 6, f"Issued on: {issue_date}", 0, 0, 'L')
 
     pdf.set_xy(180, 165)
@@ -97,10 +296,4 @@ def generate_certificate_pdf(details, email, upload_folder="uploads"):
     pdf.set_xy(180, 171)
     pdf.cell(70, 6, "Authorized Signature", 0, 1, 'C')
 
-    # ---------- Save File ----------
-    os.makedirs(upload_folder, exist_ok=True)
-    safe_email = email.replace('@', '_').replace('.', '_')
-    pdf_path = os.path.join(upload_folder, f"{safe_email}_certificate.pdf")
-    pdf.output(pdf_path)
-
-    return pdf_path
+    return pdf
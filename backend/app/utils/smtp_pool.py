@@ -0,0 +1,251 @@
+"""
+Pooled, persistent SMTP connections shared by the mail senders.
+
+Opening a connection costs a TCP + TLS handshake, EHLO and AUTH; the pool
+pays that once per connection and reuses it for up to MAX_MESSAGES sends:
+
+    smtp_pool.get_pool("workorder").send(msg)
+
+Connections idle longer than NOOP_SECONDS are checked with NOOP before
+reuse, and closed once idle longer than IDLE_SECONDS or after
+MAX_MESSAGES. A reused connection that turns out to be dead is replaced
+and the message retried once on a fresh one.
+
+Two profiles exist, matching the two sets of credentials in .env:
+  "default"   - SMTP_HOST / SMTP_PORT / SMTP_USER / SMTP_PASSWORD (STARTTLS),
+                account e-mails from utils/email_utils.py
+  "workorder" - MAIL_SMTP_HOST / MAIL_SMTP_PORT / MAIL_USER / MAIL_PASS
+                (implicit TLS on 465), work order mails
+SMTP_HOST / MAIL_SMTP_HOST may list several hosts ("a,b"); they are tried
+in order when connecting. SMTP_STARTTLS=0 / MAIL_SMTP_STARTTLS=0 skip
+STARTTLS on a plain port (local stand-ins such as benchmarks.smtp_sink).
+"""
+
+import os
+import smtplib
+import threading
+import time
+
+from app.config import Config
+
+POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+MAX_MESSAGES = int(os.getenv("SMTP_POOL_MAX_MESSAGES", "100"))
+IDLE_SECONDS = float(os.getenv("SMTP_POOL_IDLE_SECONDS", "60"))
+NOOP_SECONDS = float(os.getenv("SMTP_POOL_NOOP_SECONDS", "10"))
+TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+
+# The server refused this message; the session itself is still usable.
+# (Every SMTPException is an OSError, so these are checked first.)
+MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+    smtplib.SMTPNotSupportedError,
+)
+# Anything else socket-level means the connection is gone
+CONNECTION_ERRORS = OSError
+
+
+class _Connection:
+    def __init__(self, server):
+        self.server = server
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.messages = 0
+
+    def close(self):
+        try:
+            self.server.quit()
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+
+
+class SmtpPool:
+    def __init__(self, name, hosts, port, user=None, password=None, use_ssl=False,
+                 starttls=True, size=POOL_SIZE, max_messages=MAX_MESSAGES,
+                 idle_seconds=IDLE_SECONDS, noop_seconds=NOOP_SECONDS, timeout=TIMEOUT_SECONDS):
+        self.name = name
+        self.hosts = [h.strip() for h in hosts if h and h.strip()]
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_ssl = use_ssl
+        self.starttls = starttls and not use_ssl
+        self.max_messages = max_messages
+        self.idle_seconds = idle_seconds
+        self.noop_seconds = noop_seconds
+        self.timeout = timeout
+
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []            # most recently used last
+        self.stats = {"connects": 0, "reused": 0, "sent": 0, "retries": 0, "discarded": 0}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def send(self, msg, from_addr=None, to_addrs=None):
+        """
+        Send an email.message.Message like smtplib.SMTP.send_message.
+        Blocks while all ``size`` connections are busy.
+        """
+        if not self.hosts:
+            raise RuntimeError(f"SMTP host not configured for '{self.name}'")
+
+        with self._slots:
+            conn, reused = self._acquire()
+            try:
+                conn.server.send_message(msg, from_addr, to_addrs)
+            except MESSAGE_ERRORS:
+                self._release(conn)
+                raise
+            except CONNECTION_ERRORS:
+                self._discard(conn)
+                if not reused:
+                    raise
+                # A kept-alive connection went stale between NOOP and send
+                self._count("retries")
+                conn = self._connect()
+                try:
+                    conn.server.send_message(msg, from_addr, to_addrs)
+                except MESSAGE_ERRORS:
+                    self._release(conn)
+                    raise
+                except BaseException:
+                    self._discard(conn)
+                    raise
+            except BaseException:
+                self._discard(conn)
+                raise
+            conn.messages += 1
+            self._count("sent")
+            self._release(conn)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _acquire(self):
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect(), False
+
+            idle_for = time.monotonic() - conn.last_used
+            if idle_for > self.idle_seconds:
+                self._discard(conn)
+                continue
+            if idle_for > self.noop_seconds:
+                try:
+                    code, _ = conn.server.noop()
+                except CONNECTION_ERRORS:
+                    code = None
+                if code != 250:
+                    self._discard(conn)
+                    continue
+            self._count("reused")
+            return conn, True
+
+    def _connect(self):
+        last_error = None
+        for host in self.hosts:
+            try:
+                if self.use_ssl:
+                    server = smtplib.SMTP_SSL(host, self.port, timeout=self.timeout)
+                else:
+                    server = smtplib.SMTP(host, self.port, timeout=self.timeout)
+                try:
+                    if self.starttls:
+                        server.starttls()
+                    if self.user:
+                        server.login(self.user, self.password)
+                except BaseException:
+                    server.close()
+                    raise
+                self._count("connects")
+                return _Connection(server)
+            except CONNECTION_ERRORS as e:
+                print(f"[SMTP] {self.name}: connect to {host}:{self.port} failed: {e}")
+                last_error = e
+        raise last_error
+
+    def _release(self, conn):
+        conn.last_used = time.monotonic()
+        if conn.messages >= self.max_messages:
+            self._discard(conn)
+            return
+        with self._lock:
+            self._idle.append(conn)
+
+    def _discard(self, conn):
+        self._count("discarded")
+        conn.close()
+
+
+# ----------------------------------------------------------------------
+# Profiles
+# ----------------------------------------------------------------------
+def _split_hosts(value):
+    return (value or "").split(",")
+
+
+def _flag(name, default="1"):
+    return os.getenv(name, default).lower() not in ("0", "false", "no")
+
+
+def _build(name):
+    if name == "default":
+        email = Config.EMAIL_CONFIG
+        port = email["smtp_port"]
+        return SmtpPool(
+            name,
+            _split_hosts(email["smtp_server"]),
+            port,
+            user=email["sender_email"],
+            password=email["sender_password"],
+            use_ssl=port == 465,
+            starttls=_flag("SMTP_STARTTLS"),
+        )
+    if name == "workorder":
+        port = int(os.getenv("MAIL_SMTP_PORT", "465"))
+        return SmtpPool(
+            name,
+            _split_hosts(os.getenv("MAIL_SMTP_HOST", "smtp.gmail.com")),
+            port,
+            user=os.getenv("MAIL_USER"),
+            password=os.getenv("MAIL_PASS"),
+            use_ssl=port == 465,
+            starttls=_flag("MAIL_SMTP_STARTTLS"),
+        )
+    raise ValueError(f"Unknown SMTP profile '{name}'")
+
+
+_pools_lock = threading.Lock()
+_pools = {}
+
+
+def get_pool(name="default"):
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = _pools[name] = _build(name)
+        return pool
+
+
+def all_stats():
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {p.name: dict(p.stats) for p in pools}
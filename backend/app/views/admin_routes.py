@@ -65,6 +65,13 @@ def send_message_contractor():
     res, status = AdminController.send_message_contractor(data.get('email'), data.get('message'))
     return jsonify(res), status
 
+# ===== Batch approval =====
+@admin_bp.route('/approve_batch', methods=['POST'])
+def approve_batch():
+    data = request.get_json(force=True)
+    res, status = AdminController.approve_batch(data.get('providers'), data.get('contractors'))
+    return jsonify(res), status
+
 # ===== Standard Rates =====
 # @admin_bp.route('/upload_excel', methods=['POST'])
 # def upload_excel():
@@ -132,3 +139,19 @@ def update_standard_rate(rate_id):
 def delete_standard_rate(rate_id):
     res, status = AdminController.delete_standard_rate(rate_id)
     return jsonify(res), status
+
+# ===== Uploads =====
+# Remove unreferenced blobs from the content-addressed upload store
+@admin_bp.route('/uploads/gc', methods=['POST'])
+def collect_upload_garbage():
+    payload = request.get_json(silent=True) or {}
+    res, status = AdminController.collect_upload_garbage(payload.get('grace_seconds'))
+    return jsonify(res), status
+
+# ===== Email outbox =====
+# Retry DEAD mails: {"ids": [...]} or every DEAD mail when omitted
+@admin_bp.route('/outbox/requeue', methods=['POST'])
+def requeue_dead_emails():
+    payload = request.get_json(silent=True) or {}
+    res, status = AdminController.requeue_dead_emails(payload.get('ids'))
+    return jsonify(res), status
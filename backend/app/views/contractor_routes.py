@@ -73,6 +73,8 @@ def resend_otp():
 @cross_origin()
 def profile():
     data = request.get_json(silent=True) or {}
+    if request.args.get("files"):
+        data["files"] = request.args["files"]
     result, status = ContractorController.get_profile(data)
     return jsonify(result), status
 
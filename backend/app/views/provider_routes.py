@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app.controllers.provider_controller import ProviderController
-from app.utils.file_utils import save_uploaded_file
+from app.utils import blob_store
 
 provider_bp = Blueprint("provider_bp", __name__)
 
@@ -118,18 +118,16 @@ def update_bank():
         if not all([email, bank_name, holder_name, account_number, swift, bank_statement]):
             return jsonify({"error": "All bank fields and statement required"}), 400
 
-        statement_path = save_uploaded_file(bank_statement, "provider_bank_statements")
-
-        # RESET POINTER before reading into DB
-        bank_statement.seek(0)
-
         # ---------------------------------------------
-        # SAVE TO DB AS BYTES
+        # SAVE TO THE BLOB STORE (the row keeps the descriptor)
         # ---------------------------------------------
-        statement_bytes = bank_statement.read()
+        try:
+            statement = blob_store.store_document(bank_statement)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         result, status = ProviderController.update_bank(
-            email, bank_name, holder_name, account_number, swift, statement_bytes
+            email, bank_name, holder_name, account_number, swift, statement
         )
 
         return jsonify(result), status
@@ -144,12 +142,15 @@ def update_bank():
 
 @provider_bp.route("/profile", methods=["POST"])
 def get_profile():
-    email = request.get_json().get("email")
+    data = request.get_json()
+    email = data.get("email")
 
     if not email:
         return jsonify({"error": "Email required"}), 400
 
-    result, status = ProviderController.get_profile(email)
+    # ?files=descriptors (or "files" in the body): URLs + metadata instead of base64
+    file_mode = request.args.get("files") or data.get("files") or "inline"
+    result, status = ProviderController.get_profile(email, file_mode)
     return jsonify(result), status
 
 
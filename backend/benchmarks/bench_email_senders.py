@@ -0,0 +1,257 @@
+"""
+E-mail sender benchmark against a local SMTP stand-in.
+
+Starts benchmarks.smtp_sink in-process, points both SMTP profiles at it
+and times the real senders end to end (template, MIME build, encoding,
+pooled SMTP delivery):
+  - send_email                      plain account mail (email_utils)
+  - send_otp_email                  template, then delivered the way
+                                    run_mail_worker.py does (outbox row -> deliver)
+  - send_email_with_attachments     assignment mail with 0 / 5 / 20 photos;
+                                    "cold" clears the decoded-image and
+                                    encoded-part caches and the downscaled
+                                    derivatives before every send, "warm"
+                                    re-offers the same work order
+  - send_admin_notification_email   BCC notification to --admins admins
+
+For each it reports messages/s, p50/p95/p99 latency, average message size
+on the wire and peak RSS of the process so far. The senders' own logging is
+suppressed while timing. Derivatives are rendered into a temporary
+directory, not backend/uploads/derivatives. No database or network is needed: the
+email_notification_t log insert is skipped. --json writes the results so
+CI runs can be compared.
+
+Run from backend/:
+
+    python -m benchmarks.bench_email_senders --messages 200 --threads 4 \
+        --json /tmp/email_bench.json
+"""
+
+import argparse
+import base64
+import contextlib
+import io
+import json
+import os
+import resource
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+from benchmarks.smtp_sink import SmtpSink
+from benchmarks.stats import percentile
+
+IMAGE_COUNTS = (0, 5, 20)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def point_profiles_at(port):
+    """Both SMTP profiles -> the sink (plain SMTP, any login accepted)."""
+    os.environ.update({
+        "SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(port), "SMTP_STARTTLS": "0",
+        "SMTP_USER": "bench@example.com", "SMTP_PASSWORD": "bench",
+        "FROM_EMAIL": "bench@example.com",
+        "MAIL_SMTP_HOST": "127.0.0.1", "MAIL_SMTP_PORT": str(port), "MAIL_SMTP_STARTTLS": "0",
+        "MAIL_USER": "bench@example.com", "MAIL_PASS": "bench",
+    })
+
+
+def clear_dir(path):
+    """Delete the files in ``path`` (other threads may be racing us)."""
+    for name in os.listdir(path):
+        try:
+            os.remove(os.path.join(path, name))
+        except FileNotFoundError:
+            pass
+
+
+def make_images(count, size):
+    """``count`` distinct noise JPEGs as data URLs (noise defeats JPEG compression)."""
+    from PIL import Image
+
+    width, height = size
+    images = []
+    for _ in range(count):
+        buf = io.BytesIO()
+        Image.effect_noise((width, height), 40).convert("RGB").save(buf, "JPEG", quality=85)
+        images.append("data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode())
+    return images
+
+
+def make_workorder(workorder_id, images):
+    return SimpleNamespace(
+        ID=workorder_id,
+        WORKORDER=f"BENCH-{workorder_id}",
+        WORKORDER_AREA="Bench Area",
+        WORKORDER_TYPE="Inspection",
+        REMARKS="Benchmark work order " * 5,
+        REQUESTED_TIME_CLOSING="2030-01-01",
+        client="Bench Client",
+        image=json.dumps(images) if images else None,
+    )
+
+
+def build_scenarios(images, admins):
+    # Imported here: Config and the mail model read the SMTP settings at import
+    from app.models import email_outbox_worker, workorder_mail_model as mail_model
+    from app.utils import cache_utils, email_utils, image_derivatives
+
+    def deliver_now(to_email, subject, body, attachment=None, idempotency_key=None):
+        email_outbox_worker.deliver(SimpleNamespace(
+            to_email=to_email, subject=subject, body=body, attachment=attachment,
+            attachment_name=None, body_type="plain", profile="default",
+        ))
+
+    # Template senders queue to email_outbox_t; deliver right away instead.
+    # The notification log is a database insert, outside what is measured.
+    email_utils.queue_email = deliver_now
+    mail_model.insert_email_notification_log = lambda *args, **kwargs: None
+
+    def plain(i):
+        email_utils.send_email(f"user{i}@example.com", "Benchmark", "Account notification. " * 20)
+
+    def otp(i):
+        email_utils.send_otp_email(f"user{i}@example.com", f"{i % 1000000:06d}")
+
+    def assignment(count, cold):
+        workorder = make_workorder(900000 + count, images[:count])
+
+        def send(i):
+            if cold:
+                cache_utils.invalidate("decoded_images", "mail_image_parts", "mail_workorder_parts")
+                clear_dir(image_derivatives.CACHE_DIR)
+            html_body = mail_model.build_assignment_email_html(
+                workorder, f"Contractor {i}", f"http://bench.invalid/respond/{i}", 15
+            )
+            status, _, _ = mail_model.send_email_with_attachments(
+                workorder, f"contractor{i}@example.com", f"Contractor {i}", html_body
+            )
+            if status != "SENT":
+                raise RuntimeError(status)
+        return send
+
+    def admin(i):
+        workorder = make_workorder(800000, [])
+        html_content, status_text = mail_model.build_admin_notification_html(
+            workorder, f"Contractor {i}", i, "accept", "Benchmark remark"
+        )
+        _, failed = mail_model.send_admin_notification_email(workorder, html_content, status_text, admins)
+        if failed:
+            raise RuntimeError(f"failed for {failed}")
+
+    scenarios = [("send_email", plain), ("send_otp_email", otp)]
+    for count in IMAGE_COUNTS:
+        if count == 0:
+            scenarios.append(("attachments[0]", assignment(0, cold=False)))
+            continue
+        scenarios.append((f"attachments[{count}] cold", assignment(count, cold=True)))
+        scenarios.append((f"attachments[{count}] warm", assignment(count, cold=False)))
+    scenarios.append(("admin_notification", admin))
+    return scenarios
+
+
+def run(label, send, messages, threads, sink):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    counter = iter(range(messages))
+    sink_before = (sink.stats.messages, sink.stats.bytes)
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            t0 = time.perf_counter()
+            try:
+                send(i)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    # The senders log every message; keep that out of the report (and the timing)
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+    received = sink.stats.messages - sink_before[0]
+    result = {
+        "sent": len(latencies),
+        "errors": len(errors),
+        "msg_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000 if latencies else 0.0, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "avg_kb": round((sink.stats.bytes - sink_before[1]) / received / 1024, 1) if received else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    print(f"{label:<26} {result['msg_per_s']:>9,.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+          f"{result['p99_ms']:>8.1f} {result['avg_kb']:>9.1f} {result['peak_rss_mb']:>8.1f} {result['errors']:>6}")
+    for e in errors[:3]:
+        print(f"  {e}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200, help="per scenario")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--admins", type=int, default=5, help="BCC recipients per admin notification")
+    parser.add_argument("--image-size", default="1600x1200", help="WIDTHxHEIGHT of the generated photos")
+    parser.add_argument("--connect-delay-ms", type=float, default=0.0)
+    parser.add_argument("--auth-delay-ms", type=float, default=0.0)
+    parser.add_argument("--only", help="comma-separated scenario name prefixes")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    sink = SmtpSink(connect_delay=args.connect_delay_ms / 1000, auth_delay=args.auth_delay_ms / 1000).start()
+    point_profiles_at(sink.port)
+
+    # Keep rendered derivatives out of the real upload cache
+    from app.utils import image_derivatives
+    derivatives_dir = tempfile.mkdtemp(prefix="bench-derivatives-")
+    image_derivatives.CACHE_DIR = derivatives_dir
+
+    width, height = (int(v) for v in args.image_size.lower().split("x"))
+    images = make_images(max(IMAGE_COUNTS), (width, height))
+    admins = [(f"admin{i}@example.com", f"Admin {i}") for i in range(args.admins)]
+    scenarios = build_scenarios(images, admins)
+    if args.only:
+        prefixes = tuple(p.strip() for p in args.only.split(","))
+        scenarios = [s for s in scenarios if s[0].startswith(prefixes)]
+
+    print(f"messages={args.messages} threads={args.threads} images={args.image_size} -> 127.0.0.1:{sink.port}")
+    print(f"{'scenario':<26} {'msg/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'avg KB':>9} {'RSS MB':>8} {'errors':>6}")
+    results = {label: run(label, send, args.messages, args.threads, sink) for label, send in scenarios}
+
+    from app.utils import smtp_pool
+    print(f"pool stats: {smtp_pool.all_stats()}")
+    print(f"sink      : connections={sink.stats.connections} messages={sink.stats.messages}")
+    for name in ("default", "workorder"):
+        smtp_pool.get_pool(name).close_all()
+    sink.shutdown()
+    shutil.rmtree(derivatives_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
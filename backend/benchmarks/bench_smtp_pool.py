@@ -0,0 +1,119 @@
+"""
+Throughput benchmark: one SMTP connection per message vs. smtp_pool.
+
+Starts benchmarks.smtp_sink in-process (or uses --host/--port) and sends
+the same messages twice from N threads:
+  - "per-message": connect + EHLO + AUTH + send + QUIT, as the senders
+    did before smtp_pool,
+  - "pooled": SmtpPool.send with --pool-size kept-alive connections.
+
+Run from backend/ (no database needed):
+
+    python -m benchmarks.bench_smtp_pool --messages 500 --threads 8 \
+        --connect-delay-ms 150 --auth-delay-ms 50
+"""
+
+import argparse
+import smtplib
+import statistics
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from app.utils.smtp_pool import SmtpPool
+from benchmarks.smtp_sink import SmtpSink
+from benchmarks.stats import percentile
+
+
+def build_message(i):
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = f"Benchmark message {i}"
+    msg["From"] = "bench@example.com"
+    msg["To"] = f"contractor{i}@example.com"
+    msg.attach(MIMEText("<p>" + "Work order details. " * 50 + "</p>", "html"))
+    return msg
+
+
+def send_per_message(host, port):
+    def send(msg):
+        with smtplib.SMTP(host, port, timeout=30) as server:
+            server.login("bench", "bench")
+            server.send_message(msg)
+    return send
+
+
+def run(label, send, messages, threads):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    counter = iter(range(messages))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            t0 = time.perf_counter()
+            try:
+                send(build_message(i))
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"{label:<12}: {len(latencies)} sent in {elapsed:.2f}s = {len(latencies) / elapsed:,.1f} msg/s, "
+          f"p50={statistics.median(latencies) * 1000 if latencies else 0:.1f}ms "
+          f"p99={percentile(latencies, 99) * 1000:.1f}ms, errors={len(errors)}")
+    for e in errors[:3]:
+        print(f"  {e}")
+    return len(latencies) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--max-messages", type=int, default=100, help="messages per pooled connection")
+    parser.add_argument("--connect-delay-ms", type=float, default=100.0, help="in-process sink only")
+    parser.add_argument("--auth-delay-ms", type=float, default=30.0, help="in-process sink only")
+    parser.add_argument("--host", help="use an external SMTP stand-in instead of the in-process sink")
+    parser.add_argument("--port", type=int, default=2525)
+    args = parser.parse_args()
+
+    sink = None
+    host, port = args.host, args.port
+    if not host:
+        sink = SmtpSink(connect_delay=args.connect_delay_ms / 1000, auth_delay=args.auth_delay_ms / 1000).start()
+        host, port = "127.0.0.1", sink.port
+
+    print(f"messages={args.messages} threads={args.threads} pool={args.pool_size} -> {host}:{port}")
+    before = run("per-message", send_per_message(host, port), args.messages, args.threads)
+
+    pool = SmtpPool(
+        "bench", [host], port, user="bench", password="bench",
+        starttls=False, size=args.pool_size, max_messages=args.max_messages,
+    )
+    after = run("pooled", pool.send, args.messages, args.threads)
+    pool.close_all()
+
+    print(f"speed-up    : x{after / before:.1f}")
+    print(f"pool stats  : {pool.stats}")
+    if sink is not None:
+        print(f"sink        : connections={sink.stats.connections} messages={sink.stats.messages}")
+        sink.shutdown()
+
+
+if __name__ == "__main__":
+    main()
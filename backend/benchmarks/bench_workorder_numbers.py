@@ -0,0 +1,92 @@
+"""
+Concurrency benchmark for WorkOrder.reserve_workorder_ids().
+
+Hammers the sequence-backed allocator from many threads at once and checks
+that no WORKORDER number is handed out twice.
+
+Run from backend/ against a scratch database (every reservation consumes
+serials from workorder_serial_seq):
+
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_workorder_numbers \
+        --threads 32 --per-thread 500 --block 1
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from collections import Counter
+
+from app import create_app
+from app.config import Config
+from app.models.database import db
+from app.models.workorder import WorkOrder
+from benchmarks.stats import percentile
+
+
+def worker(app, prefix, calls, block, results, latencies, errors):
+    with app.app_context():
+        try:
+            for _ in range(calls):
+                t0 = time.perf_counter()
+                ids = WorkOrder.reserve_workorder_ids(prefix, block)
+                db.session.commit()
+                latencies.append(time.perf_counter() - t0)
+                results.extend(ids)
+        except Exception as e:
+            errors.append(str(e))
+        finally:
+            db.session.remove()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--per-thread", type=int, default=500, help="allocator calls per thread")
+    parser.add_argument("--block", type=int, default=1, help="numbers reserved per call")
+    parser.add_argument("--prefix", default="P")
+    args = parser.parse_args()
+
+    # One pooled connection per thread so the pool itself is not the bottleneck
+    Config.SQLALCHEMY_ENGINE_OPTIONS = {"pool_size": args.threads, "max_overflow": 0}
+    app = create_app()
+
+    results, latencies, errors = [], [], []
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(app, args.prefix, args.per_thread, args.block, results, latencies, errors),
+        )
+        for _ in range(args.threads)
+    ]
+
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    duplicates = [n for n, c in Counter(results).items() if c > 1]
+
+    print(f"threads={args.threads} calls/thread={args.per_thread} block={args.block}")
+    print(f"numbers reserved : {len(results)}")
+    print(f"elapsed          : {elapsed:.2f}s")
+    print(f"numbers/sec      : {len(results) / elapsed:,.0f}")
+    print(f"calls/sec        : {len(latencies) / elapsed:,.0f}")
+    if latencies:
+        print(f"latency p50/p99  : {statistics.median(latencies) * 1000:.2f} ms / "
+              f"{percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"errors           : {len(errors)}")
+    for e in errors[:5]:
+        print(f"  {e}")
+    print(f"duplicates       : {len(duplicates)}")
+    for n in duplicates[:10]:
+        print(f"  {n}")
+
+    if duplicates or errors:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
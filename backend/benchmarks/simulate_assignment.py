@@ -0,0 +1,449 @@
+"""
+Load / simulation harness for the automated assignment engine.
+
+Seeds a throw-away area with N approved contractors and M work orders,
+queues an assignment job for every work order and runs the real
+AssignmentScheduler / process_assignment_job / assign_to_contractor /
+respond-workorder code against Postgres. Only the edges are replaced:
+
+  - the clock is scaled (--scale simulated seconds per real second), so a
+    15 minute link expiry passes in 15 real seconds at --scale 60,
+  - smtplib is replaced by an in-memory sink that records every message
+    and can add a fixed latency per send,
+  - contractors are scripted: for each offer e-mail the sink reads the
+    response link and, per --accept / --reject (the rest time out), posts
+    accept or reject through the Flask test client after an exponentially
+    distributed delay.
+
+Each contractor's answer to a work order is drawn from a RNG seeded with
+(--seed, work order, contractor), so a run is reproducible up to thread
+interleaving (with --fanout > 1, which accept lands first may vary).
+
+Run from backend/ against a scratch database; the seeded rows are removed
+afterwards unless --keep is given (work order numbers are still consumed):
+
+    DATABASE_URL=postgresql://... python -m benchmarks.simulate_assignment \
+        --workorders 1000 --contractors 50 --fanout 2 --scale 60
+"""
+
+import argparse
+import heapq
+import html
+import os
+import random
+import re
+import smtplib
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+from sqlalchemy import event, text
+
+from app import create_app
+from app.config import Config
+from app.controllers import workorder_mail_controller
+from app.models import workorder_automation_model, workorder_mail_model
+from app.models.database import db
+from app.models.provider_model import ProviderModel
+from app.models.workorder import WorkOrder
+from app.models.workorder_assignment_scheduler import AssignmentScheduler
+from benchmarks.stats import percentile
+
+HARNESS_TAG = "/* simulate_assignment */"
+RESPONSE_LINK = re.compile(r"/api/workorders/respond-workorder/[^\"'\s<>]+")
+BASE_URL = "http://sim.invalid"
+
+
+class ScaledClock:
+    """Simulated time starting at the real "now" and running ``scale`` times faster."""
+
+    def __init__(self, scale):
+        self.scale = float(scale)
+        self._origin = time.time()
+
+    def now(self):
+        return self._origin + (time.time() - self._origin) * self.scale
+
+
+# ----------------------------------------------------------------------
+# SMTP sink
+# ----------------------------------------------------------------------
+class SmtpSink:
+    """Stands in for smtplib.SMTP / SMTP_SSL; records messages instead of sending."""
+
+    def __init__(self, latency_seconds=0.0, on_message=None):
+        self.latency_seconds = latency_seconds
+        self.on_message = on_message
+        self.sent = Counter()
+        self._lock = threading.Lock()
+
+    def connect(self, *args, **kwargs):
+        sink = self
+
+        class _Connection:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def starttls(self, *a, **kw):
+                pass
+
+            def login(self, *a, **kw):
+                pass
+
+            def noop(self):
+                return 250, b"OK"
+
+            def quit(self):
+                pass
+
+            def close(self):
+                pass
+
+            def send_message(self, msg, *a, **kw):
+                sink._deliver(msg)
+
+            def sendmail(self, from_addr, to_addrs, msg, *a, **kw):
+                sink._deliver(None)
+
+        return _Connection()
+
+    def _deliver(self, msg):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        subject = (msg["Subject"] if msg is not None else None) or ""
+        with self._lock:
+            self.sent[subject.split(" - ")[0] or "(no subject)"] += 1
+        if msg is not None and self.on_message:
+            self.on_message(msg)
+
+    def install(self):
+        smtplib.SMTP = self.connect
+        smtplib.SMTP_SSL = self.connect
+        # The senders refuse to run without credentials
+        os.environ.setdefault("MAIL_USER", "sim@sim.invalid")
+        os.environ.setdefault("MAIL_PASS", "simulated")
+        workorder_mail_model.EMAIL_USER = workorder_mail_model.EMAIL_USER or os.environ["MAIL_USER"]
+        workorder_mail_model.EMAIL_PASS = workorder_mail_model.EMAIL_PASS or os.environ["MAIL_PASS"]
+
+
+def html_parts(msg):
+    for part in msg.walk():
+        if part.get_content_type() == "text/html":
+            payload = part.get_payload(decode=True)
+            if payload:
+                yield payload.decode(part.get_content_charset() or "utf-8", "replace")
+
+
+# ----------------------------------------------------------------------
+# Scripted contractors
+# ----------------------------------------------------------------------
+class Responder:
+    """
+    Answers offer e-mails on a simulated-time schedule. Responses that
+    would arrive after the link expired are never sent (they count as
+    timeouts, the same as a contractor who ignores the mail).
+    """
+
+    def __init__(self, app, clock, args):
+        self.app = app
+        self.clock = clock
+        self.args = args
+        self.expiry_seconds = args.expiry_minutes * 60
+        self._executor = ThreadPoolExecutor(max_workers=args.responders, thread_name_prefix="responder")
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = 0
+        self._stopped = False
+        self._lock = threading.Lock()
+
+        self.enqueued_at = {}          # workorder_id -> sim ts
+        self.assigned_after = []       # sim seconds from enqueue to winning accept
+        self.scripted = Counter()      # accept / reject / timeout
+        self.http_status = Counter()   # (action, status_code)
+
+        self._thread = threading.Thread(target=self._loop, name="responder-clock", daemon=True)
+        self._thread.start()
+
+    def on_message(self, msg):
+        for body in html_parts(msg):
+            match = RESPONSE_LINK.search(body)
+            if match:
+                self._script(html.unescape(match.group(0)))
+                return
+
+    def _script(self, link):
+        parts = urlsplit(link)
+        query = parse_qs(parts.query)
+        workorder_id = int(parts.path.rsplit("/", 1)[-1])
+        contractor_id = query["contractor_id"][0]
+
+        rng = random.Random(f"{self.args.seed}:{workorder_id}:{contractor_id}")
+        roll = rng.random()
+        delay = rng.expovariate(1.0 / (self.args.mean_response_minutes * 60))
+        if roll < self.args.accept:
+            action = "accept"
+        elif roll < self.args.accept + self.args.reject:
+            action = "reject"
+        else:
+            action = None
+        if action is None or delay >= self.expiry_seconds:
+            with self._lock:
+                self.scripted["timeout"] += 1
+            return
+
+        with self._lock:
+            self.scripted[action] += 1
+        with self._cond:
+            self._seq += 1
+            heapq.heappush(self._heap, (self.clock.now() + delay, self._seq, link, workorder_id, action))
+            self._cond.notify()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                now = self.clock.now()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap))
+                if not due:
+                    timeout = (self._heap[0][0] - now) / self.clock.scale if self._heap else None
+                    self._cond.wait(timeout)
+                    continue
+            for _, _, link, workorder_id, action in due:
+                self._executor.submit(self._respond, link, workorder_id, action)
+
+    def _respond(self, link, workorder_id, action):
+        client = self.app.test_client()
+        try:
+            response = client.post(link, data={"action": action, "remark": "simulated"})
+            code = response.status_code
+        except Exception as e:
+            print(f"[SIM] respond {workorder_id} failed: {e}")
+            code = "error"
+        with self._lock:
+            self.http_status[(action, code)] += 1
+            if action == "accept" and code == 200:
+                self.assigned_after.append(self.clock.now() - self.enqueued_at[workorder_id])
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._executor.shutdown(wait=True)
+
+
+# ----------------------------------------------------------------------
+# Seeding / cleanup
+# ----------------------------------------------------------------------
+def seed(area, run_id, contractors, workorders):
+    provider_uids = []
+    for i in range(contractors):
+        uid = db.session.execute(text("""
+            INSERT INTO users_t (email_id, name, password_hash, status, service_type)
+            VALUES (:email, :name, 'simulated', 'approved', 0)
+            RETURNING user_uid
+        """), {"email": f"sim-{run_id}-{i}@sim.invalid", "name": f"Sim Contractor {i}"}).scalar()
+        db.session.execute(text("INSERT INTO providers_t (user_uid) VALUES (:uid)"), {"uid": uid})
+        db.session.commit()
+        # Distinct rates so the ranking is stable
+        ProviderModel.insert_services(uid, [("SIM", 100 + i, area, area, area)])
+        provider_uids.append(uid)
+
+    rows = [
+        (i, {
+            "WORKORDER_TYPE": "SIM",
+            "WORKORDER_AREA": area,
+            "client": "SIM",
+            "REMARKS": f"simulation {run_id}",
+            "STATUS": "OPEN",
+            "image": {},
+            "closing_images": [],
+            "CREATED_T": datetime.utcnow(),
+        }, "W")
+        for i in range(workorders)
+    ]
+    workorder_ids = []
+    for start in range(0, len(rows), 500):
+        created, errors = WorkOrder.bulk_insert(rows[start:start + 500])
+        if errors:
+            raise RuntimeError(f"Seeding work orders failed: {errors[:3]}")
+        workorder_ids.extend(c["ID"] for c in created)
+    return workorder_ids
+
+
+def cleanup(run_id, workorder_ids):
+    params = {"ids": workorder_ids}
+    db.session.execute(text("DELETE FROM workorder_assignment_jobs_t WHERE workorder_id = ANY(:ids)"), params)
+    db.session.execute(text("DELETE FROM workorder_assignment_attempts_t WHERE workorder_id = ANY(:ids)"), params)
+    numbers = [r[0] for r in db.session.execute(
+        text('SELECT "WORKORDER" FROM workorder_t WHERE "ID" = ANY(:ids)'), params
+    )]
+    db.session.execute(text('DELETE FROM email_notification_t WHERE "WORKORDER" = ANY(:nums)'), {"nums": numbers})
+    db.session.execute(text("DELETE FROM workorder_life_cycle_t WHERE workorder = ANY(:nums)"), {"nums": numbers})
+    db.session.execute(text('DELETE FROM workorder_t WHERE "ID" = ANY(:ids)'), params)
+    # providers_t / services_t / provider_area_index_t cascade
+    db.session.execute(text("DELETE FROM users_t WHERE email_id LIKE :pattern"),
+                       {"pattern": f"sim-{run_id}-%@sim.invalid"})
+    db.session.commit()
+
+
+def active_jobs(workorder_ids):
+    return db.session.execute(text(f"""
+        {HARNESS_TAG}
+        SELECT COUNT(*) FROM workorder_assignment_jobs_t
+        WHERE workorder_id = ANY(:ids) AND state IN ('PENDING', 'WAITING')
+    """), {"ids": workorder_ids}).scalar()
+
+
+def job_outcomes(workorder_ids):
+    rows = db.session.execute(text(f"""
+        {HARNESS_TAG}
+        SELECT state, COUNT(*) AS n, SUM(attempt_number) AS offers
+        FROM workorder_assignment_jobs_t
+        WHERE workorder_id = ANY(:ids)
+        GROUP BY state
+    """), {"ids": workorder_ids}).fetchall()
+    return {r.state: (r.n, r.offers or 0) for r in rows}
+
+
+# ----------------------------------------------------------------------
+# Main
+# ----------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workorders", type=int, default=1000)
+    parser.add_argument("--contractors", type=int, default=50)
+    parser.add_argument("--fanout", type=int, default=1, help="contractors offered per round")
+    parser.add_argument("--workers", type=int, default=4, help="scheduler worker threads")
+    parser.add_argument("--responders", type=int, default=8, help="threads posting contractor responses")
+    parser.add_argument("--scale", type=float, default=60.0, help="simulated seconds per real second")
+    parser.add_argument("--accept", type=float, default=0.3, help="probability an offer is accepted")
+    parser.add_argument("--reject", type=float, default=0.4, help="probability an offer is rejected")
+    parser.add_argument("--mean-response-minutes", type=float, default=5.0)
+    parser.add_argument("--expiry-minutes", type=int, default=15, help="link expiry used by the engine")
+    parser.add_argument("--smtp-latency-ms", type=float, default=0.0, help="added to every simulated send")
+    parser.add_argument("--max-sim-hours", type=float, default=24.0, help="give up after this much simulated time")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="leave the seeded rows in place")
+    args = parser.parse_args()
+    if args.accept + args.reject > 1:
+        parser.error("--accept + --reject must not exceed 1")
+
+    Config.SQLALCHEMY_ENGINE_OPTIONS = {"pool_size": args.workers + args.responders + 2, "max_overflow": 4}
+    app = create_app()
+
+    clock = ScaledClock(args.scale)
+    responder = Responder(app, clock, args)
+    sink = SmtpSink(args.smtp_latency_ms / 1000.0, on_message=responder.on_message)
+    sink.install()
+
+    # Same expiry for the engine's deadline and the respond handler's check
+    def expiry(area):
+        return args.expiry_minutes
+
+    workorder_automation_model.get_expiry_minutes_from_db = expiry
+    workorder_mail_controller.get_expiry_minutes_from_db = expiry
+
+    run_id = uuid.uuid4().hex[:8]
+    area = f"SIM-{run_id}"
+    scheduler = None
+    workorder_ids = []
+
+    with app.app_context():
+        queries = Counter()
+        query_lock = threading.Lock()
+
+        def count_query(conn, cursor, statement, parameters, context, executemany):
+            if HARNESS_TAG not in statement:
+                with query_lock:
+                    queries["statements"] += 1
+
+        peak_threads = [threading.active_count()]
+        sampling = threading.Event()
+
+        def sample_threads():
+            while not sampling.wait(0.2):
+                peak_threads[0] = max(peak_threads[0], threading.active_count())
+
+        threading.Thread(target=sample_threads, name="thread-sampler", daemon=True).start()
+
+        try:
+            print(f"[SIM] Seeding {args.contractors} contractors and {args.workorders} work orders in {area}")
+            workorder_ids = seed(area, run_id, args.contractors, args.workorders)
+
+            scheduler = AssignmentScheduler(app, workers=args.workers, clock=clock)
+            scheduler.start()
+            event.listen(db.engine, "before_cursor_execute", count_query)
+
+            real_start = time.perf_counter()
+            sim_start = clock.now()
+            for workorder_id in workorder_ids:
+                responder.enqueued_at[workorder_id] = clock.now()
+                workorder_automation_model.trigger_automation_background(workorder_id, BASE_URL, args.fanout)
+            enqueue_seconds = time.perf_counter() - real_start
+            print(f"[SIM] Queued {len(workorder_ids)} jobs in {enqueue_seconds:.2f}s")
+
+            deadline = sim_start + args.max_sim_hours * 3600
+            remaining = len(workorder_ids)
+            while remaining and clock.now() < deadline:
+                time.sleep(0.5)
+                remaining = active_jobs(workorder_ids)
+                db.session.commit()
+            real_seconds = time.perf_counter() - real_start
+            sim_seconds = clock.now() - sim_start
+            outcomes = job_outcomes(workorder_ids)
+            db.session.commit()
+        finally:
+            sampling.set()
+            if scheduler is not None:
+                scheduler.stop()
+            responder.stop()
+            if event.contains(db.engine, "before_cursor_execute", count_query):
+                event.remove(db.engine, "before_cursor_execute", count_query)
+            if not args.keep:
+                db.session.rollback()
+                cleanup(run_id, workorder_ids)
+
+    finished = sum(n for state, (n, _) in outcomes.items() if state not in ("PENDING", "WAITING"))
+    offers = sum(o for _, o in outcomes.values())
+    tta = responder.assigned_after
+
+    print()
+    print(f"work orders      : {len(workorder_ids)}  contractors={args.contractors}  fanout={args.fanout}")
+    print(f"script           : accept={args.accept} reject={args.reject} "
+          f"timeout={1 - args.accept - args.reject:.2f} mean={args.mean_response_minutes}min "
+          f"expiry={args.expiry_minutes}min seed={args.seed}")
+    print(f"elapsed          : {real_seconds:.1f}s real, {sim_seconds / 3600:.2f}h simulated (x{args.scale:g})")
+    print(f"finished         : {finished}  unfinished={remaining}")
+    for state, (n, o) in sorted(outcomes.items()):
+        print(f"  {state:<14} : {n} ({o} offers)")
+    print(f"throughput       : {finished / real_seconds:,.1f} jobs/s real, "
+          f"{finished / max(sim_seconds, 1e-9) * 3600:,.0f} jobs/h simulated")
+    if tta:
+        print(f"time-to-assign   : p50={percentile(tta, 50) / 60:.1f}min p90={percentile(tta, 90) / 60:.1f}min "
+              f"p99={percentile(tta, 99) / 60:.1f}min (simulated, n={len(tta)})")
+    print(f"offers / job     : {offers / max(len(workorder_ids), 1):.2f}")
+    print(f"scripted answers : " + ", ".join(f"{k}={v}" for k, v in sorted(responder.scripted.items())))
+    print(f"respond HTTP     : " + ", ".join(f"{a}:{c}={v}" for (a, c), v in sorted(responder.http_status.items(), key=str)))
+    print(f"mails sent       : {sum(sink.sent.values())}")
+    for subject, n in sink.sent.most_common(5):
+        print(f"  {n:>6}  {subject}")
+    print(f"peak threads     : {peak_threads[0]}")
+    print(f"SQL statements   : {queries['statements']} "
+          f"({queries['statements'] / max(len(workorder_ids), 1):.1f} per work order)")
+
+    if remaining:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Local SMTP stand-in that accepts and discards mail.
+
+Speaks enough SMTP for smtplib (EHLO/HELO, AUTH PLAIN/LOGIN, MAIL, RCPT,
+DATA, NOOP, RSET, QUIT) and counts what it receives. --connect-delay-ms
+and --auth-delay-ms emulate the TCP/TLS handshake and login round trips a
+real provider costs, which is what connection reuse saves.
+
+    python -m benchmarks.smtp_sink --port 2525 --connect-delay-ms 150
+
+Point a profile at it with SMTP_HOST=127.0.0.1 SMTP_PORT=2525
+SMTP_STARTTLS=0 (or the MAIL_SMTP_* equivalents for work order mail); no
+TLS is offered.
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class SinkStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.bytes = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                setattr(self, key, getattr(self, key) + value)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        server.stats.add(connections=1)
+        if server.connect_delay:
+            time.sleep(server.connect_delay)
+        self.reply("220 smtp-sink ready")
+
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            verb = line.split(" ", 1)[0].upper()
+
+            if verb == "EHLO":
+                self.wfile.write(b"250-smtp-sink\r\n250-8BITMIME\r\n250-SIZE 52428800\r\n250 AUTH PLAIN LOGIN\r\n")
+            elif verb == "HELO":
+                self.reply("250 smtp-sink")
+            elif verb == "AUTH":
+                if server.auth_delay:
+                    time.sleep(server.auth_delay)
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].upper() == "LOGIN":
+                    # Username (unless sent inline) and password prompts
+                    if len(parts) == 2:
+                        self.reply("334 VXNlcm5hbWU6")
+                        self.rfile.readline()
+                    self.reply("334 UGFzc3dvcmQ6")
+                    self.rfile.readline()
+                elif len(parts) == 2:
+                    self.reply("334 ")
+                    self.rfile.readline()
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk == b".\r\n":
+                        break
+                    size += len(chunk)
+                server.stats.add(messages=1, bytes=size)
+                self.reply("250 OK queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, connect_delay=0.0, auth_delay=0.0):
+        super().__init__((host, port), _Handler)
+        self.connect_delay = connect_delay
+        self.auth_delay = auth_delay
+        self.stats = SinkStats()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="smtp-sink", daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--connect-delay-ms", type=float, default=0.0)
+    parser.add_argument("--auth-delay-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    sink = SmtpSink(args.host, args.port, args.connect_delay_ms / 1000, args.auth_delay_ms / 1000)
+    print(f"[SMTP-SINK] Listening on {args.host}:{sink.port}")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[SMTP-SINK] connections={sink.stats.connections} messages={sink.stats.messages}")
+
+
+if __name__ == "__main__":
+    main()
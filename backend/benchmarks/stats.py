@@ -0,0 +1,10 @@
+"""Shared helpers for the benchmark scripts."""
+
+
+def percentile(values, pct):
+    """Nearest-rank ``pct`` percentile of ``values`` (0.0 when empty)."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[idx]
@@ -0,0 +1,139 @@
+"""
+One-shot job: move provider / company documents out of BYTEA columns
+into the blob store (see migrations/011_document_blobs.sql).
+
+For every row that still has a legacy BYTEA value and no descriptor, the
+file is streamed out of Postgres in CHUNK_BYTES slices (substring), so a
+large statement is never held in memory. Each chunk is hashed and written
+into the content-addressed store. The row then gets the descriptor and
+the BYTEA is set to NULL. Rows are committed in batches of --batch-size,
+so the job can be stopped and re-run at any time.
+
+    python migrate_blobs.py [--batch-size 50] [--dry-run]
+
+Afterwards, VACUUM the tables (or drop the old columns) to give the
+TOAST space back.
+"""
+
+import argparse
+import mimetypes
+import time
+
+from sqlalchemy import text
+
+from app import create_app
+from app.models.database import db
+from app.utils import blob_store
+
+CHUNK_BYTES = 1024 * 1024
+
+# (table, primary key, legacy BYTEA column, descriptor column)
+DOCUMENT_COLUMNS = [
+    ("providers_t", "provider_id", "profile_pic", "profile_pic_blob"),
+    ("providers_t", "provider_id", "authorized_certificate", "authorized_certificate_blob"),
+    ("providers_bank_details_t", "provider_bank_id", "bank_statement", "bank_statement_blob"),
+    ("company_details_t", "company_id", "logo_path", "logo_blob"),
+    ("company_details_t", "company_id", "certificate_path", "certificate_blob"),
+    ("company_bank_details_t", "company_bank_id", "bank_statement", "bank_statement_blob"),
+]
+
+
+class ColumnReader:
+    """File-like read() over one BYTEA value, fetched CHUNK_BYTES at a time."""
+
+    def __init__(self, table, pk, column, row_id, size):
+        self.sql = text(f"""
+            SELECT substring({column} FROM :start FOR :length) AS chunk
+            FROM {table} WHERE {pk} = :id
+        """)
+        self.row_id = row_id
+        self.size = size
+        self.fetched = 0
+        self.buffer = b""
+
+    def read(self, n=-1):
+        if not self.buffer and self.fetched < self.size:
+            chunk = db.session.execute(
+                self.sql, {"start": self.fetched + 1, "length": CHUNK_BYTES, "id": self.row_id}
+            ).scalar()
+            self.buffer = bytes(chunk or b"")
+            self.fetched = self.fetched + len(self.buffer) if self.buffer else self.size
+        if n is None or n < 0:
+            n = len(self.buffer)
+        data, self.buffer = self.buffer[:n], self.buffer[n:]
+        return data
+
+
+def pending_count(table, column, blob_column):
+    return db.session.execute(text(f"""
+        SELECT COUNT(*) FROM {table}
+        WHERE {column} IS NOT NULL AND {blob_column} IS NULL
+    """)).scalar()
+
+
+def migrate_column(table, pk, column, blob_column, batch_size):
+    moved = moved_bytes = 0
+    last_id = None
+    while True:
+        rows = db.session.execute(text(f"""
+            SELECT {pk} AS id, octet_length({column}) AS size
+            FROM {table}
+            WHERE {column} IS NOT NULL AND {blob_column} IS NULL
+              AND (CAST(:last_id AS BIGINT) IS NULL OR {pk} > :last_id)
+            ORDER BY {pk}
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        """), {"last_id": last_id, "limit": batch_size}).fetchall()
+        if not rows:
+            db.session.commit()
+            return moved, moved_bytes
+
+        for row in rows:
+            reader = ColumnReader(table, pk, column, row.id, row.size)
+            head = reader.read(blob_store.MIME_SNIFF_BYTES)
+            mime = blob_store.sniff_mime(head)
+            reader.buffer = head + reader.buffer
+            filename = "document" + (mimetypes.guess_extension(mime) or "")
+            # add_reference rides on this transaction, committed with the row
+            key, digest, size = blob_store.store_stream(reader, filename)
+            db.session.execute(text(f"""
+                UPDATE {table}
+                SET {blob_column} = CAST(:descriptor AS JSONB), {column} = NULL
+                WHERE {pk} = :id
+            """), {
+                "descriptor": blob_store.descriptor_param(blob_store.describe(key, digest, size, mime)),
+                "id": row.id,
+            })
+            moved += 1
+            moved_bytes += size
+
+        db.session.commit()
+        last_id = rows[-1].id
+        print(f"[MIGRATE BLOBS] {table}.{column}: {moved} rows, {moved_bytes / 1048576:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=50, help="rows per commit")
+    parser.add_argument("--dry-run", action="store_true", help="only count the rows left to move")
+    args = parser.parse_args()
+
+    app = create_app(include_admin=False)
+    with app.app_context():
+        started = time.perf_counter()
+        total = total_bytes = 0
+        for table, pk, column, blob_column in DOCUMENT_COLUMNS:
+            if args.dry_run:
+                print(f"[MIGRATE BLOBS] {table}.{column}: {pending_count(table, column, blob_column)} rows to move")
+                continue
+            moved, moved_bytes = migrate_column(table, pk, column, blob_column, args.batch_size)
+            total += moved
+            total_bytes += moved_bytes
+
+        if not args.dry_run:
+            print(f"[MIGRATE BLOBS] Done: {total} documents, {total_bytes / 1048576:.1f} MB "
+                  f"in {time.perf_counter() - started:.1f}s. VACUUM the tables to reclaim TOAST space.")
+
+
+if __name__ == "__main__":
+    main()
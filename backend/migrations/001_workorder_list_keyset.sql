@@ -0,0 +1,7 @@
+-- ============================
+-- WORKORDER LIST: KEYSET PAGINATION
+-- ============================
+-- GET /api/workorders/?limit=&cursor= walks ("CREATED_T", "ID") newest first.
+
+CREATE INDEX IF NOT EXISTS idx_workorder_created_id
+    ON workorder_t ("CREATED_T" DESC, "ID" DESC);
@@ -0,0 +1,14 @@
+-- ============================
+-- WORKORDER NUMBER SEQUENCE
+-- ============================
+-- Backs WorkOrder.reserve_workorder_ids(). The sequence starts after the
+-- highest 6-digit serial already in use so existing numbers are never reissued.
+
+CREATE SEQUENCE IF NOT EXISTS workorder_serial_seq;
+
+SELECT setval(
+    'workorder_serial_seq',
+    COALESCE(MAX(substring("WORKORDER" FROM '(\d{6})$')::BIGINT), 0) + 1,
+    false
+)
+FROM workorder_t;
@@ -0,0 +1,26 @@
+-- ============================
+-- WORKORDER SEARCH INDEXES
+-- ============================
+-- Used by WorkOrder.search() / GET /api/workorders/search/ranked.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Prefix match on partial ticket numbers ("WORKORDER" LIKE 'abc%')
+CREATE INDEX IF NOT EXISTS idx_workorder_number_prefix
+    ON workorder_t ("WORKORDER" text_pattern_ops);
+
+-- Substring / fuzzy matches (ILIKE '%abc%', similarity())
+CREATE INDEX IF NOT EXISTS idx_workorder_number_trgm
+    ON workorder_t USING GIN ("WORKORDER" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_workorder_remarks_trgm
+    ON workorder_t USING GIN ("REMARKS" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_workorder_client_trgm
+    ON workorder_t USING GIN (client gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_workorder_area_trgm
+    ON workorder_t USING GIN ("WORKORDER_AREA" gin_trgm_ops);
+
+-- Lifecycle lookups by workorder and by contractor name
+CREATE INDEX IF NOT EXISTS idx_lifecycle_workorder
+    ON workorder_life_cycle_t (workorder);
+CREATE INDEX IF NOT EXISTS idx_lifecycle_contractor_trgm
+    ON workorder_life_cycle_t USING GIN (contractor_name gin_trgm_ops);
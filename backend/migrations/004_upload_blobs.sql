@@ -0,0 +1,18 @@
+-- ============================
+-- CONTENT-ADDRESSED UPLOADS
+-- ============================
+-- One row per stored blob (app/utils/blob_store.py). content_key is the
+-- "/uploads/cas/aa/bb/<sha256><ext>" path kept in the JSONB image columns.
+
+CREATE TABLE IF NOT EXISTS upload_blobs_t (
+    content_key VARCHAR(255) PRIMARY KEY,
+    sha256 CHAR(64),
+    size_bytes BIGINT,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Garbage collection scans for zero-ref blobs
+CREATE INDEX IF NOT EXISTS idx_upload_blobs_unreferenced
+    ON upload_blobs_t (updated_at) WHERE ref_count <= 0;
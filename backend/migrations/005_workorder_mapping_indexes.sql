@@ -0,0 +1,14 @@
+-- ============================
+-- PARENT / CHILD MAPPING
+-- ============================
+-- NOT EXISTS anti-join in WorkOrderMapping.get_eligible_children
+CREATE INDEX IF NOT EXISTS idx_workorder_mapping_child
+    ON workorder_mapping_t (child_workorder);
+
+-- Recursive tree walk (WorkOrderMapping.get_tree)
+CREATE INDEX IF NOT EXISTS idx_workorder_mapping_parent
+    ON workorder_mapping_t (parent_workorder);
+
+-- Eligible children share the parent's area and type
+CREATE INDEX IF NOT EXISTS idx_workorder_area_type
+    ON workorder_t ("WORKORDER_AREA", "WORKORDER_TYPE");
@@ -0,0 +1,44 @@
+-- ============================
+-- ASSIGNMENT JOBS
+-- ============================
+-- One row per automated assignment, driven by run_scheduler.py.
+-- state: PENDING (send next attempt) -> WAITING (deadline = link expiry)
+--        -> DONE | FAILED | STOPPED
+
+CREATE TABLE IF NOT EXISTS workorder_assignment_attempts_t (
+    id SERIAL PRIMARY KEY,
+    workorder_id INTEGER NOT NULL,
+    contractor_id INTEGER,
+    contractor_name VARCHAR(255),
+    attempt_number INTEGER,
+    status VARCHAR(20),
+    remark TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_assignment_attempts_wo_contractor
+    ON workorder_assignment_attempts_t (workorder_id, contractor_id);
+
+CREATE TABLE IF NOT EXISTS workorder_assignment_jobs_t (
+    id SERIAL PRIMARY KEY,
+    workorder_id INTEGER NOT NULL,
+    base_url TEXT,
+    state VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+    attempt_number INTEGER NOT NULL DEFAULT 0,
+    contractor_id INTEGER,
+    next_run_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- At most one live job per work order
+CREATE UNIQUE INDEX IF NOT EXISTS uq_assignment_jobs_active
+    ON workorder_assignment_jobs_t (workorder_id)
+    WHERE state IN ('PENDING', 'WAITING');
+
+-- Scheduler startup / rescan
+CREATE INDEX IF NOT EXISTS idx_assignment_jobs_due
+    ON workorder_assignment_jobs_t (next_run_at)
+    WHERE state IN ('PENDING', 'WAITING');
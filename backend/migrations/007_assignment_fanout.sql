@@ -0,0 +1,6 @@
+-- ============================
+-- FAN-OUT ASSIGNMENT
+-- ============================
+-- Contractors offered a job per round (1 = sequential)
+ALTER TABLE workorder_assignment_jobs_t
+    ADD COLUMN IF NOT EXISTS fanout INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,30 @@
+-- ============================
+-- PROVIDER AREA INDEX
+-- ============================
+-- area_key -> provider, derived from services_t (state / city / region,
+-- lower-cased). Kept in sync by ProviderModel.insert_services /
+-- delete_services; read by get_contractors_by_area_sorted.
+
+CREATE TABLE IF NOT EXISTS provider_area_index_t (
+    area_key VARCHAR(100) NOT NULL,
+    provider_id BIGINT NOT NULL REFERENCES providers_t(provider_id) ON DELETE CASCADE,
+    rate NUMERIC(10,2),
+    PRIMARY KEY (area_key, provider_id)
+);
+
+-- Ranked probe: WHERE area_key = ? ORDER BY rate
+CREATE INDEX IF NOT EXISTS idx_provider_area_index_rate
+    ON provider_area_index_t (area_key, rate);
+
+-- Backfill from existing services
+INSERT INTO provider_area_index_t (area_key, provider_id, rate)
+SELECT a.area_key, p.provider_id, MIN(s.service_rate)
+FROM services_t s
+JOIN providers_t p ON p.user_uid = s.user_uid
+CROSS JOIN LATERAL (
+    VALUES (lower(btrim(s.state))), (lower(btrim(s.city))), (lower(btrim(s.region)))
+) AS a(area_key)
+WHERE s.service_type = 0
+  AND a.area_key <> ''
+GROUP BY a.area_key, p.provider_id
+ON CONFLICT (area_key, provider_id) DO UPDATE SET rate = EXCLUDED.rate;
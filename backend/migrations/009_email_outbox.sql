@@ -0,0 +1,35 @@
+-- ============================
+-- EMAIL OUTBOX
+-- ============================
+-- Mail queued in the same transaction as the change that caused it and
+-- delivered by run_mail_worker.py.
+-- status: PENDING -> SENT | DEAD (after EMAIL_OUTBOX_MAX_ATTEMPTS)
+-- next_attempt_at doubles as the claim lease while a worker is sending.
+
+CREATE TABLE IF NOT EXISTS email_outbox_t (
+    id BIGSERIAL PRIMARY KEY,
+    idempotency_key VARCHAR(255),
+    profile VARCHAR(50) NOT NULL DEFAULT 'default',
+    to_email VARCHAR(255) NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    body_type VARCHAR(10) NOT NULL DEFAULT 'plain',
+    attachment BYTEA,
+    attachment_name VARCHAR(255),
+    status VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP
+);
+
+-- Re-queuing the same logical mail is a no-op
+CREATE UNIQUE INDEX IF NOT EXISTS uq_email_outbox_idempotency
+    ON email_outbox_t (idempotency_key)
+    WHERE idempotency_key IS NOT NULL;
+
+-- Worker claim: WHERE status = 'PENDING' AND next_attempt_at <= now()
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+    ON email_outbox_t (next_attempt_at)
+    WHERE status = 'PENDING';
@@ -0,0 +1,20 @@
+-- ============================
+-- MAIL IMAGE MODE
+-- ============================
+-- How assignment e-mails carry work order photos, per area and/or client:
+--   EMBED - inline MIME parts (default, MAIL_IMAGE_MODE)
+--   LINK  - <img> tags pointing at signed, expiring
+--           /api/workorders/workorder-image/<id> URLs
+-- NULL area / client matches any. Most specific row wins:
+-- area + client, then client, then area.
+
+CREATE TABLE IF NOT EXISTS mail_image_mode_t (
+    id SERIAL PRIMARY KEY,
+    area VARCHAR(100),
+    client VARCHAR(255),
+    mode VARCHAR(10) NOT NULL DEFAULT 'EMBED',
+    CONSTRAINT chk_mail_image_mode CHECK (mode IN ('EMBED', 'LINK'))
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mail_image_mode_scope
+    ON mail_image_mode_t (COALESCE(area, ''), COALESCE(client, ''));
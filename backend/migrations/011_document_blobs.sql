@@ -0,0 +1,32 @@
+-- ============================
+-- DOCUMENT BLOBS
+-- ============================
+-- Provider / company documents move from inline BYTEA to the
+-- content-addressed store (app/utils/blob_store.py). Each row keeps a
+-- descriptor: {"key": "/uploads/cas/..", "size": n, "mime": "...", "sha256": "..."}
+--
+-- New uploads write only the *_blob column. Existing files are moved by
+--     python migrate_blobs.py
+-- which fills the descriptor and NULLs the BYTEA column row by row.
+-- Reads fall back to the BYTEA column until then. Once the job reports
+-- nothing left, the old columns can be dropped (see the end of this file).
+
+ALTER TABLE providers_t
+    ADD COLUMN IF NOT EXISTS profile_pic_blob JSONB,
+    ADD COLUMN IF NOT EXISTS authorized_certificate_blob JSONB;
+
+ALTER TABLE providers_bank_details_t
+    ADD COLUMN IF NOT EXISTS bank_statement_blob JSONB;
+
+ALTER TABLE company_details_t
+    ADD COLUMN IF NOT EXISTS logo_blob JSONB,
+    ADD COLUMN IF NOT EXISTS certificate_blob JSONB;
+
+ALTER TABLE company_bank_details_t
+    ADD COLUMN IF NOT EXISTS bank_statement_blob JSONB;
+
+-- After migrate_blobs.py has finished:
+-- ALTER TABLE providers_t DROP COLUMN profile_pic, DROP COLUMN authorized_certificate;
+-- ALTER TABLE providers_bank_details_t DROP COLUMN bank_statement;
+-- ALTER TABLE company_details_t DROP COLUMN logo_path, DROP COLUMN certificate_path;
+-- ALTER TABLE company_bank_details_t DROP COLUMN bank_statement;
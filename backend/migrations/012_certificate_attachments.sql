@@ -0,0 +1,10 @@
+-- ============================
+-- CERTIFICATE ATTACHMENTS
+-- ============================
+-- Approval mails carry the certificate details instead of the rendered
+-- PDF. run_mail_worker.py attaches app/utils/pdf_utils.certificate_pdf()
+-- (uploads/certificates/<hash>.pdf, rendered on first use) when sending.
+-- JSON, not JSONB: the key order is the order of the certificate lines.
+
+ALTER TABLE email_outbox_t
+    ADD COLUMN IF NOT EXISTS attachment_certificate JSON;
@@ -0,0 +1,13 @@
+-- ============================
+-- WORKORDER LIST: KEYSET OVER NULL CREATED_T
+-- ============================
+-- "CREATED_T" is nullable. GET /api/workorders/?limit=&cursor= now walks
+-- (COALESCE("CREATED_T", epoch), "ID") newest first, so rows without a
+-- timestamp come last instead of being unreachable. The expression must
+-- match KEYSET_CREATED_SQL in app/models/workorder.py.
+
+CREATE INDEX IF NOT EXISTS idx_workorder_created_coalesce_id
+    ON workorder_t ((COALESCE("CREATED_T", TIMESTAMP '1970-01-01 00:00:00')) DESC, "ID" DESC);
+
+-- Replaced by the index above (migrations/001)
+DROP INDEX IF EXISTS idx_workorder_created_id;
@@ -0,0 +1,18 @@
+-- ============================
+-- WORKORDER NUMBER SEQUENCE: KEEP 6 DIGITS
+-- ============================
+-- WORKORDER is ddmmyyyy + prefix + 6-digit serial. workorder_serial_seq
+-- (migrations/002) never reset, so past 999999 the serial would grow to 7
+-- digits. It now cycles back to 000001. Numbers stay unique because the
+-- date is part of them: a serial repeats only after a full cycle, i.e.
+-- never on the same day unless a million numbers are reserved in one day.
+
+-- A sequence already past the new MAXVALUE must be wound back first
+SELECT setval('workorder_serial_seq', 1, false)
+FROM workorder_serial_seq
+WHERE last_value > 999999;
+
+ALTER SEQUENCE workorder_serial_seq
+    MINVALUE 1
+    MAXVALUE 999999
+    CYCLE;
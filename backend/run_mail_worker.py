@@ -0,0 +1,19 @@
+import os
+
+from app import create_app
+from app.models.email_outbox_model import count_outbox_backlog
+from app.models.email_outbox_worker import OutboxWorkerPool
+from app.utils import metrics
+
+app = create_app(include_admin=False)
+
+if __name__ == "__main__":
+    pool = OutboxWorkerPool(app)
+
+    def backlog():
+        with app.app_context():
+            return count_outbox_backlog()
+
+    metrics.EMAIL_OUTBOX_BACKLOG.set_function(backlog)
+    metrics.start_http_server(int(os.getenv("MAIL_WORKER_METRICS_PORT", "9106")))
+    pool.run_forever()
@@ -0,0 +1,13 @@
+import os
+
+from app import create_app
+from app.models.workorder_assignment_scheduler import AssignmentScheduler
+from app.utils import metrics
+
+app = create_app(include_admin=False)
+
+if __name__ == "__main__":
+    scheduler = AssignmentScheduler(app)
+    metrics.ASSIGNMENTS_IN_FLIGHT.set_function(scheduler.pending_count)
+    metrics.start_http_server(int(os.getenv("SCHEDULER_METRICS_PORT", "9105")))
+    scheduler.run_forever()